@@ -11,28 +11,43 @@ DNA-QNet Core Implementation
 Quantum-resilient peer-to-peer network stack for DNA-Lang organism communication
 """
 
+import argparse
 import asyncio
 import json
 import logging
+import os
 import socket
 import struct
 import hashlib
+import hmac
 import secrets
+import random
+import math
+import heapq
+import bisect
 import time
+from collections import Counter, deque
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple, Set
-from dataclasses import dataclass, asdict
-from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Set
+from dataclasses import asdict, replace
+from enum import Enum, IntEnum
 import threading
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import sqlite3
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-# Quantum cryptography
-try:
-    from qiskit import QuantumCircuit, transpile, Aer
-    from qiskit.quantum_info import random_statevector, Statevector
-    QUANTUM_AVAILABLE = True
-except ImportError:
-    QUANTUM_AVAILABLE = False
+from dnaqnet.crypto import (QUANTUM_AVAILABLE, EntropyPool, QuantumCryptographyEngine, decode_organism_payload,
+                            key_exchange_keypair, key_exchange_secret, unwrap_key, wrap_key)
+from dnaqnet.framing import (BATCH_FRAME_FLAG, DATAGRAM_HEADER, DATAGRAM_MAX_SIZE, DATAGRAM_TAG_SIZE, DATAGRAM_VERSION,
+                             FRAME_HEADER, FRAME_LENGTH_MASK, MAX_FRAME_BYTES, MAX_STREAM_CHUNK_BYTES, PROXY_TAG_SIZE,
+                             SEALED_RECORD_HEADER, SEALED_RECORD_VERSION, MessageDedupFilter, ReplayWindow,
+                             decode_message, encode_message, split_batch_frame, split_frames)
+from dnaqnet.persistence import (SNAPSHOT_REMOVE, SNAPSHOT_UPSERT, OutboxLog, PeerSnapshotStore, SharedStateStore,
+                                 decode_peer_snapshot, encode_peer_snapshot)
+from dnaqnet.protocol import DNAQNetMessage, DNAQNetPeer, MessageType, NetworkTopology, QuantumKey
+from dnaqnet.routing import DHTContact, KademliaTable, RoutingTable, dht_id, select_gossip_targets
 
 # Networking
 try:
@@ -42,565 +57,4325 @@ try:
 except ImportError:
     WEBSOCKETS_AVAILABLE = False
 
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("dna-qnet")
 
-class NetworkTopology(Enum):
-    MESH = "mesh"
-    STAR = "star"
-    HYBRID = "hybrid"
-
-class MessageType(Enum):
-    HANDSHAKE = "handshake"
-    QUANTUM_KEY_EXCHANGE = "quantum_key_exchange"
-    ORGANISM_MESSAGE = "organism_message"
-    SMART_CONTRACT = "smart_contract"
-    CONSCIOUSNESS_SYNC = "consciousness_sync"
-    EVOLUTION_EVENT = "evolution_event"
-    HEARTBEAT = "heartbeat"
-
-@dataclass
-class QuantumKey:
-    """Quantum Key Distribution key"""
-    key_id: str
-    quantum_bits: str
-    classical_hash: str
-    coherence_level: float
-    creation_time: float
-    expiry_time: float
-
-@dataclass
-class DNAQNetPeer:
-    """DNA-QNet network peer"""
-    peer_id: str
-    ip_address: str
-    port: int
-    public_key: str
-    quantum_key: Optional[QuantumKey]
-    consciousness_level: float
-    quantum_coherence: float
-    last_seen: float
-    capabilities: List[str]
-    trust_score: float
-
-@dataclass
-class DNAQNetMessage:
-    """DNA-QNet protocol message"""
-    message_id: str
-    sender_id: str
-    recipient_id: str
-    message_type: MessageType
-    payload: Dict[str, Any]
-    quantum_signature: str
-    timestamp: float
-    ttl: int
-
-class QuantumCryptographyEngine:
-    """Quantum Key Distribution and post-quantum cryptography"""
+class SendPriority(IntEnum):
+    CONTROL = 0
+    SYNC = 1
+    BULK = 2
+
+class SendStatus(Enum):
+    SENT = "sent"
+    DROPPED = "dropped"
+    FAILED = "failed"
+    STORED = "stored"  # durably queued in the outbox for delivery when the peer is reachable again
+
+# Outbound priority class per message type: control traffic is always flushed ahead of bulk data
+MESSAGE_PRIORITIES: Dict[MessageType, SendPriority] = {
+    MessageType.HANDSHAKE: SendPriority.CONTROL,
+    MessageType.QUANTUM_KEY_EXCHANGE: SendPriority.CONTROL,
+    MessageType.HEARTBEAT: SendPriority.CONTROL,
+    MessageType.COMPRESSION_DICTIONARY: SendPriority.CONTROL,
+    MessageType.ROUTE_UPDATE: SendPriority.CONTROL,
+    MessageType.FIND_NODE: SendPriority.CONTROL,
+    MessageType.TRANSFER_BEGIN: SendPriority.CONTROL,
+    MessageType.TRANSFER_CHUNK: SendPriority.BULK,
+    MessageType.CONSCIOUSNESS_SYNC: SendPriority.SYNC,
+    MessageType.EVOLUTION_EVENT: SendPriority.SYNC,
+    MessageType.SMART_CONTRACT: SendPriority.BULK,
+    MessageType.ORGANISM_MESSAGE: SendPriority.BULK
+}
+
+# Small, periodic, loss-tolerant traffic that goes over UDP when the peer shares a key
+DATAGRAM_MESSAGE_TYPES = {MessageType.HEARTBEAT, MessageType.CONSCIOUSNESS_SYNC}
+
+# Never sealed: they set up the key a seal is checked with
+UNSEALED_MESSAGE_TYPES = {MessageType.HANDSHAKE, MessageType.QUANTUM_KEY_EXCHANGE}
+
+# Least time between two requests that test whether a keyed peer still holds our key
+KEY_PROBE_INTERVAL = 30.0
+
+DEFAULT_SEND_QUEUE_LIMITS: Dict[SendPriority, int] = {
+    SendPriority.CONTROL: 256,
+    SendPriority.SYNC: 512,
+    SendPriority.BULK: 1024
+}
+
+class PeerFrameBatcher:
+    """Per-peer bounded priority send queue that coalesces messages into multi-message frames.
     
-    def __init__(self):
-        self.quantum_backend = Aer.get_backend('statevector_simulator') if QUANTUM_AVAILABLE else None
-        self.active_keys: Dict[str, QuantumKey] = {}
-        self.key_rotation_interval = 300  # 5 minutes
-    
-    def generate_quantum_key(self, peer_id: str) -> QuantumKey:
-        """Generate quantum key using QKD simulation"""
-        key_id = f"qkey_{peer_id}_{int(time.time())}"
-        
-        if QUANTUM_AVAILABLE:
-            # Generate quantum random bits
-            num_qubits = 256
-            qc = QuantumCircuit(num_qubits, num_qubits)
-            
-            # Create random quantum state
-            for i in range(num_qubits):
-                if secrets.randbits(1):
-                    qc.x(i)
-                if secrets.randbits(1):
-                    qc.h(i)
-            
-            # Measure all qubits
-            qc.measure_all()
-            
-            # Execute and get results
-            backend = Aer.get_backend('qasm_simulator')
-            job = backend.run(transpile(qc, backend), shots=1)
-            result = job.result()
-            counts = result.get_counts()
-            quantum_bits = list(counts.keys())[0]
-            
-            coherence_level = 0.95
-        else:
-            # Fallback to cryptographically secure random
-            quantum_bits = ''.join([str(secrets.randbits(1)) for _ in range(256)])
-            coherence_level = 0.85
-        
-        classical_hash = hashlib.sha256(quantum_bits.encode()).hexdigest()
-        current_time = time.time()
-        
-        quantum_key = QuantumKey(
-            key_id=key_id,
-            quantum_bits=quantum_bits,
-            classical_hash=classical_hash,
-            coherence_level=coherence_level,
-            creation_time=current_time,
-            expiry_time=current_time + self.key_rotation_interval
-        )
+    Frames normally go out one at a time, highest priority first. With independent_priorities (set when
+    the transport multiplexes streams) each priority class flushes on its own, so a bulk frame being
+    written does not hold back the control frame queued behind it.
+    """
+    
+    def __init__(self, peer_id: str, send_frame: Callable[[List[bytes], SendPriority], Awaitable[bool]],
+                 max_batch_bytes: int = 64 * 1024, max_delay: float = 0.005,
+                 queue_limits: Optional[Dict[SendPriority, int]] = None,
+                 overflow_policy: str = "drop", block_timeout: float = 1.0,
+                 independent_priorities: bool = False):
+        self.peer_id = peer_id
+        self.send_frame = send_frame
+        self.max_batch_bytes = max_batch_bytes
+        self.max_delay = max_delay
+        self.queue_limits = queue_limits or DEFAULT_SEND_QUEUE_LIMITS
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.independent_priorities = independent_priorities
         
-        self.active_keys[key_id] = quantum_key
-        logger.info(f"Generated quantum key {key_id} with coherence {coherence_level:.3f}")
+        # One FIFO per priority class, drained highest priority first
+        self.queues: Dict[SendPriority, deque] = {priority: deque() for priority in SendPriority}
+        self.pending_bytes = 0
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._priority_flushes: Dict[SendPriority, asyncio.Task] = {}
+        self._space_waiters: Dict[SendPriority, deque] = {priority: deque() for priority in SendPriority}
         
-        return quantum_key
+        # Batching and queueing statistics
+        self.frames_sent = 0
+        self.messages_sent = 0
+        self.dropped: Counter = Counter()
     
-    def encrypt_message(self, message: str, quantum_key: QuantumKey) -> str:
-        """Encrypt message using quantum key"""
-        message_bytes = message.encode('utf-8')
-        key_bytes = quantum_key.classical_hash.encode('utf-8')
+    def queue_depth(self) -> int:
+        """Total number of queued messages"""
+        return sum(len(queue) for queue in self.queues.values())
+    
+    async def submit(self, message_data: bytes,
+                     priority: SendPriority = SendPriority.BULK) -> Optional[asyncio.Future]:
+        """Queue an encoded message; returns a future resolving to True once its frame is written,
+        or None if the message was dropped because its priority queue is full"""
+        queue = self.queues[priority]
+        if len(queue) >= self.queue_limits[priority]:
+            if self.overflow_policy != "block" or not await self._wait_for_space(priority):
+                self.dropped[priority.name.lower()] += 1
+                return None
         
-        encrypted = bytearray()
-        for i, byte in enumerate(message_bytes):
-            encrypted.append(byte ^ key_bytes[i % len(key_bytes)])
+        loop = asyncio.get_running_loop()
+        delivery = loop.create_future()
+        queue.append((message_data, delivery))
+        self.pending_bytes += FRAME_HEADER.size + len(message_data)
         
-        return encrypted.hex()
-    
-    def decrypt_message(self, encrypted_hex: str, quantum_key: QuantumKey) -> str:
-        """Decrypt message using quantum key"""
-        encrypted_bytes = bytes.fromhex(encrypted_hex)
-        key_bytes = quantum_key.classical_hash.encode('utf-8')
+        if self._flushing(priority):
+            # The running flush drains everything queued while it is writing
+            return delivery
         
-        decrypted = bytearray()
-        for i, byte in enumerate(encrypted_bytes):
-            decrypted.append(byte ^ key_bytes[i % len(key_bytes)])
+        if self.pending_bytes >= self.max_batch_bytes or self.max_delay <= 0:
+            self._start_flush()
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self.max_delay, self._start_flush)
         
-        return decrypted.decode('utf-8')
+        return delivery
     
-    def create_quantum_signature(self, message: str, quantum_key: QuantumKey) -> str:
-        """Create quantum-enhanced digital signature"""
-        message_hash = hashlib.sha256(message.encode()).hexdigest()
-        signature_input = f"{message_hash}{quantum_key.classical_hash}"
-        quantum_signature = hashlib.sha256(signature_input.encode()).hexdigest()
-        
-        return quantum_signature
+    async def _wait_for_space(self, priority: SendPriority) -> bool:
+        """Block until the priority queue has room, up to the block timeout"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.block_timeout
+        while len(self.queues[priority]) >= self.queue_limits[priority]:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            waiter = loop.create_future()
+            self._space_waiters[priority].append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
     
-    def verify_quantum_signature(self, message: str, signature: str, quantum_key: QuantumKey) -> bool:
-        """Verify quantum-enhanced digital signature"""
-        expected_signature = self.create_quantum_signature(message, quantum_key)
-        return signature == expected_signature
-
-class DNAQNetNode:
-    """DNA-QNet network node implementation"""
+    def _wake_waiters(self, priority: SendPriority, slots: int):
+        """Wake one blocked sender per freed queue slot, in arrival order"""
+        waiters = self._space_waiters[priority]
+        while slots > 0 and waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                slots -= 1
     
-    def __init__(self, node_id: str, ip_address: str = "0.0.0.0", port: int = 7777):
-        self.node_id = node_id
-        self.ip_address = ip_address
-        self.port = port
-        self.quantum_engine = QuantumCryptographyEngine()
-        
-        # Network state
-        self.peers: Dict[str, DNAQNetPeer] = {}
-        self.message_handlers: Dict[MessageType, callable] = {}
-        self.running = False
-        self.server_socket = None
-        
-        # Consciousness and quantum state
-        self.consciousness_level = 0.85
-        self.quantum_coherence = 0.90
-        self.capabilities = ["quantum_communication", "smart_contracts", "consciousness_sync"]
-        
-        # Threading
-        self.executor = ThreadPoolExecutor(max_workers=10)
-        self.network_thread = None
-        
-        # Register default message handlers
-        self._register_default_handlers()
-        
-        logger.info(f"DNA-QNet node {node_id} initialized on {ip_address}:{port}")
+    def _flushing(self, priority: SendPriority) -> bool:
+        """Whether a running flush will drain messages queued at this priority"""
+        task = self._priority_flushes.get(priority) if self.independent_priorities else self._flush_task
+        return task is not None and not task.done()
     
-    def _register_default_handlers(self):
-        """Register default message handlers"""
-        self.message_handlers[MessageType.HANDSHAKE] = self._handle_handshake
-        self.message_handlers[MessageType.QUANTUM_KEY_EXCHANGE] = self._handle_quantum_key_exchange
-        self.message_handlers[MessageType.ORGANISM_MESSAGE] = self._handle_organism_message
-        self.message_handlers[MessageType.SMART_CONTRACT] = self._handle_smart_contract
-        self.message_handlers[MessageType.CONSCIOUSNESS_SYNC] = self._handle_consciousness_sync
-        self.message_handlers[MessageType.EVOLUTION_EVENT] = self._handle_evolution_event
-        self.message_handlers[MessageType.HEARTBEAT] = self._handle_heartbeat
+    def _start_flush(self):
+        """Start flush tasks, cancelling any pending delayed flush"""
+        if self._flush_timer:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self.independent_priorities:
+            for priority in SendPriority:
+                if self.queues[priority] and not self._flushing(priority):
+                    self._priority_flushes[priority] = asyncio.ensure_future(self.flush(priority))
+        elif not self._flush_task or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self.flush())
     
-    async def start(self):
-        """Start the DNA-QNet node"""
-        self.running = True
-        
-        # Start network server
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind((self.ip_address, self.port))
-        self.server_socket.listen(10)
-        
-        logger.info(f"🌐 DNA-QNet node {self.node_id} listening on {self.ip_address}:{self.port}")
+    def _take_batch(self, priority: Optional[SendPriority] = None) -> List[Tuple[bytes, asyncio.Future]]:
+        """Take queued messages in priority order, or of one priority, up to the batch size threshold"""
+        batch = []
+        batch_bytes = 0
+        for priority in (SendPriority if priority is None else (priority,)):
+            queue = self.queues[priority]
+            taken = 0
+            while queue:
+                record_bytes = FRAME_HEADER.size + len(queue[0][0])
+                if batch and batch_bytes + record_bytes > self.max_batch_bytes:
+                    break
+                batch.append(queue.popleft())
+                batch_bytes += record_bytes
+                taken += 1
+            self._wake_waiters(priority, taken)
+            if queue:
+                break
         
-        # Start network thread
-        self.network_thread = threading.Thread(target=self._network_loop, daemon=True)
-        self.network_thread.start()
+        self.pending_bytes -= batch_bytes
+        return batch
+    
+    @staticmethod
+    def build_frame(messages: List[bytes]) -> List[bytes]:
+        """Build the buffer list of a frame for a single vectored write"""
+        if len(messages) == 1:
+            return [FRAME_HEADER.pack(len(messages[0])), messages[0]]
         
-        # Start periodic tasks
-        asyncio.create_task(self._heartbeat_loop())
-        asyncio.create_task(self._key_rotation_loop())
-        asyncio.create_task(self._consciousness_sync_loop())
+        parts = [b'']
+        body_length = 0
+        for message_data in messages:
+            parts.append(FRAME_HEADER.pack(len(message_data)))
+            parts.append(message_data)
+            body_length += FRAME_HEADER.size + len(message_data)
+        parts[0] = FRAME_HEADER.pack(body_length | BATCH_FRAME_FLAG)
+        return parts
     
-    def _network_loop(self):
-        """Main network loop for handling connections"""
-        while self.running:
+    async def flush(self, priority: Optional[SendPriority] = None):
+        """Write all queued messages, or those of one priority, as one or more frames"""
+        while self.queues[priority] if priority is not None else self.pending_bytes:
+            frame_priority = priority if priority is not None else next(queued for queued in SendPriority if self.queues[queued])
+            batch = self._take_batch(priority)
             try:
-                client_socket, address = self.server_socket.accept()
-                logger.info(f"New connection from {address}")
-                
-                # Handle connection in thread pool
-                self.executor.submit(self._handle_connection, client_socket, address)
-                
+                delivered = await self.send_frame(self.build_frame([data for data, _ in batch]), frame_priority)
             except Exception as e:
-                if self.running:
-                    logger.error(f"Network loop error: {e}")
+                logger.error(f"Frame flush error for peer {self.peer_id}: {e}")
+                delivered = False
+            
+            if delivered:
+                self.frames_sent += 1
+                self.messages_sent += len(batch)
+            
+            for _, delivery in batch:
+                if not delivery.done():
+                    delivery.set_result(delivered)
     
-    def _handle_connection(self, client_socket: socket.socket, address: Tuple[str, int]):
-        """Handle incoming connection"""
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching and queueing statistics"""
+        return {
+            "frames_sent": self.frames_sent,
+            "messages_sent": self.messages_sent,
+            "pending_bytes": self.pending_bytes,
+            "queued": {priority.name.lower(): len(queue) for priority, queue in self.queues.items()},
+            "dropped": dict(self.dropped)
+        }
+
+# Stream multiplexing: a connection that opens with MUX_PREFACE carries many logical streams, each a
+# sequence of ordinary frames cut into MUX_HEADER-framed DATA pieces that are interleaved on the socket
+MUX_PREFACE = FRAME_HEADER.pack(BATCH_FRAME_FLAG | FRAME_LENGTH_MASK)  # a 2 GiB batch, never a real frame
+MUX_HEADER = struct.Struct('!IBBI')  # stream id, kind, flags, body length (credit granted for MUX_CREDIT)
+MUX_DATA = 0
+MUX_CREDIT = 1
+MUX_RESET = 2
+MUX_END_STREAM = 0x01  # last piece of a request or of its reply
+MUX_NO_REPLY = 0x02  # one-way stream: the receiver sends no responses
+MUX_WINDOW = 256 * 1024  # credit every stream starts with, in each direction
+MUX_MAX_DATA = 16 * 1024  # largest DATA piece, bounding how long one stream holds the socket
+MUX_MAX_STREAMS = 256
+
+class MuxStream:
+    """One logical stream of a multiplexed connection"""
+    
+    def __init__(self, stream_id: int, priority: SendPriority, reply: bool = True):
+        self.stream_id = stream_id
+        self.priority = priority
+        self.reply = reply
+        self.send_credit = MUX_WINDOW
+        self.receive_window = MUX_WINDOW  # credit the other end still holds on this stream
+        self.outbound: deque = deque()  # [data, offset, flags, written future], in order
+        self.scheduled = False
+        self.inbound = bytearray()
+        self.early_granted = 0  # credit returned ahead of handling, for frames larger than the window
+        self.frames: deque = deque()  # (encoded messages, credit to return once handled)
+        self.responses: List[bytes] = []
+        self.handler: Optional[asyncio.Task] = None
+        self.ended = False
+        self.reply_future: Optional[asyncio.Future] = None
+
+class MuxConnection:
+    """Logical streams with per-stream, credit-based flow control over one TCP connection.
+    
+    Streams opened by the initiator have odd ids. A stream carries whole frames cut into DATA pieces of
+    at most MUX_MAX_DATA bytes; the writer sends one piece at a time from the highest-priority stream
+    that has data and credit, round-robin within a priority, so a bulk transfer delays a control frame
+    by one piece at most. A sender never has more than the granted credit outstanding on a stream, and
+    the receiver grants it back as frames are handled, so a slow stream stalls only itself.
+    """
+    
+    def __init__(self, connection_socket: socket.socket,
+                 on_frame: Optional[Callable[[List[bytes]], Awaitable[List[bytes]]]] = None, label: str = ""):
+        self.socket = connection_socket
+        self.on_frame = on_frame  # accepting side: handles a frame and returns encoded responses
+        self.label = label
+        self.streams: Dict[int, MuxStream] = {}
+        self.priority_streams: Dict[SendPriority, MuxStream] = {}
+        self.next_stream_id = 1
+        self.closed = False
+        self.last_activity = time.time()
+        self.stats: Counter = Counter()
+        self._ready: Dict[SendPriority, deque] = {priority: deque() for priority in SendPriority}
+        self._writable = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._writing: Optional[list] = None  # outbound item whose piece is being written right now
+        self._read_buffer = bytearray()
+        self.closed_future = asyncio.get_running_loop().create_future()
+        self._tasks = [asyncio.ensure_future(self._read_loop()), asyncio.ensure_future(self._write_loop())]
+    
+    def _open_stream(self, priority: SendPriority, reply: bool) -> MuxStream:
+        stream = MuxStream(self.next_stream_id, priority, reply)
+        self.next_stream_id += 2
+        self.streams[stream.stream_id] = stream
+        self.stats["streams_opened"] += 1
+        return stream
+    
+    async def send_frame(self, parts: List[bytes], priority: SendPriority) -> bool:
+        """Write a frame on the one-way stream of its priority; True once its last piece is on the socket"""
+        stream = self.priority_streams.get(priority)
+        if stream is None or stream.stream_id not in self.streams:
+            stream = self._open_stream(priority, reply=False)
+            self.priority_streams[priority] = stream
+        return await self._send(stream, b''.join(parts), MUX_NO_REPLY)
+    
+    async def request(self, parts: List[bytes], priority: SendPriority) -> bytes:
+        """Send a frame on a new stream and return the response frames sent back on it"""
+        stream = self._open_stream(priority, reply=True)
+        stream.reply_future = asyncio.get_running_loop().create_future()
         try:
-            # Receive message
-            message_data = self._receive_message(client_socket)
-            if message_data:
-                message = DNAQNetMessage(**json.loads(message_data))
-                
-                # Process message
-                asyncio.run(self._process_message(message))
-                
-                # Send response if needed
-                response = self._create_response(message)
-                if response:
-                    self._send_message(client_socket, response)
-        
-        except Exception as e:
-            logger.error(f"Connection handling error: {e}")
+            if not await self._send(stream, b''.join(parts), MUX_END_STREAM):
+                raise ConnectionError(f"multiplexed connection to {self.label} closed")
+            return await stream.reply_future
         finally:
-            client_socket.close()
+            if self.streams.pop(stream.stream_id, None) is not None and not stream.reply_future.done():
+                await self._reset(stream)
     
-    def _receive_message(self, client_socket: socket.socket) -> Optional[str]:
-        """Receive message from socket"""
+    async def _send(self, stream: MuxStream, data: bytes, flags: int) -> bool:
+        if self.closed:
+            return False
+        item = [memoryview(data), 0, flags, asyncio.get_running_loop().create_future()]
+        stream.outbound.append(item)
+        self._schedule(stream)
         try:
-            # Receive message length
-            length_data = client_socket.recv(4)
-            if not length_data:
-                return None
-            
-            message_length = struct.unpack('!I', length_data)[0]
-            
-            # Receive message data
-            message_data = b''
-            while len(message_data) < message_length:
-                chunk = client_socket.recv(message_length - len(message_data))
-                if not chunk:
-                    break
-                message_data += chunk
-            
-            return message_data.decode('utf-8')
-        
+            return await item[3]
+        except asyncio.CancelledError:
+            if item in stream.outbound:
+                if item[1] == 0 and item is not self._writing:
+                    stream.outbound.remove(item)
+                else:
+                    # Part of the frame is already out; the receiver must discard the stream
+                    self.streams.pop(stream.stream_id, None)
+                    asyncio.ensure_future(self._reset(stream))
+            raise
+    
+    def _schedule(self, stream: MuxStream):
+        if not stream.scheduled and not self.closed:
+            stream.scheduled = True
+            self._ready[stream.priority].append(stream)
+            self._writable.set()
+    
+    def _next_ready(self) -> Optional[MuxStream]:
+        """Highest-priority stream with data it has credit for"""
+        for priority in SendPriority:
+            ready = self._ready[priority]
+            while ready:
+                stream = ready.popleft()
+                if stream.outbound and (stream.send_credit > 0 or stream.outbound[0][1] == len(stream.outbound[0][0])):
+                    return stream
+                if stream.outbound:
+                    self.stats["credit_stalls"] += 1
+                stream.scheduled = False  # rescheduled when data or credit arrives
+        return None
+    
+    async def _write_loop(self):
+        try:
+            while not self.closed:
+                stream = self._next_ready()
+                if stream is None:
+                    self._writable.clear()
+                    await self._writable.wait()
+                    continue
+                
+                item = stream.outbound[0]
+                data, offset, flags, written = item
+                size = min(MUX_MAX_DATA, stream.send_credit, len(data) - offset)
+                last = offset + size == len(data)
+                piece_flags = (flags & MUX_NO_REPLY) | (flags & MUX_END_STREAM if last else 0)
+                # Started once dequeued: a cancelled send must not pull the item out from under its first piece
+                self._writing = item
+                try:
+                    await self._write([MUX_HEADER.pack(stream.stream_id, MUX_DATA, piece_flags, size), data[offset:offset + size]])
+                finally:
+                    self._writing = None
+                item[1] += size
+                stream.send_credit -= size
+                self.stats["pieces_sent"] += 1
+                self.stats["bytes_sent"] += size
+                if last and stream.outbound and stream.outbound[0] is item:
+                    stream.outbound.popleft()
+                    if not written.done():
+                        written.set_result(True)
+                
+                if stream.outbound:
+                    self._ready[stream.priority].append(stream)  # back of its priority: round-robin
+                else:
+                    stream.scheduled = False
         except Exception as e:
-            logger.error(f"Message receive error: {e}")
-            return None
+            self.close(e)
     
-    def _send_message(self, client_socket: socket.socket, message: DNAQNetMessage):
-        """Send message to socket"""
+    async def _write(self, parts: List[Any]):
+        """Write buffers as one unit, vectored where supported"""
+        loop = asyncio.get_running_loop()
+        async with self._write_lock:
+            sent = 0
+            if hasattr(self.socket, "sendmsg"):
+                try:
+                    sent = self.socket.sendmsg(parts)
+                except (BlockingIOError, InterruptedError):
+                    sent = 0
+            total_length = sum(len(part) for part in parts)
+            if sent < total_length:
+                await loop.sock_sendall(self.socket, b''.join(parts)[sent:])
+        self.last_activity = time.time()
+    
+    def _grant_later(self, stream: MuxStream, credit: int):
+        """Grant without waiting: the read loop must never block on our own writes"""
+        if credit > 0:
+            asyncio.ensure_future(self._grant(stream, credit))
+    
+    async def _grant(self, stream: MuxStream, credit: int):
+        """Return credit for consumed bytes to the sending end"""
+        if credit <= 0 or self.closed:
+            return
+        stream.receive_window += credit
         try:
-            message_json = json.dumps(asdict(message))
-            message_data = message_json.encode('utf-8')
-            
-            # Send message length
-            client_socket.send(struct.pack('!I', len(message_data)))
-            
-            # Send message data
-            client_socket.send(message_data)
-        
+            await self._write([MUX_HEADER.pack(stream.stream_id, MUX_CREDIT, 0, credit)])
         except Exception as e:
-            logger.error(f"Message send error: {e}")
+            self.close(e)
     
-    async def _process_message(self, message: DNAQNetMessage):
-        """Process incoming message"""
-        handler = self.message_handlers.get(message.message_type)
-        if handler:
+    async def _reset(self, stream: MuxStream):
+        self.stats["resets_sent"] += 1
+        self._fail_stream(stream)
+        if not self.closed:
             try:
-                await handler(message)
+                await self._write([MUX_HEADER.pack(stream.stream_id, MUX_RESET, 0, 0)])
             except Exception as e:
-                logger.error(f"Message handler error: {e}")
-        else:
-            logger.warning(f"No handler for message type: {message.message_type}")
+                self.close(e)
     
-    def _create_response(self, original_message: DNAQNetMessage) -> Optional[DNAQNetMessage]:
-        """Create response message"""
-        # Simple acknowledgment for most messages
-        if original_message.message_type in [MessageType.HANDSHAKE, MessageType.QUANTUM_KEY_EXCHANGE]:
-            return DNAQNetMessage(
-                message_id=secrets.token_hex(16),
-                sender_id=self.node_id,
-                recipient_id=original_message.sender_id,
-                message_type=MessageType.HEARTBEAT,
-                payload={"status": "acknowledged"},
-                quantum_signature="",
-                timestamp=time.time(),
-                ttl=60
-            )
-        return None
+    async def _receive_exact(self, length: int) -> Optional[bytes]:
+        loop = asyncio.get_running_loop()
+        while len(self._read_buffer) < length:
+            chunk = await loop.sock_recv(self.socket, max(65536, length - len(self._read_buffer)))
+            if not chunk:
+                return None
+            self._read_buffer += chunk
+        data = bytes(self._read_buffer[:length])
+        del self._read_buffer[:length]
+        return data
     
-    async def connect_to_peer(self, peer_ip: str, peer_port: int) -> bool:
-        """Connect to a peer and establish quantum key"""
+    async def _read_loop(self):
         try:
-            # Create connection
-            peer_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            peer_socket.connect((peer_ip, peer_port))
-            
-            # Send handshake
-            handshake_message = DNAQNetMessage(
-                message_id=secrets.token_hex(16),
-                sender_id=self.node_id,
-                recipient_id="unknown",
-                message_type=MessageType.HANDSHAKE,
-                payload={
-                    "node_id": self.node_id,
-                    "capabilities": self.capabilities,
-                    "consciousness_level": self.consciousness_level,
-                    "quantum_coherence": self.quantum_coherence
-                },
-                quantum_signature="",
-                timestamp=time.time(),
-                ttl=60
-            )
-            
-            self._send_message(peer_socket, handshake_message)
-            
-            # Receive response
-            response_data = self._receive_message(peer_socket)
-            if response_data:
-                logger.info(f"Successfully connected to peer {peer_ip}:{peer_port}")
-                return True
-            
+            while not self.closed:
+                header = await self._receive_exact(MUX_HEADER.size)
+                if header is None:
+                    break
+                stream_id, kind, flags, length = MUX_HEADER.unpack(header)
+                self.last_activity = time.time()
+                
+                if kind == MUX_CREDIT:
+                    stream = self.streams.get(stream_id)
+                    if stream is not None:
+                        stream.send_credit += length
+                        if stream.outbound:
+                            self._schedule(stream)
+                elif kind == MUX_RESET:
+                    stream = self.streams.pop(stream_id, None)
+                    if stream is not None:
+                        self.stats["resets_received"] += 1
+                        self._fail_stream(stream)
+                elif kind == MUX_DATA:
+                    if length > MUX_MAX_DATA:
+                        raise ValueError(f"DATA piece of {length} bytes exceeds {MUX_MAX_DATA}")
+                    body = await self._receive_exact(length)
+                    if body is None:
+                        break
+                    await self._receive_data(stream_id, flags, body)
+                else:
+                    raise ValueError(f"unknown frame kind {kind}")
+            self.close()
         except Exception as e:
-            logger.error(f"Failed to connect to peer {peer_ip}:{peer_port}: {e}")
-        
-        return False
+            self.close(e)
     
-    async def send_organism_message(self, recipient_id: str, organism_data: Dict[str, Any]):
-        """Send message to another organism"""
-        if recipient_id not in self.peers:
-            logger.error(f"Peer {recipient_id} not found")
-            return
+    async def _receive_data(self, stream_id: int, flags: int, body: bytes):
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            if self.on_frame is None or stream_id % 2 == 0:
+                return  # reply to a request we abandoned
+            if len(self.streams) >= MUX_MAX_STREAMS:
+                asyncio.ensure_future(self._reset(MuxStream(stream_id, SendPriority.CONTROL)))
+                return
+            # Replies are small acks and results, so they go out at control priority
+            stream = MuxStream(stream_id, SendPriority.CONTROL, reply=not flags & MUX_NO_REPLY)
+            self.streams[stream_id] = stream
         
-        peer = self.peers[recipient_id]
+        stream.receive_window -= len(body)
+        if stream.receive_window < 0:
+            raise ValueError(f"stream {stream_id} exceeded its credit")
+        stream.inbound += body
         
-        # Generate quantum key if not exists
-        if not peer.quantum_key:
-            peer.quantum_key = self.quantum_engine.generate_quantum_key(recipient_id)
+        if stream.reply_future is not None:
+            # Our request's reply: consumed as it arrives
+            if len(stream.inbound) > MAX_FRAME_BYTES:
+                raise ValueError(f"reply on stream {stream_id} exceeds {MAX_FRAME_BYTES} bytes")
+            self._grant_later(stream, len(body))
+            if flags & MUX_END_STREAM:
+                self.streams.pop(stream_id, None)
+                if not stream.reply_future.done():
+                    stream.reply_future.set_result(bytes(stream.inbound))
+            return
         
-        # Encrypt message
-        message_json = json.dumps(organism_data)
-        encrypted_message = self.quantum_engine.encrypt_message(message_json, peer.quantum_key)
-        quantum_signature = self.quantum_engine.create_quantum_signature(message_json, peer.quantum_key)
+        while len(stream.inbound) >= FRAME_HEADER.size:
+            frame_length = FRAME_HEADER.size + (FRAME_HEADER.unpack_from(stream.inbound)[0] & FRAME_LENGTH_MASK)
+            if frame_length - FRAME_HEADER.size > MAX_FRAME_BYTES:
+                # Credit for it would be returned as it arrives, so nothing else would bound the buffer
+                raise ValueError(f"frame of {frame_length} bytes on stream {stream_id} exceeds {MAX_FRAME_BYTES}")
+            if len(stream.inbound) < frame_length:
+                # A frame larger than the window can only complete if its credit is returned on receipt
+                if frame_length > MUX_WINDOW:
+                    self._grant_later(stream, len(stream.inbound) - stream.early_granted)
+                    stream.early_granted = len(stream.inbound)
+                break
+            frame = bytes(stream.inbound[:frame_length])
+            del stream.inbound[:frame_length]
+            prepaid = stream.early_granted
+            stream.early_granted = 0
+            stream.frames.append((split_frames(frame), frame_length - prepaid))
         
-        # Create DNA-QNet message
-        message = DNAQNetMessage(
-            message_id=secrets.token_hex(16),
-            sender_id=self.node_id,
-            recipient_id=recipient_id,
-            message_type=MessageType.ORGANISM_MESSAGE,
-            payload={
-                "encrypted_data": encrypted_message,
-                "organism_type": organism_data.get("type", "unknown")
-            },
-            quantum_signature=quantum_signature,
-            timestamp=time.time(),
-            ttl=300
-        )
+        stream.ended = stream.ended or bool(flags & MUX_END_STREAM)
+        if stream.handler is None or stream.handler.done():
+            stream.handler = asyncio.ensure_future(self._handle_stream(stream))
+    
+    async def _handle_stream(self, stream: MuxStream):
+        """Hand a stream's frames to the node in order, returning credit as each is handled"""
+        while stream.frames:
+            frame, credit = stream.frames.popleft()
+            try:
+                responses = await self.on_frame(frame)
+                if stream.reply:
+                    stream.responses.extend(responses)
+            except Exception as e:
+                logger.error(f"Multiplexed frame handling error on {self.label}: {e}")
+            self._grant_later(stream, credit)
         
-        await self._send_to_peer(peer, message)
+        if stream.ended and stream.reply and not stream.frames and self.streams.get(stream.stream_id) is stream:
+            reply = b''.join(PeerFrameBatcher.build_frame(stream.responses)) if stream.responses else b''
+            await self._send(stream, reply, MUX_END_STREAM)
+            self.streams.pop(stream.stream_id, None)
     
-    async def _send_to_peer(self, peer: DNAQNetPeer, message: DNAQNetMessage):
-        """Send message to specific peer"""
-        try:
-            peer_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            peer_socket.connect((peer.ip_address, peer.port))
-            self._send_message(peer_socket, message)
-            peer_socket.close()
-            
-            peer.last_seen = time.time()
-            
-        except Exception as e:
-            logger.error(f"Failed to send message to peer {peer.peer_id}: {e}")
+    def _fail_stream(self, stream: MuxStream):
+        for _, _, _, written in stream.outbound:
+            if not written.done():
+                written.set_result(False)
+        stream.outbound.clear()
+        if stream.reply_future is not None and not stream.reply_future.done():
+            stream.reply_future.set_exception(ConnectionError(f"stream {stream.stream_id} to {self.label} was reset"))
+        for priority, priority_stream in list(self.priority_streams.items()):
+            if priority_stream is stream:
+                del self.priority_streams[priority]
     
-    # Message Handlers
-    async def _handle_handshake(self, message: DNAQNetMessage):
-        """Handle handshake message"""
-        payload = message.payload
-        
-        peer = DNAQNetPeer(
-            peer_id=payload["node_id"],
-            ip_address="",  # Will be set from connection
-            port=0,
-            public_key="",
-            quantum_key=None,
-            consciousness_level=payload.get("consciousness_level", 0.5),
-            quantum_coherence=payload.get("quantum_coherence", 0.5),
-            last_seen=time.time(),
-            capabilities=payload.get("capabilities", []),
-            trust_score=0.5
-        )
-        
-        self.peers[peer.peer_id] = peer
-        logger.info(f"🤝 Peer {peer.peer_id} connected - Consciousness: {peer.consciousness_level:.3f}")
+    def close(self, error: Optional[Exception] = None):
+        if self.closed:
+            return
+        self.closed = True
+        if error is not None:
+            logger.warning(f"⚠️ Multiplexed connection {self.label} closed: {error}")
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
+        self.socket.close()
+        for stream in self.streams.values():
+            self._fail_stream(stream)
+        self.streams.clear()
+        if not self.closed_future.done():
+            self.closed_future.set_result(None)
+
+def iter_organism_chunks(organism_data: Any, chunk_size: int, start_offset: int = 0) -> Iterator[Tuple[int, bytes, bool]]:
+    """Yield (index, chunk, last) over the organism's JSON encoding without building the whole string;
+    chunks before start_offset are encoded but skipped, which keeps resumed transfers byte-identical"""
+    buffer = bytearray()
+    index = 0
+    for piece in json.JSONEncoder().iterencode(organism_data):
+        buffer += piece.encode('utf-8')
+        # Strictly greater, so the final chunk is always held back and flagged last
+        while len(buffer) > chunk_size:
+            if index * chunk_size >= start_offset:
+                yield index, bytes(buffer[:chunk_size]), False
+            del buffer[:chunk_size]
+            index += 1
+    yield index, bytes(buffer), True
+
+class IncomingTransfer:
+    """Receiver side of a chunked organism transfer, spooled to disk so memory stays bounded"""
     
-    async def _handle_quantum_key_exchange(self, message: DNAQNetMessage):
-        """Handle quantum key exchange"""
-        sender_id = message.sender_id
-        
-        if sender_id in self.peers:
-            # Generate quantum key for this peer
-            quantum_key = self.quantum_engine.generate_quantum_key(sender_id)
-            self.peers[sender_id].quantum_key = quantum_key
-            
-            logger.info(f"🔐 Quantum key established with {sender_id}")
+    def __init__(self, transfer_id: str, sender_id: str, chunk_size: int):
+        self.transfer_id = transfer_id
+        self.sender_id = sender_id
+        self.chunk_size = chunk_size
+        self.spool = tempfile.TemporaryFile()
+        self.received: Set[int] = set()
+        self.committed_chunks = 0  # contiguous prefix of chunks on disk
+        self.total_chunks: Optional[int] = None
+        self.size = 0
+        self.last_activity = time.time()
     
-    async def _handle_organism_message(self, message: DNAQNetMessage):
-        """Handle organism message"""
-        sender_id = message.sender_id
-        
-        if sender_id in self.peers:
-            peer = self.peers[sender_id]
-            
-            if peer.quantum_key:
-                # Decrypt message
-                encrypted_data = message.payload["encrypted_data"]
-                try:
-                    decrypted_message = self.quantum_engine.decrypt_message(encrypted_data, peer.quantum_key)
-                    organism_data = json.loads(decrypted_message)
-                    
-                    logger.info(f"📧 Received organism message from {sender_id}: {organism_data.get('type', 'unknown')}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to decrypt message from {sender_id}: {e}")
+    def write(self, index: int, data: bytes, last: bool):
+        """Store a verified chunk at its offset; duplicates are ignored"""
+        self.last_activity = time.time()
+        if index in self.received or index < self.committed_chunks:
+            return
+        self.spool.seek(index * self.chunk_size)
+        self.spool.write(data)
+        self.received.add(index)
+        self.size = max(self.size, index * self.chunk_size + len(data))
+        if last:
+            self.total_chunks = index + 1
+        while self.committed_chunks in self.received:
+            self.received.discard(self.committed_chunks)
+            self.committed_chunks += 1
     
-    async def _handle_smart_contract(self, message: DNAQNetMessage):
-        """Handle smart contract execution"""
-        contract_data = message.payload
-        logger.info(f"📜 Smart contract received: {contract_data.get('contract_type', 'unknown')}")
+    def has_chunk(self, index: int) -> bool:
+        return index < self.committed_chunks or index in self.received
     
-    async def _handle_consciousness_sync(self, message: DNAQNetMessage):
-        """Handle consciousness synchronization"""
-        peer_consciousness = message.payload.get("consciousness_level", 0.5)
-        peer_coherence = message.payload.get("quantum_coherence", 0.5)
-        
-        # Update our consciousness based on peer interaction
-        consciousness_delta = (peer_consciousness - self.consciousness_level) * 0.01
-        self.consciousness_level = max(0.0, min(1.0, self.consciousness_level + consciousness_delta))
-        
-        logger.info(f"🧠 Consciousness sync with {message.sender_id} - Level: {self.consciousness_level:.3f}")
+    @property
+    def committed_offset(self) -> int:
+        """Bytes a resumed sender can skip"""
+        return self.size if self.complete else self.committed_chunks * self.chunk_size
     
-    async def _handle_evolution_event(self, message: DNAQNetMessage):
-        """Handle evolution event"""
-        evolution_data = message.payload
+    @property
+    def complete(self) -> bool:
+        return self.total_chunks is not None and self.committed_chunks >= self.total_chunks
+    
+    def read_organism(self) -> Any:
+        """Parse the reassembled organism from the spool"""
+        self.spool.seek(0)
+        return json.load(self.spool)
+    
+    def close(self):
+        self.spool.close()
+
+class ConsciousnessCRDT:
+    """Delta-state CRDT of per-node consciousness and coherence.
+    
+    Each node owns one entry (version, consciousness, coherence) and only it bumps the version; merge keeps
+    the highest (version, values) per node, so replicas converge whatever the order, loss or duplication
+    of deltas. Every change is stamped with a local sequence number, and a peer is sent only the entries
+    changed after the sequence it last acknowledged, minus entries it was the source of.
+    """
+    
+    def __init__(self, node_id: str):
+        self.node_id = node_id
+        self.epoch = secrets.token_hex(8)  # lets peers tell a restart from a reordered ack
+        self.entries: Dict[str, Tuple[int, float, float]] = {}
+        self.sequence = 0
+        self._changed_at: Dict[str, int] = {}
+        self._source: Dict[str, str] = {}
+        self.acked: Dict[str, int] = {}  # peer -> our sequence the peer has acknowledged
+        self.received: Dict[str, int] = {}  # peer -> the peer's sequence we have seen, echoed back as our ack
+        self._ack_sent: Dict[str, int] = {}
+        self._peer_epochs: Dict[str, str] = {}
+        self.stats: Counter = Counter()
+    
+    def _apply(self, node_id: str, entry: Tuple[int, float, float], source: str):
+        self.sequence += 1
+        self.entries[node_id] = entry
+        self._changed_at[node_id] = self.sequence
+        self._source[node_id] = source
+    
+    def set_local(self, consciousness: float, coherence: float):
+        """Publish this node's values under a new version"""
+        current = self.entries.get(self.node_id)
+        self._apply(self.node_id, (current[0] + 1 if current else 1, consciousness, coherence), self.node_id)
+    
+    def merge(self, entries: Dict[str, List[Any]], source: str) -> int:
+        """Join remote entries into the local state; returns how many entries changed"""
+        changed = 0
+        for node_id, (version, consciousness, coherence) in entries.items():
+            entry = (int(version), float(consciousness), float(coherence))
+            current = self.entries.get(node_id)
+            if current is not None and entry <= current:
+                continue
+            if node_id == self.node_id:
+                # An older incarnation of this node published higher versions; reassert ours above them
+                if current is not None:
+                    self._apply(node_id, (entry[0] + 1, current[1], current[2]), self.node_id)
+                continue
+            self._apply(node_id, entry, source)
+            changed += 1
+        self.stats["entries_merged"] += changed
+        return changed
+    
+    def delta_for(self, peer_id: str) -> Dict[str, Tuple[int, float, float]]:
+        """Entries changed since the peer's last acknowledgment that the peer did not send us"""
+        since = self.acked.get(peer_id, 0)
+        return {node_id: entry for node_id, entry in self.entries.items()
+                if self._changed_at[node_id] > since and self._source[node_id] != peer_id}
+    
+    def payload_for(self, peer_id: str) -> Optional[Dict[str, Any]]:
+        """Sync payload for a peer, or None when it has nothing new and is owed no acknowledgment"""
+        delta = self.delta_for(peer_id)
+        ack = self.received.get(peer_id, 0)
+        if not delta and ack <= self._ack_sent.get(peer_id, 0):
+            self.stats["syncs_skipped"] += 1
+            return None
+        self._ack_sent[peer_id] = ack
+        self.stats["deltas_sent"] += 1
+        self.stats["entries_sent"] += len(delta)
+        return {"epoch": self.epoch, "sequence": self.sequence, "ack": ack,
+                "entries": {node_id: list(entry) for node_id, entry in delta.items()}}
+    
+    def receive(self, peer_id: str, payload: Dict[str, Any]) -> int:
+        """Merge a peer's delta and record what each side has acknowledged"""
+        epoch = payload.get("epoch", "")
+        if self._peer_epochs.get(peer_id) != epoch:
+            # New peer or a restarted one: neither side's acknowledgments carry over, and entries it
+            # once sent us are no longer known to be on its side
+            self._peer_epochs[peer_id] = epoch
+            self.acked[peer_id] = 0
+            self.received[peer_id] = 0
+            self._ack_sent.pop(peer_id, None)
+            for node_id, source in self._source.items():
+                if source == peer_id:
+                    self._source[node_id] = self.node_id
+        
+        changed = self.merge(payload.get("entries", {}), peer_id)
+        if payload.get("entries"):
+            # The peer is still sending entries, so our last acknowledgment may have been lost; owe another
+            self._ack_sent.pop(peer_id, None)
+        self.received[peer_id] = max(self.received.get(peer_id, 0), int(payload.get("sequence", 0)))
+        self.acked[peer_id] = max(self.acked.get(peer_id, 0), int(payload.get("ack", 0)))
+        return changed
+    
+    def send_failed(self, peer_id: str):
+        """A payload never reached the peer, so the acknowledgment it carried is still owed"""
+        self._ack_sent.pop(peer_id, None)
+    
+    def forget_peer(self, peer_id: str):
+        for table in (self.acked, self.received, self._ack_sent, self._peer_epochs):
+            table.pop(peer_id, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get replica statistics"""
+        return {"entries": len(self.entries), "sequence": self.sequence, **self.stats}
+
+class MessageMetrics:
+    """Per-type message counters, handler latency histograms and per-peer connect latency"""
+    
+    # Histogram upper bounds in seconds; observations above the last bound land in an overflow slot
+    LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self):
+        self.messages_in: Counter = Counter()
+        self.messages_out: Counter = Counter()
+        self.bytes_in: Counter = Counter()
+        self.bytes_out: Counter = Counter()
+        self.errors: Counter = Counter()  # keyed by (message type, stage)
+        self.handler_histograms: Dict[str, List[int]] = {}
+        self.handler_seconds: Counter = Counter()
+        self.connects: Counter = Counter()
+        self.connect_seconds: Counter = Counter()
+        self.connect_max: Dict[str, float] = {}
+    
+    def record_in(self, message_type: MessageType, size: int):
+        self.messages_in[message_type.value] += 1
+        self.bytes_in[message_type.value] += size
+    
+    def record_out(self, message_type: MessageType, size: int):
+        self.messages_out[message_type.value] += 1
+        self.bytes_out[message_type.value] += size
+    
+    def record_error(self, message_type: MessageType, stage: str):
+        self.errors[(message_type.value, stage)] += 1
+    
+    def observe_handler(self, message_type: MessageType, seconds: float):
+        histogram = self.handler_histograms.get(message_type.value)
+        if histogram is None:
+            histogram = self.handler_histograms[message_type.value] = [0] * (len(self.LATENCY_BUCKETS) + 1)
+        histogram[bisect.bisect_left(self.LATENCY_BUCKETS, seconds)] += 1
+        self.handler_seconds[message_type.value] += seconds
+    
+    def observe_connect(self, peer_id: str, seconds: float):
+        self.connects[peer_id] += 1
+        self.connect_seconds[peer_id] += seconds
+        self.connect_max[peer_id] = max(self.connect_max.get(peer_id, 0.0), seconds)
+    
+    def forget_peer(self, peer_id: str):
+        for table in (self.connects, self.connect_seconds, self.connect_max):
+            table.pop(peer_id, None)
+    
+    @property
+    def total(self) -> int:
+        """Messages received plus messages sent"""
+        return sum(self.messages_in.values()) + sum(self.messages_out.values())
+    
+    def _quantile(self, histogram: List[int], fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given quantile (None in the overflow slot)"""
+        target = fraction * sum(histogram)
+        cumulative = 0
+        for bound, count in zip(self.LATENCY_BUCKETS, histogram):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get message and latency statistics"""
+        types = {}
+        for type_name in sorted(set(self.messages_in) | set(self.messages_out) | set(self.handler_histograms)):
+            histogram = self.handler_histograms.get(type_name)
+            calls = sum(histogram) if histogram else 0
+            p50 = self._quantile(histogram, 0.50) if calls else None
+            p99 = self._quantile(histogram, 0.99) if calls else None
+            types[type_name] = {
+                "in": self.messages_in[type_name],
+                "out": self.messages_out[type_name],
+                "bytes_in": self.bytes_in[type_name],
+                "bytes_out": self.bytes_out[type_name],
+                "errors": {stage: count for (error_type, stage), count in self.errors.items() if error_type == type_name},
+                "handler_calls": calls,
+                "handler_mean_ms": self.handler_seconds[type_name] / calls * 1000 if calls else None,
+                "handler_p50_ms": p50 * 1000 if p50 is not None else None,
+                "handler_p99_ms": p99 * 1000 if p99 is not None else None
+            }
+        return {
+            "total": self.total,
+            "by_type": types,
+            "connect_ms": {peer_id: {"count": count,
+                                     "mean": self.connect_seconds[peer_id] / count * 1000,
+                                     "max": self.connect_max[peer_id] * 1000}
+                           for peer_id, count in self.connects.items()}
+        }
+    
+    @staticmethod
+    def _label_value(value: str) -> str:
+        """Escape a label value as the text exposition format requires; node and peer ids come off the wire"""
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    
+    def to_prometheus(self, node_id: str, gauges: Dict[str, Any]) -> str:
+        """Render counters, histograms and the given gauges in the Prometheus text exposition format"""
+        node = self._label_value(node_id)
+        lines = ["# TYPE dna_qnet_messages_total counter"]
+        for direction, table in (("in", self.messages_in), ("out", self.messages_out)):
+            lines.extend(f'dna_qnet_messages_total{{node="{node}",direction="{direction}",type="{type_name}"}} {count}'
+                         for type_name, count in table.items())
+        lines.append("# TYPE dna_qnet_message_bytes_total counter")
+        for direction, table in (("in", self.bytes_in), ("out", self.bytes_out)):
+            lines.extend(f'dna_qnet_message_bytes_total{{node="{node}",direction="{direction}",type="{type_name}"}} {count}'
+                         for type_name, count in table.items())
+        lines.append("# TYPE dna_qnet_message_errors_total counter")
+        lines.extend(f'dna_qnet_message_errors_total{{node="{node}",type="{type_name}",stage="{stage}"}} {count}'
+                     for (type_name, stage), count in self.errors.items())
+        
+        lines.append("# TYPE dna_qnet_handler_seconds histogram")
+        for type_name, histogram in self.handler_histograms.items():
+            labels = f'node="{node}",type="{type_name}"'
+            cumulative = 0
+            for bound, count in zip(self.LATENCY_BUCKETS, histogram):
+                cumulative += count
+                lines.append(f'dna_qnet_handler_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'dna_qnet_handler_seconds_bucket{{{labels},le="+Inf"}} {sum(histogram)}')
+            lines.append(f'dna_qnet_handler_seconds_sum{{{labels}}} {self.handler_seconds[type_name]}')
+            lines.append(f'dna_qnet_handler_seconds_count{{{labels}}} {sum(histogram)}')
+        
+        lines.append("# TYPE dna_qnet_peer_connect_seconds summary")
+        for peer_id, count in self.connects.items():
+            labels = f'node="{node}",peer="{self._label_value(peer_id)}"'
+            lines.append(f'dna_qnet_peer_connect_seconds_sum{{{labels}}} {self.connect_seconds[peer_id]}')
+            lines.append(f'dna_qnet_peer_connect_seconds_count{{{labels}}} {count}')
+        
+        for name, value in gauges.items():
+            lines.append(f"# TYPE dna_qnet_{name} gauge")
+            if isinstance(value, dict):
+                lines.extend(f'dna_qnet_{name}{{node="{node}",peer="{self._label_value(peer_id)}"}} {peer_value}'
+                             for peer_id, peer_value in value.items())
+            else:
+                lines.append(f'dna_qnet_{name}{{node="{node}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+class DatagramChannel(asyncio.DatagramProtocol):
+    """UDP endpoint that hands received datagrams to its node"""
+    
+    def __init__(self, node: "DNAQNetNode"):
+        self.node = node
+    
+    def datagram_received(self, data: bytes, address: Tuple[str, int]):
+        self.node._handle_datagram(data, address)
+    
+    def error_received(self, exc: Exception):
+        logger.debug(f"Datagram channel error: {exc}")
+
+class PeerPayloadCompressor:
+    """Per-peer zlib payload compression with a preset dictionary trained from observed traffic"""
+    
+    def __init__(self, peer_id: str, min_size: int = 256, level: int = 6,
+                 dictionary_size: int = 16 * 1024, training_samples: int = 64):
+        self.peer_id = peer_id
+        self.min_size = min_size
+        self.level = level
+        self.dictionary_size = dictionary_size
+        self.training_samples = training_samples
+        
+        # Outbound dictionary: trained from samples, pending until the peer acknowledges it
+        self._samples: List[bytes] = []
+        self.dictionary: Optional[bytes] = None
+        self.dictionary_id: Optional[str] = None
+        self.pending_dictionary: Optional[bytes] = None
+        self.dictionary_in_flight = False
+        
+        # Inbound dictionaries shipped to us by the peer
+        self.remote_dictionaries: Dict[str, bytes] = {}
+        
+        # Compression statistics
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.compress_seconds = 0.0
+        self.decompress_seconds = 0.0
+        self.messages_compressed = 0
+        self.messages_skipped = 0
+    
+    @staticmethod
+    def dictionary_id_for(dictionary: bytes) -> str:
+        """Stable identifier for a dictionary"""
+        return hashlib.sha256(dictionary).hexdigest()[:16]
+    
+    def train(self) -> bytes:
+        """Build a dictionary from distinct samples, newest last since zlib favours nearby matches"""
+        dictionary = bytearray()
+        seen = set()
+        for sample in reversed(self._samples):
+            if sample in seen:
+                continue
+            seen.add(sample)
+            dictionary[:0] = sample
+            if len(dictionary) >= self.dictionary_size:
+                break
+        return bytes(dictionary[-self.dictionary_size:])
+    
+    def observe(self, data: bytes):
+        """Collect a training sample until a dictionary has been trained"""
+        if self.dictionary is not None or self.pending_dictionary is not None:
+            return
+        self._samples.append(data)
+        if len(self._samples) >= self.training_samples:
+            self.pending_dictionary = self.train()
+            self._samples = []
+    
+    def activate(self, dictionary: bytes):
+        """Start compressing with a dictionary the peer has acknowledged"""
+        self.dictionary = dictionary
+        self.dictionary_id = self.dictionary_id_for(dictionary)
+        self.pending_dictionary = None
+    
+    def compress(self, data: bytes) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Compress a payload, or None when it is too small or would not shrink"""
+        if len(data) < self.min_size:
+            self.messages_skipped += 1
+            return None
+        
+        started = time.perf_counter()
+        if self.dictionary is not None:
+            compressor = zlib.compressobj(self.level, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(self.level)
+        compressed = compressor.compress(data) + compressor.flush()
+        self.compress_seconds += time.perf_counter() - started
+        
+        if len(compressed) >= len(data):
+            self.messages_skipped += 1
+            return None
+        
+        self.raw_bytes += len(data)
+        self.compressed_bytes += len(compressed)
+        self.messages_compressed += 1
+        return compressed, self.dictionary_id
+    
+    def decompress(self, data: bytes, dictionary_id: Optional[str]) -> bytes:
+        """Decompress a payload from the peer; raises KeyError for an unknown dictionary"""
+        started = time.perf_counter()
+        if dictionary_id:
+            decompressor = zlib.decompressobj(zdict=self.remote_dictionaries[dictionary_id])
+        else:
+            decompressor = zlib.decompressobj()
+        decompressed = decompressor.decompress(data) + decompressor.flush()
+        self.decompress_seconds += time.perf_counter() - started
+        return decompressed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get compression statistics for this peer"""
+        return {
+            "ratio": self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 1.0,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "messages_compressed": self.messages_compressed,
+            "messages_skipped": self.messages_skipped,
+            "compress_cpu_ms": self.compress_seconds * 1000,
+            "decompress_cpu_ms": self.decompress_seconds * 1000,
+            "dictionary_id": self.dictionary_id
+        }
+
+class PeerTable:
+    """Indexed peer table with a liveness heap, capability index and trust ordering"""
+    
+    def __init__(self):
+        self._peers: Dict[str, DNAQNetPeer] = {}
+        
+        # Min-heap of (last_seen, peer_id). Entries are refreshed lazily: when an entry
+        # reaches the top and the peer has been seen since, it is pushed back with the
+        # newer timestamp, so plain assignments to peer.last_seen stay valid.
+        self._liveness: List[Tuple[float, str]] = []
+        self._liveness_entry: Dict[str, float] = {}
+        
+        self._by_capability: Dict[str, Set[str]] = {}
+        
+        # Ascending (trust_score, peer_id) list kept sorted with bisect, plus the score
+        # each peer was indexed under
+        self._by_trust: List[Tuple[float, str]] = []
+        self._trust_entry: Dict[str, float] = {}
+        
+        # Ids of peers added, replaced, removed or re-indexed since the last drain (snapshots only)
+        self.track_changes = False
+        self._changed: Set[str] = set()
+    
+    # Mapping interface
+    def __getitem__(self, peer_id: str) -> DNAQNetPeer:
+        return self._peers[peer_id]
+    
+    def __setitem__(self, peer_id: str, peer: DNAQNetPeer):
+        self.add(peer)
+    
+    def __contains__(self, peer_id: object) -> bool:
+        return peer_id in self._peers
+    
+    def __len__(self) -> int:
+        return len(self._peers)
+    
+    def __iter__(self):
+        return iter(self._peers)
+    
+    def get(self, peer_id: str, default: Optional[DNAQNetPeer] = None) -> Optional[DNAQNetPeer]:
+        return self._peers.get(peer_id, default)
+    
+    def keys(self):
+        return self._peers.keys()
+    
+    def values(self):
+        return self._peers.values()
+    
+    def items(self):
+        return self._peers.items()
+    
+    def add(self, peer: DNAQNetPeer):
+        """Insert or replace a peer and index it"""
+        if peer.peer_id in self._peers:
+            self._unindex(self._peers[peer.peer_id])
+        self._peers[peer.peer_id] = peer
+        self.mark_changed(peer.peer_id)
+        
+        entry_time = self._liveness_entry.get(peer.peer_id)
+        if entry_time is None or peer.last_seen < entry_time:
+            self._push_liveness(peer.peer_id, peer.last_seen)
+        
+        for capability in peer.capabilities:
+            self._by_capability.setdefault(capability, set()).add(peer.peer_id)
+        self._insert_trust(peer.peer_id, peer.trust_score)
+    
+    def remove(self, peer_id: str) -> Optional[DNAQNetPeer]:
+        """Remove a peer and its index entries"""
+        peer = self._peers.pop(peer_id, None)
+        if peer is None:
+            return None
+        
+        self._unindex(peer)
+        self._liveness_entry.pop(peer_id, None)
+        self.mark_changed(peer_id)
+        
+        # Stale heap entries are skipped lazily; compact once they dominate the heap
+        if len(self._liveness) > 2 * len(self._peers) + 64:
+            self._liveness = [(entry_time, entry_id) for entry_id, entry_time in self._liveness_entry.items()]
+            heapq.heapify(self._liveness)
+        return peer
+    
+    def _unindex(self, peer: DNAQNetPeer):
+        """Drop a peer from the capability and trust indexes"""
+        for capability in peer.capabilities:
+            holders = self._by_capability.get(capability)
+            if holders:
+                holders.discard(peer.peer_id)
+                if not holders:
+                    del self._by_capability[capability]
+        
+        self._remove_trust(peer.peer_id)
+    
+    def _insert_trust(self, peer_id: str, trust_score: float):
+        """Insert a peer into the trust ordering"""
+        self._trust_entry[peer_id] = trust_score
+        bisect.insort(self._by_trust, (trust_score, peer_id))
+    
+    def _remove_trust(self, peer_id: str):
+        """Remove a peer from the trust ordering"""
+        trust_score = self._trust_entry.pop(peer_id, None)
+        if trust_score is None:
+            return
+        index = bisect.bisect_left(self._by_trust, (trust_score, peer_id))
+        if index < len(self._by_trust) and self._by_trust[index] == (trust_score, peer_id):
+            del self._by_trust[index]
+    
+    def _push_liveness(self, peer_id: str, last_seen: float):
+        """Push the canonical liveness heap entry for a peer"""
+        self._liveness_entry[peer_id] = last_seen
+        heapq.heappush(self._liveness, (last_seen, peer_id))
+    
+    def touch(self, peer_id: str, timestamp: Optional[float] = None):
+        """Mark a peer as seen"""
+        peer = self._peers.get(peer_id)
+        if peer:
+            peer.last_seen = timestamp if timestamp is not None else time.time()
+    
+    def set_trust(self, peer_id: str, trust_score: float):
+        """Update a peer's trust score and its position in the trust ordering"""
+        peer = self._peers.get(peer_id)
+        if peer is None:
+            return
+        self._remove_trust(peer_id)
+        peer.trust_score = trust_score
+        self._insert_trust(peer_id, trust_score)
+        self.mark_changed(peer_id)
+    
+    def set_capabilities(self, peer_id: str, capabilities: List[str]):
+        """Replace a peer's capabilities and reindex it"""
+        peer = self._peers.get(peer_id)
+        if peer:
+            self._unindex(peer)
+            peer.capabilities = list(capabilities)
+            self.add(peer)
+    
+    def mark_changed(self, peer_id: str):
+        """Record that a peer's persistent state changed"""
+        if self.track_changes:
+            self._changed.add(peer_id)
+    
+    def drain_changed(self) -> Set[str]:
+        """Ids changed since the previous drain"""
+        changed, self._changed = self._changed, set()
+        return changed
+    
+    def pending_changes(self) -> int:
+        return len(self._changed)
+    
+    def stale_peers(self, max_age: float, now: Optional[float] = None) -> List[DNAQNetPeer]:
+        """Peers not seen within max_age seconds, in O(k log n) for k stale or refreshed entries"""
+        cutoff = (now if now is not None else time.time()) - max_age
+        stale = []
+        while self._liveness and self._liveness[0][0] < cutoff:
+            entry_time, peer_id = heapq.heappop(self._liveness)
+            if self._liveness_entry.get(peer_id) != entry_time:
+                continue  # superseded or removed entry
+            
+            peer = self._peers[peer_id]
+            if peer.last_seen >= cutoff:
+                self._push_liveness(peer_id, peer.last_seen)
+            else:
+                stale.append(peer)
+        
+        # Stale peers keep their canonical entries
+        for peer in stale:
+            heapq.heappush(self._liveness, (self._liveness_entry[peer.peer_id], peer.peer_id))
+        return stale
+    
+    def expire(self, max_age: float, now: Optional[float] = None) -> List[DNAQNetPeer]:
+        """Remove and return peers not seen within max_age seconds"""
+        expired = self.stale_peers(max_age, now)
+        for peer in expired:
+            self.remove(peer.peer_id)
+        return expired
+    
+    def with_capability(self, capability: str) -> List[DNAQNetPeer]:
+        """Peers advertising a capability"""
+        return [self._peers[peer_id] for peer_id in self._by_capability.get(capability, ())]
+    
+    def top_by_trust(self, k: int) -> List[DNAQNetPeer]:
+        """The k most trusted peers, highest first"""
+        return [self._peers[peer_id] for _, peer_id in reversed(self._by_trust[-k:])] if k > 0 else []
+
+class PhiAccrualFailureDetector:
+    """Phi-accrual failure detector over per-peer heartbeat inter-arrival times"""
+    
+    def __init__(self, threshold: float = 8.0, window_size: int = 100,
+                 min_std_deviation: float = 0.5, first_heartbeat_estimate: float = 30.0):
+        self.threshold = threshold
+        self.window_size = window_size
+        self.min_std_deviation = min_std_deviation
+        self.first_heartbeat_estimate = first_heartbeat_estimate
+        
+        # Sliding window of intervals per peer with running sums for O(1) mean/variance
+        self._intervals: Dict[str, deque] = {}
+        self._interval_sum: Dict[str, float] = {}
+        self._interval_squares: Dict[str, float] = {}
+        self._last_arrival: Dict[str, float] = {}
+        self._announced_interval: Dict[str, float] = {}
+    
+    def _reset(self, peer_id: str, expected_interval: float):
+        """Seed a peer's history around an expected interval"""
+        std_deviation = expected_interval / 4
+        self._intervals[peer_id] = deque()
+        self._interval_sum[peer_id] = 0.0
+        self._interval_squares[peer_id] = 0.0
+        self._add_interval(peer_id, expected_interval - std_deviation)
+        self._add_interval(peer_id, expected_interval + std_deviation)
+    
+    def _add_interval(self, peer_id: str, interval: float):
+        """Append an interval, evicting the oldest beyond the window"""
+        intervals = self._intervals[peer_id]
+        intervals.append(interval)
+        self._interval_sum[peer_id] += interval
+        self._interval_squares[peer_id] += interval * interval
+        if len(intervals) > self.window_size:
+            evicted = intervals.popleft()
+            self._interval_sum[peer_id] -= evicted
+            self._interval_squares[peer_id] -= evicted * evicted
+    
+    def heartbeat(self, peer_id: str, now: Optional[float] = None, expected_interval: Optional[float] = None):
+        """Record a heartbeat arrival; a changed announced interval re-seeds the history"""
+        now = now if now is not None else time.time()
+        
+        if expected_interval:
+            previous = self._announced_interval.get(peer_id)
+            self._announced_interval[peer_id] = expected_interval
+            if previous is None or abs(expected_interval - previous) > previous / 2:
+                self._reset(peer_id, expected_interval)
+                self._last_arrival[peer_id] = now
+                return
+        
+        last_arrival = self._last_arrival.get(peer_id)
+        if peer_id not in self._intervals:
+            self._reset(peer_id, expected_interval or self.first_heartbeat_estimate)
+        elif last_arrival is not None:
+            self._add_interval(peer_id, now - last_arrival)
+        self._last_arrival[peer_id] = now
+    
+    def statistics(self, peer_id: str) -> Tuple[float, float, int]:
+        """Mean, standard deviation and sample count of a peer's intervals"""
+        intervals = self._intervals.get(peer_id)
+        if not intervals:
+            return self.first_heartbeat_estimate, self.first_heartbeat_estimate / 4, 0
+        count = len(intervals)
+        mean = self._interval_sum[peer_id] / count
+        variance = max(0.0, self._interval_squares[peer_id] / count - mean * mean)
+        return mean, max(math.sqrt(variance), self.min_std_deviation), count
+    
+    def phi(self, peer_id: str, now: Optional[float] = None) -> float:
+        """Suspicion level: -log10 of the probability a heartbeat is still on its way"""
+        last_arrival = self._last_arrival.get(peer_id)
+        if last_arrival is None:
+            return 0.0
+        
+        elapsed = (now if now is not None else time.time()) - last_arrival
+        mean, std_deviation, _ = self.statistics(peer_id)
+        
+        # Logistic approximation of the normal CDF, clamped to keep exp() in range
+        y = max(-20.0, min(20.0, (elapsed - mean) / std_deviation))
+        e = math.exp(-y * (1.5976 + 0.070566 * y * y))
+        if elapsed > mean:
+            return -math.log10(e / (1.0 + e))
+        return -math.log10(1.0 - 1.0 / (1.0 + e))
+    
+    def is_available(self, peer_id: str, now: Optional[float] = None) -> bool:
+        """Whether a peer's suspicion level is below the threshold"""
+        return self.phi(peer_id, now) < self.threshold
+    
+    def remove(self, peer_id: str):
+        """Forget a peer"""
+        self._intervals.pop(peer_id, None)
+        self._interval_sum.pop(peer_id, None)
+        self._interval_squares.pop(peer_id, None)
+        self._last_arrival.pop(peer_id, None)
+        self._announced_interval.pop(peer_id, None)
+
+PEER_SELECTION_MODES = ("p2c", "weighted", "random")
+
+class PeerLatencyTracker:
+    """EWMA round-trip time and error rate per peer, and latency-aware choice among candidate peers"""
+    
+    def __init__(self, alpha: float = 0.2, error_alpha: float = 0.1, initial_rtt: float = 0.05,
+                 failure_penalty: float = 5.0):
+        self.alpha = alpha
+        self.error_alpha = error_alpha
+        # What a failed exchange costs before it can be retried elsewhere (the send deadline)
+        self.failure_penalty = failure_penalty
+        # Peers without samples are costed optimistically so new peers get tried
+        self.initial_rtt = initial_rtt
+        
+        self.rtt: Dict[str, float] = {}
+        self.rtt_deviation: Dict[str, float] = {}
+        self.error_rate: Dict[str, float] = {}
+        self.samples: Counter = Counter()
+        self.errors: Counter = Counter()
+    
+    def observe_rtt(self, peer_id: str, seconds: float):
+        """Fold a round-trip sample into the peer's smoothed RTT and mean deviation (as TCP's SRTT/RTTVAR)"""
+        seconds = max(0.0, seconds)
+        rtt = self.rtt.get(peer_id)
+        if rtt is None:
+            self.rtt[peer_id] = seconds
+            self.rtt_deviation[peer_id] = seconds / 2
+        else:
+            self.rtt_deviation[peer_id] += self.alpha * (abs(seconds - rtt) - self.rtt_deviation[peer_id])
+            self.rtt[peer_id] = rtt + self.alpha * (seconds - rtt)
+        self.samples[peer_id] += 1
+        self.observe_success(peer_id)
+    
+    def observe_success(self, peer_id: str):
+        """An exchange with the peer completed"""
+        error_rate = self.error_rate.get(peer_id)
+        if error_rate:
+            self.error_rate[peer_id] = error_rate * (1.0 - self.error_alpha)
+    
+    def observe_error(self, peer_id: str):
+        """An exchange with the peer failed or went unanswered"""
+        error_rate = self.error_rate.get(peer_id, 0.0)
+        self.error_rate[peer_id] = error_rate + self.error_alpha * (1.0 - error_rate)
+        self.errors[peer_id] += 1
+    
+    def cost(self, peer_id: str) -> float:
+        """Expected seconds to a successful exchange: RTT plus deviation, plus the failure penalty for each
+        failed attempt expected at the peer's error rate before one succeeds"""
+        rtt = self.rtt.get(peer_id)
+        expected = self.initial_rtt if rtt is None else rtt + self.rtt_deviation[peer_id]
+        error_rate = min(self.error_rate.get(peer_id, 0.0), 0.99)
+        return expected + error_rate / (1.0 - error_rate) * self.failure_penalty
+    
+    def best(self, candidates: Iterable[str]) -> Optional[str]:
+        """The cheapest candidate, deterministic so a stream of messages stays on one path"""
+        return min(candidates, key=lambda peer_id: (self.cost(peer_id), peer_id), default=None)
+    
+    def select(self, candidates: List[str], count: int, exclude: Set[str] = frozenset(), mode: str = "p2c",
+               rng: Optional[random.Random] = None, uniform: int = 0) -> List[str]:
+        """Up to count distinct candidates outside exclude: uniform picks for the first `uniform`, then
+        two-choice picks or inverse-cost weighted sampling from a uniform oversample ("random" is all uniform)"""
+        rng = rng or random
+        # The oversample keeps the cost at O(count) however large the peer table
+        sample = select_gossip_targets(candidates, count * 4, exclude, rng)
+        if mode == "random" or uniform >= count:
+            return sample[:count]
+        picked, sample = sample[:uniform], sample[uniform:]
+        
+        if mode == "weighted":
+            # Efraimidis-Spirakis: the largest u^(1/w) keys are a weighted sample without replacement
+            keyed = ((rng.random() ** self.cost(peer_id), peer_id) for peer_id in sample)
+            return picked + [peer_id for _, peer_id in heapq.nlargest(count - len(picked), keyed)]
+        
+        while sample and len(picked) < count:
+            first = rng.randrange(len(sample))
+            second = rng.randrange(len(sample))
+            if self.cost(sample[second]) < self.cost(sample[first]):
+                first = second
+            picked.append(sample[first])
+            sample[first] = sample[-1]
+            sample.pop()
+        return picked
+    
+    def forget(self, peer_id: str):
+        for table in (self.rtt, self.rtt_deviation, self.error_rate, self.samples, self.errors):
+            table.pop(peer_id, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        rtts = sorted(self.rtt.values())
+        return {
+            "tracked_peers": len(self.rtt),
+            "rtt_samples": sum(self.samples.values()),
+            "errors": sum(self.errors.values()),
+            "median_rtt_ms": rtts[len(rtts) // 2] * 1000 if rtts else None,
+            "slowest": {peer_id: {"rtt_ms": round(self.rtt[peer_id] * 1000, 3),
+                                  "error_rate": round(self.error_rate.get(peer_id, 0.0), 3)}
+                        for peer_id in heapq.nlargest(5, self.rtt, key=self.cost)}
+        }
+
+class KeyRotationScheduler:
+    """Heap of key deadlines so rotation wakes only when a successor or swap is due"""
+    
+    PREFETCH = 0
+    ROTATE = 1
+    
+    def __init__(self, prefetch_lead: float = 30.0):
+        self.prefetch_lead = prefetch_lead
+        self._heap: List[Tuple[float, int, str, str]] = []  # (due_time, action, peer_id, key_id)
+        self.wakeup = asyncio.Event()
+    
+    def schedule(self, peer_id: str, quantum_key: QuantumKey):
+        """Schedule successor generation ahead of expiry and the swap at expiry"""
+        earliest = self._heap[0][0] if self._heap else None
+        prefetch_time = max(quantum_key.creation_time, quantum_key.expiry_time - self.prefetch_lead)
+        heapq.heappush(self._heap, (prefetch_time, self.PREFETCH, peer_id, quantum_key.key_id))
+        heapq.heappush(self._heap, (quantum_key.expiry_time, self.ROTATE, peer_id, quantum_key.key_id))
+        if earliest is None or prefetch_time < earliest:
+            self.wakeup.set()
+    
+    def next_due(self) -> Optional[float]:
+        """Time of the earliest scheduled action"""
+        return self._heap[0][0] if self._heap else None
+    
+    def pop_due(self, now: float) -> List[Tuple[int, str, str]]:
+        """Pop all actions due at or before now"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, action, peer_id, key_id = heapq.heappop(self._heap)
+            due.append((action, peer_id, key_id))
+        return due
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+
+class DNAQNetNode:
+    """DNA-QNet network node implementation"""
+    
+    COMPRESSION_CAPABILITY = "payload_compression"
+    MUX_CAPABILITY = "stream_mux"
+    REPLAY_CAPABILITY = "replay_guard"
+    LATENCY_CAPABILITY = "rtt_probe"
+    SEALED_KEY_WAIT = 1.0  # how long a record sealed under a key still being announced is held
+    RETIRED_SEAL_KEYS = 2  # rotated-out keys per peer whose in-flight records are still accepted
+    CONSCIOUSNESS_PUBLISH_STEP = 0.001  # smallest change of our own values worth a new CRDT version
+    
+    def __init__(self, node_id: str, ip_address: str = "0.0.0.0", port: int = 7777,
+                 batch_max_bytes: int = 64 * 1024, batch_max_delay: float = 0.005,
+                 broadcast_concurrency: int = 256, peer_send_timeout: float = 5.0,
+                 broadcast_mode: str = "direct", gossip_fanout: int = 4, gossip_rounds: int = 8,
+                 dedup_window: float = 300.0, dedup_capacity: int = 1000000,
+                 dedup_false_positive_rate: float = 1e-6,
+                 send_queue_limits: Optional[Dict[SendPriority, int]] = None,
+                 send_queue_policy: str = "drop", send_block_timeout: float = 1.0,
+                 peer_expiry: float = 300.0, phi_threshold: float = 8.0,
+                 heartbeat_interval: float = 30.0, heartbeat_max_interval: float = 240.0,
+                 key_prefetch_lead: float = 30.0, entropy_pool_bytes: int = 1 << 20,
+                 signature_scheme: str = QuantumCryptographyEngine.HMAC_SIGNATURE,
+                 payload_compression: bool = True, compression_min_bytes: int = 256,
+                 topology: NetworkTopology = NetworkTopology.MESH, hub_count: int = 3,
+                 dht_k: int = 20, dht_alpha: int = 3, dht_refresh_interval: float = 600.0,
+                 udp_channel: bool = True, decode_workers: int = 0, decode_offload_bytes: int = 256 * 1024,
+                 metrics_port: Optional[int] = None, stream_chunk_bytes: int = 64 * 1024, stream_window: int = 8,
+                 max_transfer_bytes: int = 1 << 30, transfer_expiry: float = 300.0, sync_interval: float = 120.0,
+                 worker_index: int = 0, shared_store: Optional[str] = None, reuse_port: bool = False,
+                 outbox_dir: Optional[str] = None, outbox_ttl: float = 3600.0, outbox_max_bytes: int = 64 << 20,
+                 outbox_segment_bytes: int = 1 << 20, outbox_sync_interval: float = 0.01, multiplex: bool = True,
+                 replay_window: int = 1024, replay_max_skew: float = 60.0, snapshot_dir: Optional[str] = None,
+                 snapshot_interval: float = 5.0, snapshot_batch: int = 1000, peer_selection: str = "p2c",
+                 rtt_alpha: float = 0.2):
+        self.node_id = node_id
+        self.ip_address = ip_address
+        self.port = port
+        self.entropy_pool = EntropyPool(capacity_bytes=entropy_pool_bytes) if entropy_pool_bytes > 0 else None
+        self.quantum_engine = QuantumCryptographyEngine(entropy_pool=self.entropy_pool)
+        
+        # Key rotation: deadlines on a heap, successors generated ahead of expiry
+        # in the executor so the swap itself is O(1)
+        self.key_scheduler = KeyRotationScheduler(prefetch_lead=key_prefetch_lead)
+        self.successor_keys: Dict[str, QuantumKey] = {}
+        # First-key requests in flight per peer, shared by concurrent sends. A first key is generated by
+        # the peer asked for it and returned wrapped under the request's Diffie-Hellman secret
+        self._pending_keys: Dict[str, asyncio.Future] = {}
+        self._key_requests: Dict[str, Tuple[int, int, asyncio.Future]] = {}  # peer -> our private, public, installed
+        self._key_replies: Dict[str, Tuple[int, bytes]] = {}  # peer -> our public, secret for the answer
+        # A keyed peer may only replace its key with a request MACed under it. An unMACed request is
+        # refused, and answered at most every KEY_PROBE_INTERVAL with a request of our own to the address
+        # on file, so a peer that really lost its key gets a new one and an impostor gets nothing
+        self._key_probes: Dict[str, float] = {}
+        self.key_exchange_stats: Counter = Counter()
+        self.keys_rotated = 0
+        
+        # Organism messages are signed with HMAC-SHA256 over the ciphertext (or the legacy
+        # double SHA-256 over the plaintext); receivers verify whole frames in one batch
+        self.signature_scheme = signature_scheme
+        self.signature_failures = 0
+        self._deferred_verification: Set[str] = set()
+        
+        # Network state
+        self.peers = PeerTable()
+        self.peer_expiry = peer_expiry
+        
+        # Liveness: phi-accrual suspicion removes peers from send paths, and heartbeat
+        # intervals back off per peer while it stays stable
+        self.failure_detector = PhiAccrualFailureDetector(
+            threshold=phi_threshold,
+            first_heartbeat_estimate=heartbeat_interval
+        )
+        self.suspected: Set[str] = set()
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_max_interval = heartbeat_max_interval
+        self._heartbeat_state: Dict[str, List[float]] = {}  # peer_id -> [next_due, interval, streak]
+        self.message_handlers: Dict[MessageType, callable] = {}
+        self.running = False
+        self.server_socket = None
+        
+        # Outbound frame coalescing (one batcher per peer)
+        self.batch_max_bytes = batch_max_bytes
+        self.batch_max_delay = batch_max_delay
+        self.batchers: Dict[str, PeerFrameBatcher] = {}
+        
+        # Bounded per-peer send queues: "drop" rejects when a priority class is full,
+        # "block" waits up to send_block_timeout for room
+        self.send_queue_limits = send_queue_limits or dict(DEFAULT_SEND_QUEUE_LIMITS)
+        self.send_queue_policy = send_queue_policy
+        self.send_block_timeout = send_block_timeout
+        
+        # Broadcast fan-out: cap on concurrent peer sends and per-peer deadline
+        self.broadcast_concurrency = broadcast_concurrency
+        self.peer_send_timeout = peer_send_timeout
+        self._send_slots = asyncio.Semaphore(broadcast_concurrency)
+        
+        # Broadcast dissemination: "direct" sends to every peer, "gossip" forwards to a
+        # random fanout subset with the message ttl used as a hop budget
+        self.broadcast_mode = broadcast_mode
+        self.gossip_fanout = gossip_fanout
+        self.gossip_rounds = gossip_rounds
+        self.gossip_forwarded = 0
+        
+        # Duplicate suppression keyed on message_id
+        self.dedup = MessageDedupFilter(
+            window=dedup_window,
+            capacity=dedup_capacity,
+            false_positive_rate=dedup_false_positive_rate
+        )
+        self.dedup_hits_by_type: Counter = Counter()
+        
+        # Consciousness and quantum state
+        self.consciousness_level = 0.85
+        self.quantum_coherence = 0.90
+        self.capabilities = ["quantum_communication", "smart_contracts", "consciousness_sync"]
+        
+        # Replicated consciousness state; each sync round sends linked peers only unacknowledged changes
+        self.consciousness = ConsciousnessCRDT(node_id)
+        self.consciousness.set_local(self.consciousness_level, self.quantum_coherence)
+        self.sync_interval = sync_interval
+        
+        # Organism payloads are compressed before encryption for peers that advertise
+        # the capability, using a per-peer dictionary trained from our traffic to them
+        self.payload_compression = payload_compression
+        self.compression_min_bytes = compression_min_bytes
+        self.compressors: Dict[str, PeerPayloadCompressor] = {}
+        if payload_compression:
+            self.capabilities.append(self.COMPRESSION_CAPABILITY)
+        
+        # Stream multiplexing: with peers that also support it, all frames and requests share one
+        # persistent connection per direction, as independent credit-controlled streams
+        self.multiplex = multiplex
+        self.mux_connections: Dict[str, MuxConnection] = {}
+        self.inbound_mux: Set[MuxConnection] = set()
+        self._pending_mux: Dict[str, asyncio.Future] = {}
+        if multiplex:
+            self.capabilities.append(self.MUX_CAPABILITY)
+        
+        # Replay protection: records on a keyed link are sealed with a per-(peer, priority lane, key)
+        # sequence number and the send time; receivers drop records outside the clock skew bound or already
+        # seen in the lane's window before parsing, decrypting or verifying anything else. Records sealed
+        # under a key rotated out within the skew bound are still accepted, each key with its own windows
+        self.replay_window = replay_window
+        self.replay_max_skew = replay_max_skew
+        self.replay_windows: Dict[Tuple[str, int, str], ReplayWindow] = {}
+        self._retired_seal_keys: Dict[str, deque] = {}  # peer -> (key, retired at), oldest first
+        self._seal_seq: Dict[Tuple[str, int], Tuple[str, int]] = {}  # (peer, lane) -> key id, last sequence
+        self._replay_lock = threading.Lock()
+        self._key_installed = asyncio.Event()  # set, and replaced, whenever a key is installed
+        self.replay_stats: Counter = Counter()
+        if replay_window > 0:
+            self.capabilities.append(self.REPLAY_CAPABILITY)
+        
+        # Latency-aware peer selection: heartbeat echoes, handshakes and requests feed a per-peer EWMA RTT and
+        # error rate, and gossip fanout and equal-cost next hops prefer cheap peers ("random" turns it off)
+        self.peer_selection = peer_selection
+        self.latency = PeerLatencyTracker(alpha=rtt_alpha, failure_penalty=peer_send_timeout)
+        self._rtt_probes: Dict[str, float] = {}  # peer -> timestamp of the probing heartbeat awaiting its echo
+        self.capabilities.append(self.LATENCY_CAPABILITY)
+        
+        # Topology-aware routing: links are the direct neighbors the topology selects,
+        # other peers are reached through distance-vector next hops
+        self.topology = topology
+        self.routing = RoutingTable(node_id, topology, hub_count)
+        self._routed: Set[str] = set()
+        self._route_changes: Set[str] = set()
+        self._route_flush_pending = False
+        self._connecting: Set[str] = set()
+        self.messages_forwarded = 0
+        self.messages_unroutable = 0
+        
+        # Kademlia peer discovery: any peer_id is found by iterative FIND_NODE lookups
+        self.dht = KademliaTable(node_id, k=dht_k)
+        self.dht_alpha = dht_alpha
+        self.dht_refresh_interval = dht_refresh_interval
+        self.dht_lookups = 0
+        self.dht_lookup_rounds = 0
+        
+        # UDP channel on the node's port for heartbeats and consciousness sync, authenticated
+        # with the peer key; sequence numbers run per (peer, key) through a replay window
+        self.udp_channel = udp_channel
+        self.udp_transport: Optional[asyncio.DatagramTransport] = None
+        self._udp_send_seq: Dict[str, int] = {}
+        self._udp_recv_windows: Dict[str, ReplayWindow] = {}
+        self.udp_stats: Counter = Counter()
+        
+        # Chunked organism transfers: receivers spool verified chunks to disk and ack the contiguous
+        # committed offset; senders keep at most stream_window chunks unacked and resume from that offset
+        self.stream_chunk_bytes = stream_chunk_bytes
+        self.stream_window = stream_window
+        self.max_transfer_bytes = max_transfer_bytes
+        self.transfer_expiry = transfer_expiry
+        self.incoming_transfers: Dict[Tuple[str, str], IncomingTransfer] = {}
+        self.completed_transfers: Dict[Tuple[str, str], Tuple[int, float]] = {}  # size, completion time
+        self.transfer_stats: Counter = Counter()
+        
+        # Store-and-forward: organism messages that fail to send are appended to the peer's outbox log and
+        # replayed in bulk once the peer is reachable; appends wait for one msync shared by all concurrent
+        # writers every outbox_sync_interval
+        self.outbox = OutboxLog(outbox_dir, outbox_segment_bytes, outbox_max_bytes) if outbox_dir else None
+        self.outbox_ttl = outbox_ttl
+        self.outbox_sync_interval = outbox_sync_interval
+        self._outbox_synced: Optional[asyncio.Future] = None
+        self._outbox_replays: Dict[str, asyncio.Task] = {}
+        self._outbox_rerun: Set[str] = set()
+        self.outbox_stats: Counter = Counter()
+        
+        # Warm restart: peers, their current keys, trust and inbound compression dictionaries are restored
+        # from a snapshot at start. Every snapshot_interval the peers changed since the last one are
+        # journaled; once the journal outgrows the base, a new base is written snapshot_batch peers at a time
+        self.snapshots = PeerSnapshotStore(snapshot_dir) if snapshot_dir else None
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_batch = snapshot_batch
+        self.snapshot_stats: Counter = Counter()
+        self._key_originated: Set[str] = set()  # peers whose current key we generated
+        self.peers.track_changes = self.snapshots is not None
+        
+        # Multi-process mode: workers share the port through SO_REUSEPORT. Worker 0 (the primary) owns all
+        # state-changing traffic and publishes peers, keys and routes to the shared store; the others
+        # serve stateless frames from that state and proxy every other frame to the primary over loopback
+        self.worker_index = worker_index
+        self.reuse_port = reuse_port
+        self.shared_store = SharedStateStore(shared_store) if shared_store else None
+        self.proxy_socket: Optional[socket.socket] = None
+        self._primary_proxy_port: Optional[int] = None
+        # Proxied frames are trusted as already checked, so each carries an HMAC under a secret the
+        # primary publishes only through the shared store
+        self._proxy_secret: Optional[bytes] = None
+        self.proxy_auth_failures = 0
+        self._shared_routing: Optional[str] = None
+        self.frames_proxied = 0
+        
+        # Per-type message counters and handler latency, also served as Prometheus text on metrics_port
+        self.metrics = MessageMetrics()
+        self.metrics_port = metrics_port
+        self.metrics_server: Optional[asyncio.AbstractServer] = None
+        
+        # Threading: connection workers block until the event loop has processed their frames, so blocking
+        # work the loop itself offloads (key generation, outbox and snapshot I/O) gets its own pool and can
+        # never queue behind them
+        self.executor = ThreadPoolExecutor(max_workers=10)
+        self.offload_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dna-qnet-offload")
+        
+        # Organism payloads at least decode_offload_bytes long (hex) are verified, decrypted and parsed in
+        # worker processes so they stop holding the GIL that socket threads need; smaller ones stay inline
+        self.decode_workers = decode_workers
+        self.decode_pool = ProcessPoolExecutor(max_workers=decode_workers) if decode_workers > 0 else None
+        self.decode_offload_bytes = decode_offload_bytes
+        self.decode_stats: Counter = Counter()
+        self.network_thread = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Register default message handlers
+        self._register_default_handlers()
+        
+        logger.info(f"DNA-QNet node {node_id} initialized on {ip_address}:{port}")
+    
+    def _register_default_handlers(self):
+        """Register default message handlers"""
+        self.message_handlers[MessageType.HANDSHAKE] = self._handle_handshake
+        self.message_handlers[MessageType.QUANTUM_KEY_EXCHANGE] = self._handle_quantum_key_exchange
+        self.message_handlers[MessageType.ORGANISM_MESSAGE] = self._handle_organism_message
+        self.message_handlers[MessageType.SMART_CONTRACT] = self._handle_smart_contract
+        self.message_handlers[MessageType.CONSCIOUSNESS_SYNC] = self._handle_consciousness_sync
+        self.message_handlers[MessageType.EVOLUTION_EVENT] = self._handle_evolution_event
+        self.message_handlers[MessageType.HEARTBEAT] = self._handle_heartbeat
+        self.message_handlers[MessageType.COMPRESSION_DICTIONARY] = self._handle_compression_dictionary
+        self.message_handlers[MessageType.ROUTE_UPDATE] = self._handle_route_update
+        self.message_handlers[MessageType.FIND_NODE] = self._handle_find_node
+        self.message_handlers[MessageType.TRANSFER_BEGIN] = self._handle_transfer_begin
+        self.message_handlers[MessageType.TRANSFER_CHUNK] = self._handle_transfer_chunk
+    
+    async def start(self):
+        """Start the DNA-QNet node"""
+        self.running = True
+        self.loop = asyncio.get_running_loop()
+        
+        if self.entropy_pool:
+            self.entropy_pool.start()
+        
+        if self.shared_store and self.is_primary:
+            self.shared_store.clear()
+        
+        # Known peers and keys are back before the first frame arrives
+        if self.snapshots and self.is_primary:
+            self._restore_snapshot()
+        
+        # Start network server
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.server_socket.bind((self.ip_address, self.port))
+        self.server_socket.listen(socket.SOMAXCONN)
+        
+        logger.info(f"🌐 DNA-QNet node {self.node_id} listening on {self.ip_address}:{self.port}")
+        
+        # Start network thread
+        self.network_thread = threading.Thread(target=self._network_loop, args=(self.server_socket,), daemon=True)
+        self.network_thread.start()
+        
+        if self.shared_store and self.is_primary:
+            # Loopback listener for frames the other workers proxy to us
+            self.proxy_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.proxy_socket.bind(("127.0.0.1", 0))
+            self.proxy_socket.listen(socket.SOMAXCONN)
+            threading.Thread(target=self._network_loop, args=(self.proxy_socket, True), daemon=True).start()
+            self._proxy_secret = secrets.token_bytes(32)
+            self._share("primary", "proxy", {"port": self.proxy_socket.getsockname()[1], "secret": self._proxy_secret.hex()})
+        
+        if not self.is_primary:
+            # Secondary workers follow the primary's state and leave UDP and periodic work to it
+            asyncio.create_task(self._shared_state_loop())
+            return
+        
+        if self.udp_channel:
+            try:
+                self.udp_transport, _ = await self.loop.create_datagram_endpoint(
+                    lambda: DatagramChannel(self), local_addr=(self.ip_address, self.port))
+            except OSError as e:
+                logger.error(f"UDP channel unavailable, control traffic stays on TCP: {e}")
+        
+        if self.metrics_port:
+            self.metrics_server = await asyncio.start_server(self._serve_metrics, self.ip_address, self.metrics_port)
+            logger.info(f"📊 Metrics available at http://{self.ip_address}:{self.metrics_port}/metrics")
+        
+        # Start periodic tasks
+        asyncio.create_task(self._heartbeat_loop())
+        asyncio.create_task(self._key_rotation_loop())
+        asyncio.create_task(self._consciousness_sync_loop())
+        asyncio.create_task(self._dht_refresh_loop())
+        if self.snapshots:
+            asyncio.create_task(self._snapshot_loop())
+    
+    async def bootstrap(self, seeds: List[Tuple[str, int]]) -> int:
+        """Join through seed nodes, then look up our own id to fill the k-buckets; returns seeds reached"""
+        reached = 0
+        for peer_ip, peer_port in seeds:
+            if await self.connect_to_peer(peer_ip, peer_port):
+                reached += 1
+        
+        if reached:
+            await self._dht_find_node(self.dht.local_id)
+        return reached
+    
+    def _network_loop(self, server_socket: socket.socket, proxied: bool = False):
+        """Main network loop for handling connections"""
+        while self.running:
+            try:
+                client_socket, address = server_socket.accept()
+                logger.debug(f"New connection from {address}")
+                
+                # Handle connection in thread pool
+                self.executor.submit(self._handle_connection, client_socket, address, proxied)
+                
+            except Exception as e:
+                if self.running:
+                    logger.error(f"Network loop error: {e}")
+    
+    def _handle_connection(self, client_socket: socket.socket, address: Tuple[str, int], proxied: bool = False):
+        """Handle incoming connection"""
+        handed_off = False
+        try:
+            if proxied:
+                self._handle_proxied_connection(client_socket)
+                return
+            
+            if self.multiplex and client_socket.recv(FRAME_HEADER.size, socket.MSG_PEEK | socket.MSG_WAITALL) == MUX_PREFACE:
+                # A multiplexed connection lives on the event loop until the peer closes it
+                client_socket.recv(FRAME_HEADER.size)
+                asyncio.run_coroutine_threadsafe(self._serve_mux(client_socket, address), self.loop)
+                handed_off = True
+                return
+            
+            # Receive frame (a single message or a batch of messages)
+            frame = self._receive_frame(client_socket)
+            for response_data in self._handle_frame(frame, address, proxied):
+                self._write_frame(client_socket, [FRAME_HEADER.pack(len(response_data)), response_data])
+        
+        except Exception as e:
+            logger.error(f"Connection handling error: {e}")
+        finally:
+            if not handed_off:
+                client_socket.close()
+    
+    def _handle_proxied_connection(self, client_socket: socket.socket):
+        """Handle a frame a secondary worker proxied to us, after checking its HMAC under the proxy secret"""
+        tag = self._receive_exact(client_socket, PROXY_TAG_SIZE)
+        frame = self._receive_frame(client_socket)
+        if tag is None or not frame or not hmac.compare_digest(tag, self._proxy_tag(frame)):
+            self.proxy_auth_failures += 1
+            logger.warning("⚠️ Rejected unauthenticated frame on the worker proxy port")
+            return
+        for response_data in self._handle_frame(frame, ("127.0.0.1", 0), proxied=True):
+            self._write_frame(client_socket, [FRAME_HEADER.pack(len(response_data)), response_data])
+    
+    def _proxy_tag(self, frame: List[bytes]) -> bytes:
+        """HMAC of a proxied frame's records under the secret the primary published"""
+        if self._proxy_secret is None:
+            raise ConnectionError("primary worker has not published its proxy secret")
+        tag = hmac.new(self._proxy_secret, digestmod=hashlib.sha256)
+        for record in frame:
+            tag.update(FRAME_HEADER.pack(len(record)))
+            tag.update(record)
+        return tag.digest()
+    
+    def _handle_frame(self, frame: List[bytes], address: Tuple[str, int], proxied: bool = False) -> List[bytes]:
+        """Hand a frame read on a connection thread to the event loop and wait for its encoded responses;
+        nothing the loop does for it waits on a connection thread in turn"""
+        timeout = self.peer_send_timeout * 2 * max(1, len(frame)) + self.SEALED_KEY_WAIT
+        return asyncio.run_coroutine_threadsafe(self._handle_frame_async(frame, address, proxied), self.loop).result(timeout)
+    
+    async def _handle_frame_async(self, frame: List[bytes], address: Tuple[str, int], proxied: bool = False) -> List[bytes]:
+        """Verify and process a received frame on the event loop; returns the encoded responses"""
+        # Replay and clock checks run on the sealed headers, so stale or replayed records are never parsed
+        records, deferred = self._open_records(frame, defer_unknown_keys=True)
+        messages, authenticated = self._decode_records(records, address, proxied)
+        
+        if self.shared_store and not self.is_primary:
+            changes = await self.loop.run_in_executor(self.offload_executor, self.shared_store.changes)
+            if changes:
+                await self._apply_shared_state(changes)
+            if deferred or not self._serves_locally(messages):
+                return await self.loop.run_in_executor(self.offload_executor, self._proxy_frame, messages, deferred)
+        
+        responses = await self._process_frame(messages, authenticated)
+        if deferred:
+            # Records sealed under a key whose announcement is still in flight, in this frame or on another
+            # connection or stream
+            deadline = time.monotonic() + self.SEALED_KEY_WAIT
+            while not all(self._sealed_key_known(record) for record in deferred) and time.monotonic() < deadline:
+                try:
+                    await asyncio.wait_for(self._key_installed.wait(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+            records, _ = self._open_records(deferred, defer_unknown_keys=False)
+            responses += await self._process_frame(*self._decode_records(records, address, proxied))
+        return responses
+    
+    def _open_records(self, frame: List[bytes], defer_unknown_keys: bool) -> Tuple[List[Tuple[bytes, Optional[str]]], List[bytes]]:
+        """Check the seals of a frame's records; returns the (message bytes, link sender) of records to
+        parse, with no link sender for plain records, and the sealed records whose key is not known yet"""
+        records = []
+        deferred = []
+        for record in frame:
+            if not record or record[0] != SEALED_RECORD_VERSION:
+                records.append((record, None))
+                continue
+            opened = self._open_record(record, defer_unknown_keys)
+            if opened is None:
+                deferred.append(record)
+            elif opened[0] is not None:
+                records.append(opened)
+        return records, deferred
+    
+    def _open_record(self, record: bytes, defer_unknown_key: bool) -> Optional[Tuple[Optional[bytes], Optional[str]]]:
+        """Check one sealed record's clock skew, replay window and tag, in that order; returns the message
+        bytes and sender, (None, None) to drop it, or None to retry it once its key is known"""
+        try:
+            version, lane, sender_length, key_id_length, sequence, sealed_at = SEALED_RECORD_HEADER.unpack_from(record)
+            body_offset = SEALED_RECORD_HEADER.size + sender_length + key_id_length
+            if lane >= len(SendPriority) or len(record) < body_offset + DATAGRAM_TAG_SIZE:
+                raise ValueError("malformed sealed record")
+            sender_id = record[SEALED_RECORD_HEADER.size:SEALED_RECORD_HEADER.size + sender_length].decode()
+            key_id = record[SEALED_RECORD_HEADER.size + sender_length:body_offset].decode()
+        except (struct.error, ValueError):
+            self.replay_stats["malformed"] += 1
+            return None, None
+        
+        if abs(time.time() - sealed_at) > self.replay_max_skew:
+            self.replay_stats["skewed"] += 1
+            return None, None
+        
+        peer = self.peers.get(sender_id)
+        quantum_key = self._sealing_key(peer, key_id) if peer else None
+        if quantum_key is None:
+            if defer_unknown_key and peer and not self._seal_key_retired(sender_id, key_id):
+                return None  # probably a key whose announcement has not been processed yet
+            self.replay_stats["unknown_key"] += 1
+            return None, None
+        
+        with self._replay_lock:
+            window = self.replay_windows.get((sender_id, lane, key_id))
+            if window is None:
+                window = self.replay_windows[(sender_id, lane, key_id)] = ReplayWindow(self.replay_window, key_id)
+            fresh = window.check(sequence)
+        if not fresh:
+            self.replay_stats["replayed"] += 1
+            return None, None
+        
+        view = memoryview(record)
+        if not self.quantum_engine.verify(view[:-DATAGRAM_TAG_SIZE], view[-DATAGRAM_TAG_SIZE:], quantum_key):
+            self.replay_stats["auth_failures"] += 1
+            return None, None
+        
+        # Checked again under the lock: a copy of the record may have been accepted by another connection
+        with self._replay_lock:
+            fresh = window.check(sequence)
+            if fresh:
+                window.update(sequence)
+        if not fresh:
+            self.replay_stats["replayed"] += 1
+            return None, None
+        self.replay_stats["accepted"] += 1
+        return bytes(view[body_offset:-DATAGRAM_TAG_SIZE]), sender_id
+    
+    def _sealing_key(self, peer: DNAQNetPeer, key_id: str) -> Optional[QuantumKey]:
+        """The peer key a record claims to be sealed with: the current one, or one rotated out within the
+        clock skew bound, as records sealed before a rotation may still be in flight on another stream"""
+        if peer.quantum_key and peer.quantum_key.key_id == key_id:
+            return peer.quantum_key
+        for quantum_key, retired_at in self._retired_seal_keys.get(peer.peer_id, ()):
+            if quantum_key.key_id == key_id and time.time() - retired_at <= self.replay_max_skew:
+                return quantum_key
+        return None
+    
+    def _seal_key_retired(self, peer_id: str, key_id: str) -> bool:
+        return any(quantum_key.key_id == key_id for quantum_key, _ in self._retired_seal_keys.get(peer_id, ()))
+    
+    def _retire_seal_key(self, peer_id: str, quantum_key: QuantumKey):
+        """Keep accepting records sealed under a rotated-out key for a while; the oldest one goes for good"""
+        retired = self._retired_seal_keys.setdefault(peer_id, deque(maxlen=self.RETIRED_SEAL_KEYS))
+        if len(retired) == retired.maxlen:
+            for lane in SendPriority:
+                self.replay_windows.pop((peer_id, lane, retired[0][0].key_id), None)
+        retired.append((quantum_key, time.time()))
+    
+    def _sealed_key_known(self, record: bytes) -> bool:
+        """Whether a deferred record's key is known by now, as current or as rotated out"""
+        _, _, sender_length, key_id_length, _, _ = SEALED_RECORD_HEADER.unpack_from(record)
+        offset = SEALED_RECORD_HEADER.size
+        peer = self.peers.get(record[offset:offset + sender_length].decode())
+        key_id = record[offset + sender_length:offset + sender_length + key_id_length].decode()
+        if peer is None or self._seal_key_retired(peer.peer_id, key_id):
+            return True
+        return peer.quantum_key is not None and peer.quantum_key.key_id == key_id
+    
+    def _replay_window(self, windows: Dict[Any, ReplayWindow], source: Any, key_id: str) -> ReplayWindow:
+        """A sequence space's replay window, restarted when the sender's key changes (sequences run per key)"""
+        window = windows.get(source)
+        if window is None or window.key_id != key_id:
+            window = windows[source] = ReplayWindow(self.replay_window, key_id)
+        return window
+    
+    def _decode_records(self, records: List[Tuple[bytes, Optional[str]]], address: Tuple[str, int],
+                        proxied: bool) -> Tuple[List[DNAQNetMessage], Set[str]]:
+        """Parse opened records; returns the messages and the ids of those whose seal was made by their
+        author, which also authenticates their payload"""
+        messages = []
+        authenticated = set()
+        for message_data, link_sender in records:
+            message = decode_message(message_data)
+            self.metrics.record_in(message.message_type, len(message_data))
+            
+            # A peer that seals its records never sends plain ones, so a plain copy is a stripped replay;
+            # proxied frames were checked by the worker that accepted them
+            if link_sender is None and not proxied and self._requires_seal(message):
+                self.replay_stats["unsealed"] += 1
+                continue
+            if link_sender == message.sender_id:
+                authenticated.add(message.message_id)
+            
+            # Handshakes and lookups learn the initiator's address from the connection; proxied frames
+            # were stamped by the worker that accepted them
+            if not proxied and message.message_type in (MessageType.HANDSHAKE, MessageType.FIND_NODE):
+                message.payload["observed_ip"] = address[0]
+            messages.append(message)
+        return messages, authenticated
+    
+    def _seals_for(self, peer: DNAQNetPeer) -> bool:
+        """Whether records exchanged directly with a peer are sealed"""
+        return self.replay_window > 0 and peer.quantum_key is not None and self.REPLAY_CAPABILITY in peer.capabilities
+    
+    def _requires_seal(self, message: DNAQNetMessage) -> bool:
+        """Whether a plain record must have been sealed: it comes from a direct peer that seals"""
+        if message.message_type in UNSEALED_MESSAGE_TYPES:
+            return False
+        peer = self.peers.get(message.sender_id)
+        return peer is not None and peer.peer_id not in self._routed and self._seals_for(peer)
+    
+    def _seal_record(self, carrier: DNAQNetPeer, message: DNAQNetMessage, message_data: bytes,
+                     lane: SendPriority) -> bytes:
+        """Seal an encoded message for the peer whose link carries it, under the next sequence number of
+        its priority lane; records the carrier cannot check go out plain"""
+        if message.message_type in UNSEALED_MESSAGE_TYPES or not self._seals_for(carrier):
+            return message_data
+        
+        quantum_key = carrier.quantum_key
+        key_id, sequence = self._seal_seq.get((carrier.peer_id, lane), (quantum_key.key_id, self._sequence_origin()))
+        sequence = sequence + 1 if key_id == quantum_key.key_id else self._sequence_origin() + 1
+        self._seal_seq[(carrier.peer_id, lane)] = (quantum_key.key_id, sequence)
+        
+        sender = self.node_id.encode()
+        key_id_bytes = quantum_key.key_id.encode()
+        record = b''.join((SEALED_RECORD_HEADER.pack(SEALED_RECORD_VERSION, lane, len(sender), len(key_id_bytes),
+                                                     sequence, time.time()), sender, key_id_bytes, message_data))
+        return record + self.quantum_engine.sign(record, quantum_key)
+    
+    @staticmethod
+    def _sequence_origin() -> int:
+        """Where a new outbound sequence starts: the clock in microseconds, so a restarted node that kept
+        its keys continues above every sequence number its previous run sent"""
+        return int(time.time() * 1_000_000)
+    
+    async def _process_frame(self, messages: List[DNAQNetMessage], authenticated: Set[str]) -> List[bytes]:
+        """Process a frame's messages in order; returns the encoded responses"""
+        responses = []
+        for message in self._verify_frame_signatures(messages, authenticated):
+            
+            await self._process_message(message)
+            self._deferred_verification.discard(message.message_id)
+            
+            # Send response if needed
+            response = self._create_response(message)
+            if response:
+                response_data = encode_message(response)
+                self.metrics.record_out(response.message_type, len(response_data))
+                responses.append(response_data)
+        return responses
+    
+    async def _serve_mux(self, client_socket: socket.socket, address: Tuple[str, int]):
+        """Serve the streams of an inbound multiplexed connection until it closes"""
+        client_socket.setblocking(False)
+        
+        async def handle_frame(frame: List[bytes]) -> List[bytes]:
+            return await self._handle_frame_async(frame, address)
+        
+        connection = MuxConnection(client_socket, on_frame=handle_frame, label=f"{address[0]}:{address[1]}")
+        self.inbound_mux.add(connection)
+        try:
+            await connection.closed_future
+        finally:
+            self.inbound_mux.discard(connection)
+    
+    @property
+    def is_primary(self) -> bool:
+        return self.worker_index == 0
+    
+    def _serves_locally(self, messages: List[DNAQNetMessage]) -> bool:
+        """Whether a secondary worker can handle a frame from shared state: relays, lookups and keyed
+        messages that change no node state; anything else belongs to the primary"""
+        for message in messages:
+            if message.recipient_id not in (self.node_id, "broadcast", "unknown"):
+                continue  # relayed toward its next hop
+            if message.message_type == MessageType.FIND_NODE:
+                continue
+            if message.message_type in (MessageType.ORGANISM_MESSAGE, MessageType.SMART_CONTRACT):
+                peer = self.peers.get(message.sender_id)
+                if peer and peer.quantum_key and message.recipient_id == self.node_id:
+                    continue
+            return False
+        return True
+    
+    def _proxy_frame(self, messages: List[DNAQNetMessage], sealed: List[bytes] = ()) -> List[bytes]:
+        """Pass a frame, and any sealed records we hold no key for, to the primary worker and return its
+        encoded responses"""
+        if self._primary_proxy_port is None:
+            raise ConnectionError("primary worker has not published its proxy port")
+        
+        records = [encode_message(message) for message in messages] + list(sealed)
+        tag = self._proxy_tag(records)
+        reply = bytearray()
+        with socket.create_connection(("127.0.0.1", self._primary_proxy_port), timeout=self.peer_send_timeout * 2) as primary:
+            self._write_frame(primary, [tag] + PeerFrameBatcher.build_frame(records))
+            primary.shutdown(socket.SHUT_WR)
+            while True:
+                response = primary.recv(65536)
+                if not response:
+                    break
+                reply += response
+        self.frames_proxied += 1
+        return split_frames(bytes(reply))
+    
+    def _share(self, kind: str, item_id: str, data: Any):
+        """Publish state for the secondary workers (primary of a multi-process node only)"""
+        if not self.shared_store or not self.is_primary:
+            return
+        try:
+            self.shared_store.put(kind, item_id, data)
+        except sqlite3.Error as e:
+            logger.error(f"Shared state write failed for {kind} {item_id}: {e}")
+    
+    def _share_peer(self, peer: DNAQNetPeer):
+        self._share("peer", peer.peer_id, {
+            "ip_address": peer.ip_address,
+            "port": peer.port,
+            "capabilities": peer.capabilities,
+            "consciousness_level": peer.consciousness_level,
+            "quantum_coherence": peer.quantum_coherence,
+            "routed": peer.peer_id in self._routed
+        })
+    
+    def _share_routing(self):
+        """Publish the route table when it differs from the last published one"""
+        if not self.shared_store or not self.is_primary:
+            return
+        snapshot = {
+            "links": sorted(self.routing.links),
+            "routes": {destination: list(route) for destination, route in self.routing.routes.items()},
+            "endpoints": {node_id: list(endpoint) for node_id, endpoint in self.routing.endpoints.items()}
+        }
+        encoded = json.dumps(snapshot, sort_keys=True)
+        if encoded != self._shared_routing:
+            self._shared_routing = encoded
+            self._share("routing", "table", snapshot)
+    
+    async def _apply_shared_state(self, changes: List[Tuple[str, str, Any]]):
+        """Mirror rows published by the primary into this secondary worker"""
+        for kind, item_id, data in changes:
+            if kind == "primary":
+                self._primary_proxy_port = data["port"]
+                self._proxy_secret = bytes.fromhex(data["secret"])
+            
+            elif kind == "peer":
+                if data is None:
+                    peer = self.peers.remove(item_id)
+                    self._routed.discard(item_id)
+                    if peer and peer.quantum_key:
+                        self.quantum_engine.retire_key(peer.quantum_key.key_id)
+                    continue
+                peer = self.peers.get(item_id)
+                if peer is None:
+                    peer = DNAQNetPeer(
+                        peer_id=item_id,
+                        ip_address=data["ip_address"],
+                        port=data["port"],
+                        public_key="",
+                        quantum_key=None,
+                        consciousness_level=data["consciousness_level"],
+                        quantum_coherence=data["quantum_coherence"],
+                        last_seen=time.time(),
+                        capabilities=data["capabilities"],
+                        trust_score=0.5
+                    )
+                    self.peers[item_id] = peer
+                else:
+                    peer.ip_address, peer.port = data["ip_address"], data["port"]
+                    peer.consciousness_level, peer.quantum_coherence = data["consciousness_level"], data["quantum_coherence"]
+                    self.peers.set_capabilities(item_id, data["capabilities"])
+                if data["routed"]:
+                    self._routed.add(item_id)
+                else:
+                    self._routed.discard(item_id)
+                self._dht_observe(DHTContact(item_id, peer.ip_address, peer.port, time.time()))
+            
+            elif kind == "key":
+                peer = self.peers.get(item_id)
+                if peer is not None and data is not None:
+                    previous_key = peer.quantum_key
+                    peer.quantum_key = QuantumKey(**data)
+                    if previous_key and previous_key.key_id != peer.quantum_key.key_id:
+                        self.quantum_engine.retire_key(previous_key.key_id)
+            
+            elif kind == "routing":
+                self.routing.links = set(data["links"])
+                self.routing.routes = {destination: tuple(route) for destination, route in data["routes"].items()}
+                self.routing.endpoints = {node_id: tuple(endpoint) for node_id, endpoint in data["endpoints"].items()}
+    
+    async def _shared_state_loop(self):
+        """Keep a secondary worker's copy of the primary's state fresh between frames"""
+        while self.running:
+            try:
+                changes = await self.loop.run_in_executor(self.offload_executor, self.shared_store.changes)
+                if changes:
+                    await self._apply_shared_state(changes)
+            except Exception as e:
+                logger.error(f"Shared state refresh error: {e}")
+            await asyncio.sleep(0.25)
+    
+    def _verify_frame_signatures(self, messages: List[DNAQNetMessage], authenticated: Set[str] = frozenset()) -> List[DNAQNetMessage]:
+        """Drop HMAC-signed organism messages whose signatures fail, verifying per sender in one batch;
+        messages in authenticated were sealed by their author and need no second check"""
+        signed_by_sender: Dict[str, List[DNAQNetMessage]] = {}
+        rekeying = set()
+        for message in messages:
+            if message.message_id in authenticated:
+                continue
+            if message.message_type == MessageType.QUANTUM_KEY_EXCHANGE:
+                rekeying.add(message.sender_id)
+            elif (message.message_type == MessageType.ORGANISM_MESSAGE and message.recipient_id == self.node_id and
+                    message.payload.get("signature_scheme") == QuantumCryptographyEngine.HMAC_SIGNATURE):
+                if self._offloads_decode(message):
+                    self._deferred_verification.add(message.message_id)  # verified by the decode worker
+                else:
+                    signed_by_sender.setdefault(message.sender_id, []).append(message)
+        
+        # A sender whose key changes within the frame is verified message by message, in order
+        for sender_id in rekeying.intersection(signed_by_sender):
+            self._deferred_verification.update(message.message_id for message in signed_by_sender.pop(sender_id))
+        
+        if not signed_by_sender:
+            return messages
+        
+        rejected = set()
+        for sender_id, signed in signed_by_sender.items():
+            peer = self.peers.get(sender_id)
+            if not peer or not peer.quantum_key:
+                continue  # the handler ignores messages it has no key for
+            
+            items = []
+            for message in signed:
+                try:
+                    items.append((message.payload["encrypted_data"].encode('ascii'), bytes.fromhex(message.quantum_signature)))
+                except (KeyError, AttributeError, ValueError):
+                    items.append((b"", b""))
+            
+            for message, valid in zip(signed, self.quantum_engine.verify_batch(items, peer.quantum_key)):
+                if not valid:
+                    rejected.add(message.message_id)
+        
+        if rejected:
+            self.signature_failures += len(rejected)
+            logger.warning(f"⚠️ Rejected {len(rejected)} organism message(s) with invalid signatures")
+            return [message for message in messages if message.message_id not in rejected]
+        return messages
+    
+    def _receive_exact(self, client_socket: socket.socket, length: int) -> Optional[bytes]:
+        """Receive exactly length bytes, or None if the connection closes first"""
+        data = bytearray()
+        while len(data) < length:
+            chunk = client_socket.recv(length - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return bytes(data)
+    
+    def _receive_frame(self, client_socket: socket.socket) -> List[bytes]:
+        """Receive one frame and return the encoded messages it carries"""
+        try:
+            header = self._receive_exact(client_socket, FRAME_HEADER.size)
+            if not header:
+                return []
+            
+            frame_word = FRAME_HEADER.unpack(header)[0]
+            if frame_word & FRAME_LENGTH_MASK > MAX_FRAME_BYTES:
+                raise ValueError(f"frame of {frame_word & FRAME_LENGTH_MASK} bytes exceeds {MAX_FRAME_BYTES}")
+            frame_body = self._receive_exact(client_socket, frame_word & FRAME_LENGTH_MASK)
+            if frame_body is None:
+                return []
+            
+            if frame_word & BATCH_FRAME_FLAG:
+                return split_batch_frame(frame_body)
+            return [frame_body]
+        
+        except Exception as e:
+            logger.error(f"Frame receive error: {e}")
+            return []
+    
+    def _receive_message(self, client_socket: socket.socket) -> Optional[str]:
+        """Receive message from socket"""
+        try:
+            # Receive message length
+            length_data = client_socket.recv(4)
+            if not length_data:
+                return None
+            
+            message_length = struct.unpack('!I', length_data)[0]
+            if message_length > MAX_FRAME_BYTES:
+                raise ValueError(f"message of {message_length} bytes exceeds {MAX_FRAME_BYTES}")
+            
+            # Receive message data
+            message_data = b''
+            while len(message_data) < message_length:
+                chunk = client_socket.recv(message_length - len(message_data))
+                if not chunk:
+                    break
+                message_data += chunk
+            
+            return message_data.decode('utf-8')
+        
+        except Exception as e:
+            logger.error(f"Message receive error: {e}")
+            return None
+    
+    def _send_message(self, client_socket: socket.socket, message: DNAQNetMessage):
+        """Send message to socket"""
+        try:
+            message_data = encode_message(message)
+            
+            # Length prefix and message data go out in one write
+            self._write_frame(client_socket, [FRAME_HEADER.pack(len(message_data)), message_data])
+            self.metrics.record_out(message.message_type, len(message_data))
+        
+        except Exception as e:
+            logger.error(f"Message send error: {e}")
+    
+    def _write_frame(self, client_socket: socket.socket, parts: List[bytes]):
+        """Write a frame's buffers with a single vectored send where supported"""
+        if not hasattr(client_socket, "sendmsg"):
+            client_socket.sendall(b''.join(parts))
+            return
+        
+        total_length = sum(len(part) for part in parts)
+        sent = client_socket.sendmsg(parts)
+        if sent < total_length:
+            # Partial vectored write, finish the remainder
+            client_socket.sendall(b''.join(parts)[sent:])
+    
+    async def _process_message(self, message: DNAQNetMessage):
+        """Process incoming message"""
+        # Drop duplicates before any handler or forwarding work
+        if self.dedup.check_and_add(message.message_id):
+            self.dedup_hits_by_type[message.message_type.value] += 1
+            return
+        
+        # Messages for other nodes are relayed toward their next hop
+        if message.recipient_id not in (self.node_id, "broadcast", "unknown"):
+            self._forward_message(message)
+            return
+        
+        if message.recipient_id == self.node_id and message.sender_id not in self.peers:
+            self._ensure_peer(message.sender_id)
+        
+        if message.recipient_id == "broadcast" and message.payload.get("gossip"):
+            self._forward_gossip(message)
+        
+        handler = self.message_handlers.get(message.message_type)
+        if handler:
+            started = time.perf_counter()
+            try:
+                await handler(message)
+            except Exception as e:
+                self.metrics.record_error(message.message_type, "handler")
+                logger.error(f"Message handler error: {e}")
+            self.metrics.observe_handler(message.message_type, time.perf_counter() - started)
+        else:
+            logger.warning(f"No handler for message type: {message.message_type}")
+    
+    def _create_response(self, original_message: DNAQNetMessage) -> Optional[DNAQNetMessage]:
+        """Create response message"""
+        # Lookups are answered with our k closest contacts to the target
+        if original_message.message_type == MessageType.FIND_NODE:
+            target = int(original_message.payload.get("target", "0"), 16)
+            return DNAQNetMessage(
+                message_id=secrets.token_hex(16),
+                sender_id=self.node_id,
+                recipient_id=original_message.sender_id,
+                message_type=MessageType.FIND_NODE,
+                payload={"contacts": [[contact.peer_id, contact.ip_address, contact.port]
+                                      for contact in self.dht.closest(target)]},
+                quantum_signature="",
+                timestamp=time.time(),
+                ttl=60
+            )
+        
+        # Dictionary acks tell the sender whether it may start compressing with the dictionary
+        if original_message.message_type == MessageType.COMPRESSION_DICTIONARY:
+            compressor = self.compressors.get(original_message.sender_id)
+            accepted = bool(compressor) and original_message.payload.get("dictionary_id") in compressor.remote_dictionaries
+            return DNAQNetMessage(
+                message_id=secrets.token_hex(16),
+                sender_id=self.node_id,
+                recipient_id=original_message.sender_id,
+                message_type=MessageType.HEARTBEAT,
+                payload={"status": "acknowledged", "dictionary_accepted": accepted},
+                quantum_signature="",
+                timestamp=time.time(),
+                ttl=60
+            )
+        
+        # Transfer acks report how much of the organism is safely on the receiver's disk
+        if original_message.message_type in (MessageType.TRANSFER_BEGIN, MessageType.TRANSFER_CHUNK):
+            return DNAQNetMessage(
+                message_id=secrets.token_hex(16),
+                sender_id=self.node_id,
+                recipient_id=original_message.sender_id,
+                message_type=MessageType.HEARTBEAT,
+                payload={"status": "acknowledged", **self._transfer_progress(original_message)},
+                quantum_signature="",
+                timestamp=time.time(),
+                ttl=60
+            )
+        
+        # Simple acknowledgment for most messages; handshakes also describe this node
+        if original_message.message_type in [MessageType.HANDSHAKE, MessageType.QUANTUM_KEY_EXCHANGE]:
+            payload = {"status": "acknowledged"}
+            if original_message.message_type == MessageType.HANDSHAKE:
+                payload.update(self._handshake_payload())
+            return DNAQNetMessage(
+                message_id=secrets.token_hex(16),
+                sender_id=self.node_id,
+                recipient_id=original_message.sender_id,
+                message_type=MessageType.HEARTBEAT,
+                payload=payload,
+                quantum_signature="",
+                timestamp=time.time(),
+                ttl=60
+            )
+        return None
+    
+    async def connect_to_peer(self, peer_ip: str, peer_port: int) -> bool:
+        """Connect to a peer and establish quantum key"""
+        try:
+            # A peer we hold a key for at that address gets a MACed handshake, so it accepts a changed
+            # address or capabilities from us
+            payload = self._handshake_payload()
+            known = next((peer for peer in self.peers.values()
+                          if (peer.ip_address, peer.port) == (peer_ip, peer_port) and peer.quantum_key), None)
+            if known:
+                payload["issued"] = time.time()
+                payload["session_mac"] = self._handshake_mac(payload, known.quantum_key).hex()
+            
+            # Send handshake
+            handshake_message = DNAQNetMessage(
+                message_id=secrets.token_hex(16),
+                sender_id=self.node_id,
+                recipient_id=known.peer_id if known else "unknown",
+                message_type=MessageType.HANDSHAKE,
+                payload=payload,
+                quantum_signature="",
+                timestamp=time.time(),
+                ttl=60
+            )
+            
+            # Receive response, which describes the responder so it becomes a link too
+            responses = await self._request(peer_ip, peer_port, handshake_message)
+            if responses:
+                if "node_id" in responses[0].payload:
+                    self._register_peer(responses[0].payload, peer_ip, peer_port)
+                logger.info(f"Successfully connected to peer {peer_ip}:{peer_port}")
+                return True
+            
+        except Exception as e:
+            logger.error(f"Failed to connect to peer {peer_ip}:{peer_port}: {e}")
+        
+        return False
+    
+    def _handshake_payload(self) -> Dict[str, Any]:
+        """How this node describes itself in handshakes and handshake acks"""
+        return {
+            "node_id": self.node_id,
+            "capabilities": self.capabilities,
+            "consciousness_level": self.consciousness_level,
+            "quantum_coherence": self.quantum_coherence,
+            "ip_address": self._advertised_endpoint(self.node_id)[0],
+            "port": self.port
+        }
+    
+    async def send_organism_message(self, recipient_id: str, organism_data: Dict[str, Any]) -> SendStatus:
+        """Send message to another organism; DROPPED signals backpressure from a full send queue"""
+        peer = self._ensure_peer(recipient_id) or await self._discover_peer(recipient_id)
+        if peer is None:
+            logger.error(f"Peer {recipient_id} not found")
+            return SendStatus.FAILED
+        
+        # Generate quantum key if not exists
+        if not peer.quantum_key:
+            await self._establish_key(peer)
+        if not peer.quantum_key:
+            if self.outbox:
+                return await self._store_organism(recipient_id, organism_data, secrets.token_hex(16))
+            logger.error(f"No quantum key with {recipient_id} - organism message not sent")
+            return SendStatus.FAILED
+        
+        if self.outbox and self.outbox.pending(recipient_id):
+            # Queue behind the stored backlog so the peer receives messages in order
+            return await self._store_organism(recipient_id, organism_data, secrets.token_hex(16))
+        
+        message = self._build_organism_message(peer, organism_data)
+        status = await self._send_to_peer(peer, message)
+        if status == SendStatus.FAILED and self.outbox:
+            return await self._store_organism(recipient_id, organism_data, message.message_id)
+        if status == SendStatus.DROPPED:
+            logger.warning(f"Send queue to {recipient_id} is full - organism message dropped")
+        return status
+    
+    def _build_organism_message(self, peer: DNAQNetPeer, organism_data: Dict[str, Any],
+                                message_id: Optional[str] = None) -> DNAQNetMessage:
+        """Compress (when negotiated), encrypt and sign an organism for a peer under its current key"""
+        message_json = json.dumps(organism_data)
+        message_bytes = message_json.encode('utf-8')
+        compression_fields = {}
+        compressor = self._get_compressor(peer)
+        if compressor:
+            compressed = compressor.compress(message_bytes)
+            compressor.observe(message_bytes)
+            if compressed:
+                message_bytes, dictionary_id = compressed
+                compression_fields = {"compression": "zlib", "dictionary_id": dictionary_id}
+            if compressor.pending_dictionary is not None and not compressor.dictionary_in_flight:
+                asyncio.ensure_future(self._send_compression_dictionary(peer, compressor))
+        
+        encrypted_message = self.quantum_engine.encrypt_bytes(message_bytes, peer.quantum_key).hex()
+        if self.signature_scheme == QuantumCryptographyEngine.HMAC_SIGNATURE:
+            # Encrypt-then-MAC, so receivers can verify before decrypting
+            quantum_signature = self.quantum_engine.sign(encrypted_message.encode('ascii'), peer.quantum_key).hex()
+        else:
+            quantum_signature = self.quantum_engine.create_quantum_signature(message_json, peer.quantum_key)
+        
+        # Create DNA-QNet message
+        return DNAQNetMessage(
+            message_id=message_id or secrets.token_hex(16),
+            sender_id=self.node_id,
+            recipient_id=peer.peer_id,
+            message_type=MessageType.ORGANISM_MESSAGE,
+            payload={
+                "encrypted_data": encrypted_message,
+                "organism_type": organism_data.get("type", "unknown"),
+                "signature_scheme": self.signature_scheme,
+                **compression_fields
+            },
+            quantum_signature=quantum_signature,
+            timestamp=time.time(),
+            ttl=300
+        )
+    
+    async def _store_organism(self, recipient_id: str, organism_data: Dict[str, Any], message_id: str) -> SendStatus:
+        """Append an organism to the recipient's outbox and wait for the batched sync; the message id is
+        kept so the receiver's duplicate filter absorbs a replay repeated after a crash"""
+        try:
+            body = json.dumps({"message_id": message_id, "organism": organism_data}).encode('utf-8')
+            self.outbox.append(recipient_id, body, time.time() + self.outbox_ttl)
+            await self._outbox_sync()
+        except Exception as e:
+            logger.error(f"Failed to store organism message for {recipient_id}: {e}")
+            return SendStatus.FAILED
+        self.outbox_stats["stored"] += 1
+        return SendStatus.STORED
+    
+    async def _outbox_sync(self):
+        """Wait for the next outbox flush; every append made before it starts shares the one msync"""
+        if self._outbox_synced is None:
+            self._outbox_synced = self.loop.create_future()
+            asyncio.ensure_future(self._flush_outbox())
+        await asyncio.shield(self._outbox_synced)
+    
+    async def _flush_outbox(self):
+        await asyncio.sleep(self.outbox_sync_interval)
+        synced, self._outbox_synced = self._outbox_synced, None
+        try:
+            await self.loop.run_in_executor(self.offload_executor, self.outbox.sync)
+            synced.set_result(None)
+        except Exception as e:
+            synced.set_exception(e)
+    
+    def _schedule_outbox_replay(self, peer_id: str):
+        """Start replaying a peer's outbox; during a running replay, run another once it ends, as the
+        peer may have come back after the running one hit a failure"""
+        if not self.outbox or peer_id not in self.peers or peer_id in self.suspected or not self.outbox.pending(peer_id):
+            return
+        if peer_id in self._outbox_replays:
+            self._outbox_rerun.add(peer_id)
+            return
+        replay = asyncio.ensure_future(self._replay_outbox(peer_id))
+        self._outbox_replays[peer_id] = replay
+        replay.add_done_callback(lambda _: self._outbox_replay_done(peer_id))
+    
+    def _outbox_replay_done(self, peer_id: str):
+        self._outbox_replays.pop(peer_id, None)
+        if peer_id in self._outbox_rerun:
+            self._outbox_rerun.discard(peer_id)
+            self._schedule_outbox_replay(peer_id)
+    
+    async def _replay_outbox(self, peer_id: str):
+        """Deliver a peer's stored organisms in bulk, oldest first, re-encrypted under the current key;
+        stops at the first failure and keeps the undelivered rest in order"""
+        delivered = 0
+        try:
+            while self.outbox.pending(peer_id):
+                peer = self.peers.get(peer_id)
+                if peer is None or peer_id in self.suspected:
+                    return
+                if not peer.quantum_key:
+                    await self._establish_key(peer)
+                    if not peer.quantum_key:
+                        return
+                
+                records, taken = self.outbox.take(peer_id)
+                statuses: List[SendStatus] = []
+                for start in range(0, len(records), self.broadcast_concurrency):
+                    messages = []
+                    for body, _ in records[start:start + self.broadcast_concurrency]:
+                        stored = json.loads(body)
+                        messages.append(self._build_organism_message(peer, stored["organism"], stored["message_id"]))
+                    statuses.extend(await asyncio.gather(*(self._send_to_peer(peer, message) for message in messages)))
+                    if any(status != SendStatus.SENT for status in statuses):
+                        break
+                
+                remaining = [record for record, status in zip(records, statuses) if status != SendStatus.SENT]
+                remaining.extend(records[len(statuses):])
+                delivered += len(records) - len(remaining)
+                await self.loop.run_in_executor(self.offload_executor, self.outbox.release, peer_id, taken, remaining)
+                if remaining:
+                    logger.warning(f"📭 Outbox replay to {peer_id} stopped - {len(remaining)} messages still stored")
+                    return
+        except Exception as e:
+            logger.error(f"Outbox replay to {peer_id} failed: {e}")
+        finally:
+            self.outbox_stats["replayed"] += delivered
+            if delivered:
+                logger.info(f"📬 Replayed {delivered} stored messages to {peer_id}")
+    
+    def _service_outbox(self):
+        """Compact expired records off the loop and retry peers that still have a backlog"""
+        if not self.outbox:
+            return
+        self.loop.run_in_executor(self.offload_executor, self.outbox.compact)
+        for peer_id in self.outbox.peers():
+            self._schedule_outbox_replay(peer_id)
+    
+    async def send_organism_stream(self, recipient_id: str, organism_data: Dict[str, Any],
+                                   transfer_id: Optional[str] = None, max_attempts: int = 5) -> SendStatus:
+        """Send a large organism as signed fixed-size chunks; failed attempts resume from the receiver's
+        committed offset, and reusing a transfer_id resumes a transfer started earlier"""
+        peer = self._ensure_peer(recipient_id) or await self._discover_peer(recipient_id)
+        if peer is None:
+            logger.error(f"Peer {recipient_id} not found")
+            return SendStatus.FAILED
+        
+        if not peer.quantum_key:
+            await self._establish_key(peer)
+        if not peer.quantum_key:
+            logger.error(f"No quantum key with {recipient_id} - organism stream not sent")
+            return SendStatus.FAILED
+        
+        transfer_id = transfer_id or secrets.token_hex(16)
+        for attempt in range(max_attempts):
+            try:
+                progress = await self._transfer_request(peer, MessageType.TRANSFER_BEGIN,
+                                                        {"transfer_id": transfer_id, "chunk_size": self.stream_chunk_bytes})
+                if progress.get("complete"):
+                    return SendStatus.SENT
+                if progress.get("committed_offset"):
+                    self.transfer_stats["resumed_from_offset"] += 1
+                
+                if await self._stream_chunks(peer, transfer_id, organism_data, progress.get("committed_offset", 0)):
+                    self.transfer_stats["sent"] += 1
+                    return SendStatus.SENT
+            
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"Transfer {transfer_id} to {recipient_id} interrupted: {e}")
+            
+            await asyncio.sleep(min(0.1 * 2 ** attempt, 5.0))
+        
+        self.transfer_stats["failed"] += 1
+        logger.error(f"Transfer {transfer_id} to {recipient_id} failed after {max_attempts} attempts")
+        return SendStatus.FAILED
+    
+    async def _stream_chunks(self, peer: DNAQNetPeer, transfer_id: str, organism_data: Dict[str, Any],
+                             start_offset: int) -> bool:
+        """Send chunks from start_offset with at most stream_window awaiting acks; True once all are on the receiver"""
+        window = asyncio.Semaphore(self.stream_window)
+        in_flight: Set[asyncio.Future] = set()
+        failed = False
+        complete = False
+        
+        async def send_chunk(index: int, chunk: bytes, last: bool):
+            nonlocal failed, complete
+            try:
+                quantum_key = peer.quantum_key
+                ciphertext = self.quantum_engine.encrypt_bytes(chunk, quantum_key)
+                signature = self.quantum_engine.sign(self._chunk_header(transfer_id, index, last) + ciphertext, quantum_key)
+                ack = await self._transfer_request(peer, MessageType.TRANSFER_CHUNK,
+                                                   {"transfer_id": transfer_id, "index": index, "last": last,
+                                                    "data": ciphertext.hex()}, signature.hex())
+                failed = failed or not ack.get("has_chunk")
+                complete = complete or bool(ack.get("complete"))
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.debug(f"Chunk {index} of transfer {transfer_id} failed: {e}")
+                failed = True
+            finally:
+                window.release()
+        
+        for index, chunk, last in iter_organism_chunks(organism_data, self.stream_chunk_bytes, start_offset):
+            await window.acquire()
+            if failed:
+                window.release()
+                break
+            task = asyncio.ensure_future(send_chunk(index, chunk, last))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            self.transfer_stats["chunks_sent"] += 1
+        
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        return complete
+    
+    async def _transfer_request(self, peer: DNAQNetPeer, message_type: MessageType, payload: Dict[str, Any],
+                                signature: str = "") -> Dict[str, Any]:
+        """Send one transfer message on its own connection and return the receiver's progress ack"""
+        message = DNAQNetMessage(
+            message_id=secrets.token_hex(16),
+            sender_id=self.node_id,
+            recipient_id=peer.peer_id,
+            message_type=message_type,
+            payload=payload,
+            quantum_signature=signature,
+            timestamp=time.time(),
+            ttl=60
+        )
+        responses = await self._request(peer.ip_address, peer.port, message)
+        return responses[0].payload if responses else {}
+    
+    @staticmethod
+    def _chunk_header(transfer_id: str, index: int, last: bool) -> bytes:
+        """Authenticated context of a chunk, so chunks cannot be moved between transfers, offsets or ends"""
+        return f"{transfer_id}:{index}:{int(last)}:".encode()
+    
+    def _transfer_progress(self, message: DNAQNetMessage) -> Dict[str, Any]:
+        """Committed offset and chunk receipt reported back to a transfer sender"""
+        key = (message.sender_id, message.payload.get("transfer_id", ""))
+        if key in self.completed_transfers:
+            return {"committed_offset": self.completed_transfers[key][0], "complete": True, "has_chunk": True}
+        transfer = self.incoming_transfers.get(key)
+        if transfer is None:
+            return {"committed_offset": 0, "complete": False, "has_chunk": False}
+        return {"committed_offset": transfer.committed_offset, "complete": transfer.complete,
+                "has_chunk": transfer.has_chunk(message.payload.get("index", -1))}
+    
+    def _get_compressor(self, peer: DNAQNetPeer) -> Optional[PeerPayloadCompressor]:
+        """Outbound compressor for a peer, or None unless both sides support compression"""
+        if not self.payload_compression or self.COMPRESSION_CAPABILITY not in peer.capabilities:
+            return None
+        return self._compressor_for(peer.peer_id)
+    
+    def _compressor_for(self, peer_id: str) -> PeerPayloadCompressor:
+        """Get or create the compression state for a peer"""
+        compressor = self.compressors.get(peer_id)
+        if compressor is None:
+            compressor = PeerPayloadCompressor(peer_id, min_size=self.compression_min_bytes)
+            self.compressors[peer_id] = compressor
+        return compressor
+    
+    async def _send_compression_dictionary(self, peer: DNAQNetPeer, compressor: PeerPayloadCompressor):
+        """Ship a trained dictionary to a peer and switch to it once the peer has stored it"""
+        dictionary = compressor.pending_dictionary
+        compressor.dictionary_in_flight = True
+        try:
+            message = DNAQNetMessage(
+                message_id=secrets.token_hex(16),
+                sender_id=self.node_id,
+                recipient_id=peer.peer_id,
+                message_type=MessageType.COMPRESSION_DICTIONARY,
+                payload={
+                    "dictionary_id": PeerPayloadCompressor.dictionary_id_for(dictionary),
+                    "encrypted_dictionary": self.quantum_engine.encrypt_bytes(dictionary, peer.quantum_key).hex()
+                },
+                quantum_signature="",
+                timestamp=time.time(),
+                ttl=60
+            )
+            
+            # Request/response rather than the batcher: the ack arrives only after the peer
+            # has stored the dictionary, so no frame compressed with it can overtake it
+            responses = await self._request(peer.ip_address, peer.port, message)
+            if any(response.payload.get("dictionary_accepted") for response in responses):
+                compressor.activate(dictionary)
+                logger.info(f"🗜️ Compression dictionary {compressor.dictionary_id} active for {peer.peer_id}")
+        
+        except Exception as e:
+            logger.error(f"Failed to send compression dictionary to {peer.peer_id}: {e}")
+        finally:
+            compressor.dictionary_in_flight = False
+    
+    def get_send_queue_depth(self, peer_id: str) -> int:
+        """Number of messages queued for a peer"""
+        batcher = self.batchers.get(peer_id)
+        return batcher.queue_depth() if batcher else 0
+    
+    async def _send_to_peer(self, peer: DNAQNetPeer, message: DNAQNetMessage) -> SendStatus:
+        """Send message to specific peer"""
+        try:
+            # Suspected peers only receive heartbeat probes until they recover
+            if peer.peer_id in self.suspected and message.message_type != MessageType.HEARTBEAT:
+                self.metrics.record_error(message.message_type, "suspected")
+                return SendStatus.FAILED
+            
+            carrier = self._delivery_peer(peer)
+            if carrier is None:
+                self.messages_unroutable += 1
+                self.metrics.record_error(message.message_type, "unroutable")
+                return SendStatus.FAILED
+            
+            if carrier is peer and self._send_datagram(peer, message):
+                return SendStatus.SENT
+            
+            batcher = self._get_batcher(carrier)
+            priority = MESSAGE_PRIORITIES.get(message.message_type, SendPriority.BULK)
+            message_data = self._seal_record(carrier, message, encode_message(message), priority)
+            delivery = await batcher.submit(message_data, priority)
+            if delivery is None:
+                self.metrics.record_error(message.message_type, "dropped")
+                return SendStatus.DROPPED
+            
+            if await delivery:
+                peer.last_seen = time.time()
+                self.latency.observe_success(carrier.peer_id)
+                self.metrics.record_out(message.message_type, len(message_data))
+                return SendStatus.SENT
+            self.latency.observe_error(carrier.peer_id)
+            self.metrics.record_error(message.message_type, "send")
+            return SendStatus.FAILED
+            
+        except Exception as e:
+            self.metrics.record_error(message.message_type, "send")
+            logger.error(f"Failed to send message to peer {peer.peer_id}: {e}")
+            return SendStatus.FAILED
+    
+    def _send_datagram(self, peer: DNAQNetPeer, message: DNAQNetMessage) -> bool:
+        """Send loss-tolerant control traffic as one authenticated datagram; False means use TCP"""
+        if (self.udp_transport is None or message.message_type not in DATAGRAM_MESSAGE_TYPES or
+                not peer.quantum_key or not peer.ip_address or not peer.port):
+            return False
+        
+        sender = self.node_id.encode()
+        key_id = peer.quantum_key.key_id.encode()
+        body = encode_message(message)
+        if DATAGRAM_HEADER.size + len(sender) + len(key_id) + len(body) + DATAGRAM_TAG_SIZE > DATAGRAM_MAX_SIZE:
+            self.udp_stats["oversize"] += 1
+            return False
+        
+        sequence = self._udp_send_seq.get(peer.peer_id, self._sequence_origin()) + 1
+        self._udp_send_seq[peer.peer_id] = sequence
+        datagram = DATAGRAM_HEADER.pack(DATAGRAM_VERSION, len(sender), len(key_id), sequence) + sender + key_id + body
+        self.udp_transport.sendto(datagram + self.quantum_engine.sign(datagram, peer.quantum_key),
+                                  (peer.ip_address, peer.port))
+        self.udp_stats["sent"] += 1
+        self.metrics.record_out(message.message_type, len(datagram) + DATAGRAM_TAG_SIZE)
+        return True
+    
+    def _handle_datagram(self, data: bytes, address: Tuple[str, int]):
+        """Authenticate a datagram, drop stale or replayed sequence numbers, then process it"""
+        try:
+            version, sender_length, key_id_length, sequence = DATAGRAM_HEADER.unpack_from(data)
+            if version != DATAGRAM_VERSION or len(data) < DATAGRAM_HEADER.size + sender_length + key_id_length + DATAGRAM_TAG_SIZE:
+                raise ValueError("malformed datagram")
+            offset = DATAGRAM_HEADER.size
+            sender_id = data[offset:offset + sender_length].decode()
+            key_id = data[offset + sender_length:offset + sender_length + key_id_length].decode()
+            
+            peer = self.peers.get(sender_id)
+            if not peer or not peer.quantum_key or peer.quantum_key.key_id != key_id:
+                self.udp_stats["auth_failures"] += 1
+                return
+            
+            # Replays and datagrams behind the window are dropped before the tag is computed
+            window = self._replay_window(self._udp_recv_windows, sender_id, key_id)
+            if not window.check(sequence):
+                self.udp_stats["replayed"] += 1
+                return
+            signed, tag = data[:-DATAGRAM_TAG_SIZE], data[-DATAGRAM_TAG_SIZE:]
+            if not self.quantum_engine.verify(signed, tag, peer.quantum_key):
+                self.udp_stats["auth_failures"] += 1
+                return
+            
+            if sequence > window.highest:
+                # A first datagram or a jump past the window (a restarted sender) resyncs rather than counting loss
+                if window.highest and sequence - window.highest <= window.size:
+                    self.udp_stats["lost"] += sequence - window.highest - 1
+                else:
+                    window.loss_floor = sequence
+            else:
+                self.udp_stats["reordered"] += 1
+                if sequence > window.loss_floor:
+                    self.udp_stats["lost"] -= 1  # its gap was counted: no longer lost
+            window.update(sequence)
+            
+            message = decode_message(signed[offset + sender_length + key_id_length:])
+            self.udp_stats["received"] += 1
+            self.metrics.record_in(message.message_type, len(data))
+            asyncio.ensure_future(self._process_message(message))
+        
+        except Exception as e:
+            self.udp_stats["malformed"] += 1
+            logger.debug(f"Dropped datagram from {address}: {e}")
+    
+    def _delivery_peer(self, peer: DNAQNetPeer) -> Optional[DNAQNetPeer]:
+        """Peer whose connection carries traffic for peer: itself, or its next hop when routed"""
+        if peer.peer_id not in self._routed:
+            return peer
+        next_hop = self.peers.get(self._next_hop(peer.peer_id) or "")
+        if next_hop is None and peer.ip_address and peer.port:
+            return peer  # no route while the tables reconverge - fall back to a direct connection
+        return next_hop
+    
+    def _next_hop(self, destination: str) -> Optional[str]:
+        """Next hop toward destination; among equally short routes, the neighbor cheapest to reach"""
+        if self.peer_selection == "random":
+            return self.routing.next_hop(destination)
+        hops = [hop for hop in self.routing.next_hops(destination) if hop in self.peers and hop not in self.suspected]
+        return self.latency.best(hops) or self.routing.next_hop(destination)
+    
+    def _ensure_peer(self, node_id: str) -> Optional[DNAQNetPeer]:
+        """Peer entry for a node, creating a routed one for a reachable node we have no link to"""
+        peer = self.peers.get(node_id)
+        if peer is None and self.routing.next_hop(node_id):
+            ip_address, port = self.routing.endpoints.get(node_id, ("", 0))
+            peer = DNAQNetPeer(
+                peer_id=node_id,
+                ip_address=ip_address,
+                port=port,
+                public_key="",
+                quantum_key=None,
+                consciousness_level=0.5,
+                quantum_coherence=0.5,
+                last_seen=time.time(),
+                capabilities=[],
+                trust_score=0.5
+            )
+            self._routed.add(node_id)
+            self.peers[node_id] = peer
+            self._share_peer(peer)
+        return peer
+    
+    async def _discover_peer(self, peer_id: str) -> Optional[DNAQNetPeer]:
+        """Find an unknown peer through the DHT and add it as a directly addressed peer"""
+        contact = await self.dht_lookup(peer_id)
+        if contact is None:
+            return None
+        
+        peer = self.peers.get(peer_id)
+        if peer is None:
+            peer = DNAQNetPeer(
+                peer_id=peer_id,
+                ip_address=contact.ip_address,
+                port=contact.port,
+                public_key="",
+                quantum_key=None,
+                consciousness_level=0.5,
+                quantum_coherence=0.5,
+                last_seen=time.time(),
+                capabilities=[],
+                trust_score=0.5
+            )
+            self.peers[peer_id] = peer
+        return peer
+    
+    async def dht_lookup(self, peer_id: str) -> Optional[DHTContact]:
+        """Find where a peer_id can be reached, in O(log N) lookup rounds"""
+        contact = self.dht.get(peer_id)
+        if contact is not None:
+            return contact
+        
+        for contact in await self._dht_find_node(dht_id(peer_id), stop_at=peer_id):
+            if contact.peer_id == peer_id:
+                return contact
+        return None
+    
+    async def _dht_find_node(self, target: int, stop_at: Optional[str] = None) -> List[DHTContact]:
+        """Iterative lookup: query the alpha closest unqueried contacts until the k closest have answered"""
+        def distance(contact: DHTContact) -> int:
+            return dht_id(contact.peer_id) ^ target
+        
+        shortlist = {contact.peer_id: contact for contact in self.dht.closest(target)}
+        queried: Set[str] = set()
+        failed: Set[str] = set()
+        rounds = 0
+        
+        while True:
+            closest = sorted((contact for contact in shortlist.values() if contact.peer_id not in failed),
+                             key=distance)[:self.dht.k]
+            pending = [contact for contact in closest if contact.peer_id not in queried][:self.dht_alpha]
+            if not pending:
+                break
+            
+            rounds += 1
+            queried.update(contact.peer_id for contact in pending)
+            results = await asyncio.gather(*(self._dht_query(contact, target) for contact in pending))
+            for contact, found in zip(pending, results):
+                if found is None:
+                    failed.add(contact.peer_id)
+                    continue
+                for candidate in found:
+                    if candidate.peer_id != self.node_id and candidate.peer_id not in shortlist:
+                        shortlist[candidate.peer_id] = candidate
+            
+            if stop_at and stop_at in shortlist and stop_at not in failed:
+                break
+        
+        self.dht_lookups += 1
+        self.dht_lookup_rounds += rounds
+        self.dht.bucket_refreshed[max(0, self.dht.bucket_index(target))] = time.time()
+        return sorted((contact for contact in shortlist.values() if contact.peer_id not in failed),
+                      key=distance)[:self.dht.k]
+    
+    async def _dht_query(self, contact: DHTContact, target: int) -> Optional[List[DHTContact]]:
+        """Send one FIND_NODE RPC; None (and eviction) if the contact does not answer"""
+        message = DNAQNetMessage(
+            message_id=secrets.token_hex(16),
+            sender_id=self.node_id,
+            recipient_id="unknown",
+            message_type=MessageType.FIND_NODE,
+            payload={"target": format(target, 'x'), "ip_address": self._advertised_endpoint(self.node_id)[0],
+                     "port": self.port},
+            quantum_signature="",
+            timestamp=time.time(),
+            ttl=60
+        )
+        
+        try:
+            responses = await self._request(contact.ip_address, contact.port, message)
+        except Exception:
+            responses = []
+        
+        if not responses or responses[0].sender_id != contact.peer_id:
+            self.dht.remove(contact.peer_id)
+            return None
+        
+        now = time.time()
+        self._dht_observe(DHTContact(contact.peer_id, contact.ip_address, contact.port, now))
+        return [DHTContact(peer_id, ip_address, port, now)
+                for peer_id, ip_address, port in responses[0].payload.get("contacts", [])]
+    
+    def _dht_observe(self, contact: DHTContact):
+        """Add a contact we heard from, pinging the oldest one first when its bucket is full"""
+        if not contact.ip_address or not contact.port:
+            return
+        oldest = self.dht.update(contact)
+        if oldest is not None:
+            asyncio.ensure_future(self._dht_query(oldest, self.dht.local_id))
+    
+    async def _dht_refresh_loop(self):
+        """Refresh buckets that have gone quiet with a lookup for a random id in their range"""
+        while self.running:
+            try:
+                await asyncio.sleep(self.dht_refresh_interval / 4)
+                for index in self.dht.stale_buckets(self.dht_refresh_interval):
+                    await self._dht_find_node(self.dht.random_id_in_bucket(index))
+            
+            except Exception as e:
+                logger.error(f"DHT refresh error: {e}")
+    
+    def _forward_message(self, message: DNAQNetMessage):
+        """Relay a message addressed to another node toward its next hop; loops die in dedup"""
+        next_hop = self.peers.get(self._next_hop(message.recipient_id) or "")
+        if next_hop is None:
+            self.messages_unroutable += 1
+            logger.debug(f"No route to {message.recipient_id} - dropping {message.message_type.value}")
+            return
+        
+        self.messages_forwarded += 1
+        asyncio.ensure_future(self._send_to_peer(next_hop, message))
+    
+    def _get_batcher(self, peer: DNAQNetPeer) -> PeerFrameBatcher:
+        """Get or create the outbound batcher for a peer"""
+        batcher = self.batchers.get(peer.peer_id)
+        if batcher is None:
+            async def send_frame(parts: List[bytes], priority: SendPriority) -> bool:
+                return await self._deliver_frame(peer, parts, priority)
+            
+            batcher = PeerFrameBatcher(
+                peer.peer_id,
+                send_frame,
+                max_batch_bytes=self.batch_max_bytes,
+                max_delay=self.batch_max_delay,
+                queue_limits=self.send_queue_limits,
+                overflow_policy=self.send_queue_policy,
+                block_timeout=self.send_block_timeout
+            )
+            self.batchers[peer.peer_id] = batcher
+        # Priorities only flush independently over streams; otherwise each would cost its own connection
+        batcher.independent_priorities = self._multiplexed(peer)
+        return batcher
+    
+    async def _deliver_frame(self, peer: DNAQNetPeer, parts: List[bytes], priority: SendPriority = SendPriority.BULK) -> bool:
+        """Write one frame to a peer: on its priority's stream when multiplexed, else on a new connection"""
+        try:
+            if self._multiplexed(peer):
+                connection = await self._mux_connection(peer)
+                return await asyncio.wait_for(connection.send_frame(parts, priority), self.peer_send_timeout)
+            
+            connect_started = time.perf_counter()
+            peer_socket = await self._open_connection(peer.ip_address, peer.port)
+            self.metrics.observe_connect(peer.peer_id, time.perf_counter() - connect_started)
+            try:
+                await asyncio.wait_for(self._write_frame_async(peer_socket, parts), self.peer_send_timeout)
+            finally:
+                peer_socket.close()
+            return True
+        
+        except asyncio.TimeoutError:
+            logger.error(f"Failed to deliver frame to peer {peer.peer_id}: timed out after {self.peer_send_timeout}s")
+            return False
+        except Exception as e:
+            logger.error(f"Failed to deliver frame to peer {peer.peer_id}: {e}")
+            return False
+    
+    def _multiplexed(self, peer: DNAQNetPeer) -> bool:
+        return self.multiplex and self.MUX_CAPABILITY in peer.capabilities and bool(peer.ip_address and peer.port)
+    
+    async def _mux_connection(self, peer: DNAQNetPeer) -> MuxConnection:
+        """The open multiplexed connection to a peer, connecting once however many senders are waiting"""
+        connection = self.mux_connections.get(peer.peer_id)
+        if connection is not None and not connection.closed:
+            return connection
+        pending = self._pending_mux.get(peer.peer_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._open_mux(peer))
+            self._pending_mux[peer.peer_id] = pending
+            pending.add_done_callback(lambda _: self._pending_mux.pop(peer.peer_id, None))
+        return await asyncio.shield(pending)
+    
+    async def _open_mux(self, peer: DNAQNetPeer) -> MuxConnection:
+        connect_started = time.perf_counter()
+        peer_socket = await self._open_connection(peer.ip_address, peer.port)
+        self.metrics.observe_connect(peer.peer_id, time.perf_counter() - connect_started)
+        try:
+            await asyncio.wait_for(self._write_frame_async(peer_socket, [MUX_PREFACE]), self.peer_send_timeout)
+        except BaseException:
+            peer_socket.close()
+            raise
+        connection = MuxConnection(peer_socket, label=peer.peer_id)
+        self.mux_connections[peer.peer_id] = connection
+        return connection
+    
+    def _close_mux(self, peer_id: str):
+        connection = self.mux_connections.pop(peer_id, None)
+        if connection is not None:
+            connection.close()
+    
+    def _close_idle_mux(self):
+        """Close multiplexed connections that carried nothing for a peer expiry period"""
+        cutoff = time.time() - self.peer_expiry
+        for peer_id, connection in list(self.mux_connections.items()):
+            if connection.closed or connection.last_activity < cutoff:
+                self._close_mux(peer_id)
+    
+    def _mux_stats(self) -> Dict[str, Any]:
+        connections = [connection for connection in self.mux_connections.values() if not connection.closed]
+        totals: Counter = Counter()
+        for connection in connections + list(self.inbound_mux):
+            totals.update(connection.stats)
+        return {
+            "enabled": self.multiplex,
+            "outbound_connections": len(connections),
+            "inbound_connections": len(self.inbound_mux),
+            "open_streams": sum(len(connection.streams) for connection in connections + list(self.inbound_mux)),
+            **totals
+        }
+    
+    async def _open_connection(self, peer_ip: str, peer_port: int) -> socket.socket:
+        """Open a non-blocking connection, bounded by the per-peer deadline"""
+        loop = asyncio.get_running_loop()
+        peer_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        peer_socket.setblocking(False)
+        try:
+            await asyncio.wait_for(loop.sock_connect(peer_socket, (peer_ip, peer_port)), self.peer_send_timeout)
+        except BaseException:
+            peer_socket.close()
+            raise
+        return peer_socket
+    
+    async def _write_frame_async(self, peer_socket: socket.socket, parts: List[bytes]):
+        """Write a frame's buffers on a non-blocking socket, vectored where supported"""
+        loop = asyncio.get_running_loop()
+        sent = 0
+        if hasattr(peer_socket, "sendmsg"):
+            try:
+                sent = peer_socket.sendmsg(parts)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+        
+        total_length = sum(len(part) for part in parts)
+        if sent < total_length:
+            await loop.sock_sendall(peer_socket, b''.join(parts)[sent:])
+    
+    async def _receive_exact_async(self, peer_socket: socket.socket, length: int) -> Optional[bytes]:
+        """Receive exactly length bytes from a non-blocking socket"""
+        loop = asyncio.get_running_loop()
+        data = bytearray()
+        while len(data) < length:
+            chunk = await loop.sock_recv(peer_socket, length - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return bytes(data)
+    
+    async def _receive_frame_async(self, peer_socket: socket.socket) -> List[bytes]:
+        """Receive one frame from a non-blocking socket"""
+        header = await self._receive_exact_async(peer_socket, FRAME_HEADER.size)
+        if not header:
+            return []
+        
+        frame_word = FRAME_HEADER.unpack(header)[0]
+        if frame_word & FRAME_LENGTH_MASK > MAX_FRAME_BYTES:
+            raise ValueError(f"frame of {frame_word & FRAME_LENGTH_MASK} bytes exceeds {MAX_FRAME_BYTES}")
+        frame_body = await self._receive_exact_async(peer_socket, frame_word & FRAME_LENGTH_MASK)
+        if frame_body is None:
+            return []
+        
+        if frame_word & BATCH_FRAME_FLAG:
+            return split_batch_frame(frame_body)
+        return [frame_body]
+    
+    async def _request(self, peer_ip: str, peer_port: int, message: DNAQNetMessage) -> List[DNAQNetMessage]:
+        """Send a message and wait for the response frame, on a new stream of the peer's multiplexed
+        connection when there is one, else on a fresh connection"""
+        message_data = encode_message(message)
+        priority = MESSAGE_PRIORITIES.get(message.message_type, SendPriority.BULK)
+        peer = self.peers.get(message.recipient_id)
+        direct = peer is not None and (peer.ip_address, peer.port) == (peer_ip, peer_port)
+        if direct:
+            message_data = self._seal_record(peer, message, message_data, priority)
+        parts = [FRAME_HEADER.pack(len(message_data)), message_data]
+        try:
+            if direct and self._multiplexed(peer):
+                connection = await self._mux_connection(peer)
+                started = time.perf_counter()
+                reply = await asyncio.wait_for(connection.request(parts, priority), self.peer_send_timeout)
+                self.metrics.record_out(message.message_type, len(message_data))
+                response_frame = split_frames(reply)
+            else:
+                peer_socket = await self._open_connection(peer_ip, peer_port)
+                try:
+                    # The round trip is timed from the open connection, so it excludes the TCP handshake
+                    started = time.perf_counter()
+                    await asyncio.wait_for(self._write_frame_async(peer_socket, parts), self.peer_send_timeout)
+                    self.metrics.record_out(message.message_type, len(message_data))
+                    response_frame = await asyncio.wait_for(self._receive_frame_async(peer_socket), self.peer_send_timeout)
+                finally:
+                    peer_socket.close()
+            elapsed = time.perf_counter() - started
+        except Exception:
+            if direct:
+                self.latency.observe_error(peer.peer_id)
+            raise
+        
+        responses = [decode_message(response_data) for response_data in response_frame]
+        for response, response_data in zip(responses, response_frame):
+            self.metrics.record_in(response.message_type, len(response_data))
+        
+        # Handshake responders are about to become peers; other requests only count toward known ones
+        responder = responses[0].sender_id if responses else None
+        if responder and (responder in self.peers or message.message_type == MessageType.HANDSHAKE):
+            self.latency.observe_rtt(responder, elapsed)
+        return responses
+    
+    async def _disseminate(self, message: DNAQNetMessage) -> int:
+        """Send a broadcast using the configured dissemination mode"""
+        if self.broadcast_mode != "gossip":
+            return await self._broadcast(message)
+        
+        # Gossip origin: the ttl becomes the hop budget
+        message.payload["gossip"] = True
+        message.ttl = self.gossip_rounds
+        self.dedup.check_and_add(message.message_id)
+        return await self._gossip(message, exclude={self.node_id})
+    
+    async def _gossip(self, message: DNAQNetMessage, exclude: Set[str]) -> int:
+        """Send a gossip message to a fanout subset of peers, biased toward cheap ones by peer_selection"""
+        # Half the fanout stays uniform: slow peers still need the broadcast, and with every node
+        # steering away from them coverage would suffer
+        target_ids = self.latency.select(list(self.peers.keys()), self.gossip_fanout, exclude | self.suspected | self._routed,
+                                         self.peer_selection, uniform=self.gossip_fanout // 2)
+        return await self._broadcast(message, [self.peers[peer_id] for peer_id in target_ids])
+    
+    def _forward_gossip(self, message: DNAQNetMessage):
+        """Forward a first-seen gossip message while hops remain"""
+        if message.ttl > 1:
+            forwarded = replace(message, ttl=message.ttl - 1)
+            self.gossip_forwarded += 1
+            asyncio.ensure_future(self._gossip(forwarded, exclude={self.node_id, message.sender_id}))
+    
+    async def _broadcast(self, message: DNAQNetMessage, peers: Optional[List[DNAQNetPeer]] = None) -> int:
+        """Send a message to many peers concurrently; returns the number delivered"""
+        results = await self._fan_out(message, peers)
+        return sum(1 for status in results if status == SendStatus.SENT)
+    
+    async def _fan_out(self, message: DNAQNetMessage, peers: Optional[List[DNAQNetPeer]] = None) -> List[SendStatus]:
+        """Send a message to many peers concurrently, bounded by the in-flight cap and per-peer deadline"""
+        if peers is None:
+            targets = [peer for peer in self.peers.values()
+                       if peer.peer_id not in self.suspected and peer.peer_id not in self._routed]
+        else:
+            targets = peers
+        
+        async def send_bounded(peer: DNAQNetPeer) -> SendStatus:
+            async with self._send_slots:
+                try:
+                    return await asyncio.wait_for(self._send_to_peer(peer, message), self.peer_send_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Send to peer {peer.peer_id} missed the {self.peer_send_timeout}s deadline")
+                    self.latency.observe_error(peer.peer_id)
+                    return SendStatus.FAILED
+        
+        return list(await asyncio.gather(*(send_bounded(peer) for peer in targets)))
+    
+    # Message Handlers
+    async def _handle_handshake(self, message: DNAQNetMessage):
+        """Handle handshake message"""
+        payload = message.payload
+        
+        # Prefer the address the peer advertises; fall back to where the connection came from
+        ip_address = payload.get("ip_address")
+        if not ip_address or ip_address == "0.0.0.0":
+            ip_address = payload.get("observed_ip", "")
+        
+        known = self.peers.get(payload["node_id"])
+        authenticated = known is None or known.quantum_key is None or self._handshake_authenticated(known, payload)
+        peer = self._register_peer(payload, ip_address, payload.get("port", 0), authenticated)
+        logger.info(f"🤝 Peer {peer.peer_id} connected - Consciousness: {peer.consciousness_level:.3f}")
+    
+    def _handshake_mac(self, payload: Dict[str, Any], quantum_key: QuantumKey) -> bytes:
+        """MAC of a handshake under the session key, over the fields its sender wrote"""
+        fields = {name: value for name, value in payload.items() if name not in ("session_mac", "observed_ip")}
+        return self.quantum_engine.sign(json.dumps(fields, sort_keys=True).encode('utf-8'), quantum_key)
+    
+    def _handshake_authenticated(self, peer: DNAQNetPeer, payload: Dict[str, Any]) -> bool:
+        """Whether a handshake from a keyed peer carries a fresh MAC under its current key"""
+        try:
+            return (abs(time.time() - float(payload["issued"])) <= self.replay_max_skew and
+                    hmac.compare_digest(self._handshake_mac(payload, peer.quantum_key), bytes.fromhex(payload["session_mac"])))
+        except (KeyError, TypeError, ValueError):
+            return False
+    
+    def _register_peer(self, payload: Dict[str, Any], ip_address: str, port: int,
+                       authenticated: bool = True) -> DNAQNetPeer:
+        """Add or refresh a directly connected peer and bring up its routing link; an unauthenticated
+        handshake only refreshes the liveness of a peer we hold a key for"""
+        peer = self.peers.get(payload["node_id"])
+        if peer is None:
+            peer = DNAQNetPeer(
+                peer_id=payload["node_id"],
+                ip_address=ip_address,
+                port=port,
+                public_key="",
+                quantum_key=None,
+                consciousness_level=payload.get("consciousness_level", 0.5),
+                quantum_coherence=payload.get("quantum_coherence", 0.5),
+                last_seen=time.time(),
+                capabilities=payload.get("capabilities", []),
+                trust_score=0.5
+            )
+            self.peers[peer.peer_id] = peer
+        elif not authenticated:
+            # Anyone can claim a node id: the session and its address stay as they are
+            self.key_exchange_stats["unauthenticated_handshakes"] += 1
+            self.peers.touch(peer.peer_id)
+        else:
+            # Keep the session (keys, trust) of a peer we already know
+            peer.ip_address = ip_address or peer.ip_address
+            peer.port = port or peer.port
+            peer.consciousness_level = payload.get("consciousness_level", peer.consciousness_level)
+            peer.quantum_coherence = payload.get("quantum_coherence", peer.quantum_coherence)
+            self.peers.set_capabilities(peer.peer_id, payload.get("capabilities", peer.capabilities))
+            self.peers.touch(peer.peer_id)
+        
+        self._link_up(peer)
+        self._dht_observe(DHTContact(peer.peer_id, peer.ip_address, peer.port, time.time()))
+        self._share_peer(peer)
+        self._schedule_outbox_replay(peer.peer_id)
+        return peer
+    
+    async def _handle_quantum_key_exchange(self, message: DNAQNetMessage):
+        """Handle quantum key exchange: first-key requests and answers, and authenticated rotations"""
+        peer = self.peers.get(message.sender_id)
+        if peer is None:
+            return
+        payload = message.payload
+        
+        try:
+            if "dh_public" in payload and "encrypted_key" in payload:
+                await self._accept_first_key(peer, payload)
+            elif "dh_public" in payload:
+                await self._answer_key_request(peer, payload)
+            elif "encrypted_key" in payload and peer.quantum_key:
+                # Successor announced under the current key, which also authenticates it
+                if not self.quantum_engine.verify(payload["encrypted_key"].encode('ascii'),
+                                                  bytes.fromhex(payload.get("mac", "")), peer.quantum_key):
+                    raise ValueError("rotation announcement failed authentication")
+                key_data = json.loads(self.quantum_engine.decrypt_message(payload["encrypted_key"], peer.quantum_key))
+                self._install_key(peer, QuantumKey(**key_data), announce=False)
+                logger.info(f"🔐 Quantum key rotated by {peer.peer_id}")
+            else:
+                raise ValueError("no authenticated key material")
+        except (ValueError, TypeError, KeyError) as e:
+            self.key_exchange_stats["rejected"] += 1
+            logger.warning(f"⚠️ Rejected key exchange from {peer.peer_id}: {e}")
+    
+    async def _answer_key_request(self, peer: DNAQNetPeer, payload: Dict[str, Any]):
+        """Generate a first key for a peer that asked for one and send it back wrapped under the exchange;
+        replacing an installed key takes a request MACed under it"""
+        requester_public = int(payload["dh_public"], 16)
+        if peer.quantum_key:
+            if not self.quantum_engine.verify(payload["dh_public"].encode('ascii'),
+                                              bytes.fromhex(payload.get("mac", "")), peer.quantum_key):
+                self.key_exchange_stats["refused"] += 1
+                logger.warning(f"⚠️ Refused first-key request from {peer.peer_id}: a key is already installed")
+                if "mac" not in payload:
+                    self._probe_key(peer)
+                return
+        elif peer.peer_id in self._key_requests and self.node_id < peer.peer_id and "mac" not in payload:
+            return  # both asked at once: the lower id's request is the one answered, by the other end
+        
+        quantum_key = await self._generate_key_async(peer.peer_id)
+        private, public = await self.loop.run_in_executor(self.offload_executor, key_exchange_keypair)
+        secret = await self.loop.run_in_executor(self.offload_executor, key_exchange_secret, private, requester_public,
+                                                 peer.peer_id, self.node_id, requester_public, public)
+        self._key_replies[peer.peer_id] = (public, secret)
+        self._install_key(peer, quantum_key, announce=True)
+        self.key_exchange_stats["answered"] += 1
+        logger.info(f"🔐 Quantum key established with {peer.peer_id}")
+    
+    def _probe_key(self, peer: DNAQNetPeer):
+        """Ask a keyed peer, at the address on file, for a new key under a request MACed with the current
+        one: a peer that lost its key answers it as a first request, one that kept it as a re-key"""
+        now = time.time()
+        if now - self._key_probes.get(peer.peer_id, 0.0) < KEY_PROBE_INTERVAL:
+            return
+        self._key_probes[peer.peer_id] = now
+        self.key_exchange_stats["probes"] += 1
+        asyncio.ensure_future(self._establish_key(peer, replace=True))
+    
+    async def _accept_first_key(self, peer: DNAQNetPeer, payload: Dict[str, Any]):
+        """Unwrap the first key answering our own request; unsolicited first keys are ignored"""
+        request = self._key_requests.get(peer.peer_id)
+        if request is None:
+            raise ValueError("first key without a request of ours")
+        private, public, _ = request
+        responder_public = int(payload["dh_public"], 16)
+        secret = await self.loop.run_in_executor(self.offload_executor, key_exchange_secret, private, responder_public,
+                                                 self.node_id, peer.peer_id, public, responder_public)
+        key_data = json.loads(unwrap_key(secret, bytes.fromhex(payload["encrypted_key"])))
+        self._install_key(peer, QuantumKey(**key_data), announce=False)
+        self.key_exchange_stats["accepted"] += 1
+        logger.info(f"🔐 Quantum key established with {peer.peer_id}")
+    
+    async def _handle_organism_message(self, message: DNAQNetMessage):
+        """Handle organism message"""
+        sender_id = message.sender_id
+        
+        if sender_id in self.peers:
+            peer = self.peers[sender_id]
+            
+            if peer.quantum_key:
+                if self._offloads_decode(message):
+                    await self._decode_offloaded(message, peer)
+                    return
+                
+                # Decrypt message
+                encrypted_data = message.payload["encrypted_data"]
+                try:
+                    if message.message_id in self._deferred_verification:
+                        self._deferred_verification.discard(message.message_id)
+                        if not self.quantum_engine.verify(encrypted_data.encode('ascii'), bytes.fromhex(message.quantum_signature), peer.quantum_key):
+                            self.signature_failures += 1
+                            logger.warning(f"⚠️ Invalid signature on organism message from {sender_id}")
+                            return
+                    
+                    decrypted_bytes = self.quantum_engine.decrypt_bytes(bytes.fromhex(encrypted_data), peer.quantum_key)
+                    if message.payload.get("compression") == "zlib":
+                        decrypted_bytes = self._compressor_for(sender_id).decompress(
+                            decrypted_bytes, message.payload.get("dictionary_id"))
+                    decrypted_message = decrypted_bytes.decode('utf-8')
+                    
+                    # HMAC signatures were verified with the frame or just above; legacy ones cover the plaintext
+                    scheme = message.payload.get("signature_scheme", QuantumCryptographyEngine.LEGACY_SIGNATURE)
+                    if (scheme != QuantumCryptographyEngine.HMAC_SIGNATURE and
+                            not self.quantum_engine.verify_quantum_signature(decrypted_message, message.quantum_signature, peer.quantum_key)):
+                        self.signature_failures += 1
+                        logger.warning(f"⚠️ Invalid signature on organism message from {sender_id}")
+                        return
+                    
+                    organism_data = json.loads(decrypted_message)
+                    
+                    logger.info(f"📧 Received organism message from {sender_id}: {organism_data.get('type', 'unknown')}")
+                    
+                except Exception as e:
+                    logger.error(f"Failed to decrypt message from {sender_id}: {e}")
+    
+    def _offloads_decode(self, message: DNAQNetMessage) -> bool:
+        """Whether an organism message is large enough to decode in the process pool"""
+        return self.decode_pool is not None and len(message.payload.get("encrypted_data", "")) >= self.decode_offload_bytes
+    
+    async def _decode_offloaded(self, message: DNAQNetMessage, peer: DNAQNetPeer):
+        """Verify, decrypt and parse a large organism message in a decode worker process"""
+        sender_id = message.sender_id
+        try:
+            payload = message.payload
+            dictionary_id = payload.get("dictionary_id")
+            dictionary = self._compressor_for(sender_id).remote_dictionaries[dictionary_id] if dictionary_id else None
+            scheme = payload.get("signature_scheme", QuantumCryptographyEngine.LEGACY_SIGNATURE)
+            verify_hmac = message.message_id in self._deferred_verification
+            self._deferred_verification.discard(message.message_id)
+            
+            started = time.perf_counter()
+            organism_data = await asyncio.get_running_loop().run_in_executor(
+                self.decode_pool, decode_organism_payload, payload["encrypted_data"], peer.quantum_key,
+                message.quantum_signature, scheme, verify_hmac, dictionary, payload.get("compression") == "zlib")
+            self.decode_stats["offloaded"] += 1
+            self.decode_stats["offloaded_bytes"] += len(payload["encrypted_data"])
+            self.decode_stats["offloaded_ms"] += (time.perf_counter() - started) * 1000
+            
+            if organism_data is None:
+                self.signature_failures += 1
+                logger.warning(f"⚠️ Invalid signature on organism message from {sender_id}")
+                return
+            
+            logger.info(f"📧 Received organism message from {sender_id}: {organism_data.get('type', 'unknown')}")
+        
+        except Exception as e:
+            logger.error(f"Failed to decrypt message from {sender_id}: {e}")
+    
+    async def _handle_transfer_begin(self, message: DNAQNetMessage):
+        """Open an incoming chunked transfer, or keep the partial one a resuming sender left behind"""
+        payload = message.payload
+        key = (message.sender_id, payload["transfer_id"])
+        if key in self.completed_transfers:
+            return
+        
+        chunk_size = int(payload["chunk_size"])
+        transfer = self.incoming_transfers.get(key)
+        if transfer is not None and transfer.chunk_size != chunk_size:
+            transfer.close()  # chunk boundaries moved, start over
+            transfer = None
+        
+        if transfer is None:
+            if not 0 < chunk_size <= MAX_STREAM_CHUNK_BYTES:
+                logger.warning(f"⚠️ Refusing transfer from {message.sender_id} with chunk size {chunk_size}")
+                return
+            self.incoming_transfers[key] = IncomingTransfer(payload["transfer_id"], message.sender_id, chunk_size)
+            self.transfer_stats["started"] += 1
+        else:
+            transfer.last_activity = time.time()
+            self.transfer_stats["resumed"] += 1
+    
+    async def _handle_transfer_chunk(self, message: DNAQNetMessage):
+        """Verify, decrypt and spool one chunk; deliver the organism once every chunk is on disk"""
+        payload = message.payload
+        key = (message.sender_id, payload["transfer_id"])
+        transfer = self.incoming_transfers.get(key)
+        peer = self.peers.get(message.sender_id)
+        if transfer is None or not peer or not peer.quantum_key:
+            return
+        
+        index = int(payload["index"])
+        last = bool(payload["last"])
+        ciphertext = bytes.fromhex(payload["data"])
+        if not self.quantum_engine.verify(self._chunk_header(transfer.transfer_id, index, last) + ciphertext,
+                                          bytes.fromhex(message.quantum_signature), peer.quantum_key):
+            self.transfer_stats["rejected_chunks"] += 1
+            logger.warning(f"⚠️ Invalid signature on chunk {index} of transfer {transfer.transfer_id} from {message.sender_id}")
+            return
+        
+        if len(ciphertext) > transfer.chunk_size or index * transfer.chunk_size + len(ciphertext) > self.max_transfer_bytes:
+            logger.warning(f"⚠️ Aborting transfer {transfer.transfer_id} from {message.sender_id}: exceeds {self.max_transfer_bytes} bytes")
+            del self.incoming_transfers[key]
+            transfer.close()
+            self.transfer_stats["aborted"] += 1
+            return
+        
+        transfer.write(index, self.quantum_engine.decrypt_bytes(ciphertext, peer.quantum_key), last)
+        self.transfer_stats["chunks_received"] += 1
+        if not transfer.complete:
+            return
+        
+        # Mark complete first so retransmitted chunks are acked while the organism is parsed
+        del self.incoming_transfers[key]
+        self.completed_transfers[key] = (transfer.size, time.time())
+        self.transfer_stats["completed"] += 1
+        try:
+            organism_data = await asyncio.get_running_loop().run_in_executor(self.offload_executor, transfer.read_organism)
+            logger.info(f"📦 Received streamed organism from {message.sender_id}: "
+                        f"{organism_data.get('type', 'unknown')} ({transfer.size} bytes)")
+        except Exception as e:
+            logger.error(f"Failed to parse streamed organism from {message.sender_id}: {e}")
+        finally:
+            transfer.close()
+    
+    def _expire_transfers(self):
+        """Drop partial transfers idle past the expiry window and forget old completions"""
+        now = time.time()
+        for key, transfer in list(self.incoming_transfers.items()):
+            if now - transfer.last_activity > self.transfer_expiry:
+                del self.incoming_transfers[key]
+                transfer.close()
+                self.transfer_stats["expired"] += 1
+        for key, (_, completed_at) in list(self.completed_transfers.items()):
+            if now - completed_at > self.transfer_expiry:
+                del self.completed_transfers[key]
+    
+    async def _handle_compression_dictionary(self, message: DNAQNetMessage):
+        """Store a compression dictionary shipped by a peer"""
+        sender_id = message.sender_id
+        peer = self.peers.get(sender_id)
+        if not peer or not peer.quantum_key:
+            return
+        
+        try:
+            dictionary = self.quantum_engine.decrypt_bytes(bytes.fromhex(message.payload["encrypted_dictionary"]), peer.quantum_key)
+            dictionary_id = message.payload["dictionary_id"]
+            if PeerPayloadCompressor.dictionary_id_for(dictionary) != dictionary_id:
+                logger.warning(f"⚠️ Compression dictionary from {sender_id} failed its integrity check")
+                return
+            
+            self._compressor_for(sender_id).remote_dictionaries[dictionary_id] = dictionary
+            logger.info(f"🗜️ Stored compression dictionary {dictionary_id} from {sender_id}")
+        
+        except Exception as e:
+            logger.error(f"Failed to store compression dictionary from {sender_id}: {e}")
+    
+    async def _handle_find_node(self, message: DNAQNetMessage):
+        """Learn the requester as a DHT contact; the response is built in _create_response"""
+        payload = message.payload
+        ip_address = payload.get("ip_address") or payload.get("observed_ip", "")
+        self._dht_observe(DHTContact(message.sender_id, ip_address, payload.get("port", 0), time.time()))
+    
+    async def _handle_route_update(self, message: DNAQNetMessage):
+        """Apply a neighbor's distance-vector advertisement"""
+        sender_id = message.sender_id
+        if message.payload.get("unlink"):
+            self._link_down(sender_id, keep_peer=True)
+            return
+        
+        distances = {}
+        endpoints = {}
+        for destination, (distance, ip_address, port) in message.payload.get("routes", {}).items():
+            distances[destination] = distance
+            if ip_address and port:
+                endpoints[destination] = (ip_address, port)
+        
+        self._queue_route_advertisement(self.routing.update(sender_id, distances, endpoints))
+    
+    async def _handle_smart_contract(self, message: DNAQNetMessage):
+        """Handle smart contract execution"""
+        contract_data = message.payload
+        logger.info(f"📜 Smart contract received: {contract_data.get('contract_type', 'unknown')}")
+    
+    async def _handle_consciousness_sync(self, message: DNAQNetMessage):
+        """Merge a peer's consciousness delta into the replicated state"""
+        changed = self.consciousness.receive(message.sender_id, message.payload)
+        
+        # Mirror replicated values onto the peer records they describe
+        for node_id in message.payload.get("entries", {}):
+            peer = self.peers.get(node_id)
+            entry = self.consciousness.entries.get(node_id)
+            if peer and entry and node_id != self.node_id:
+                peer.consciousness_level, peer.quantum_coherence = entry[1], entry[2]
+        
+        if changed:
+            logger.info(f"🧠 Consciousness sync with {message.sender_id} - merged {changed} entries, Level: {self.consciousness_level:.3f}")
+    
+    async def _handle_evolution_event(self, message: DNAQNetMessage):
+        """Handle evolution event"""
+        evolution_data = message.payload
         logger.info(f"🧬 Evolution event: {evolution_data.get('event_type', 'unknown')}")
     
-    async def _handle_heartbeat(self, message: DNAQNetMessage):
-        """Handle heartbeat message"""
-        sender_id = message.sender_id
+    async def _handle_heartbeat(self, message: DNAQNetMessage):
+        """Handle heartbeat message"""
+        sender_id = message.sender_id
+        
+        if sender_id in self.peers:
+            self.peers.touch(sender_id)
+            echo = message.payload.get("echo")
+            if echo is not None:
+                # The answer to our probe is a round-trip sample, not a beat of the peer's own schedule
+                if self._rtt_probes.get(sender_id) == echo:
+                    del self._rtt_probes[sender_id]
+                    self.latency.observe_rtt(sender_id, time.time() - echo)
+                return
+            
+            self.failure_detector.heartbeat(sender_id, expected_interval=message.payload.get("interval"))
+            if sender_id in self.suspected:
+                self.suspected.discard(sender_id)
+                logger.info(f"💚 Peer {sender_id} recovered")
+            self._schedule_outbox_replay(sender_id)
+            
+            if message.payload.get("probe") and sender_id not in self._routed:
+                asyncio.ensure_future(self._send_to_peer(self.peers[sender_id], self._create_echo(message)))
+    
+    # Periodic Tasks
+    async def _heartbeat_loop(self):
+        """Send periodic heartbeats to peers"""
+        while self.running:
+            try:
+                # Drop peers that have gone silent and refresh suspicion before fanning out
+                self._expire_peers()
+                self._expire_transfers()
+                self._update_suspicion()
+                self._service_outbox()
+                self._close_idle_mux()
+                self._rebalance_links()
+                self._share_routing()
+                self._refresh_trust()
+                
+                if self.broadcast_mode == "gossip":
+                    await self._disseminate(self._create_heartbeat(self.heartbeat_interval))
+                else:
+                    await self._send_adaptive_heartbeats()
+                
+                await asyncio.sleep(self.heartbeat_interval)
+            
+            except Exception as e:
+                logger.error(f"Heartbeat loop error: {e}")
+    
+    def _create_heartbeat(self, interval: float, probe: bool = False) -> DNAQNetMessage:
+        """Create a heartbeat announcing when the next one is due; a probe asks peers to echo its timestamp"""
+        payload = {
+            "consciousness_level": self.consciousness_level,
+            "quantum_coherence": self.quantum_coherence,
+            "timestamp": time.time(),
+            "interval": interval
+        }
+        if probe:
+            payload["probe"] = True
+        return DNAQNetMessage(
+            message_id=secrets.token_hex(16),
+            sender_id=self.node_id,
+            recipient_id="broadcast",
+            message_type=MessageType.HEARTBEAT,
+            payload=payload,
+            quantum_signature="",
+            timestamp=time.time(),
+            ttl=60
+        )
+    
+    def _create_echo(self, probe: DNAQNetMessage) -> DNAQNetMessage:
+        """Heartbeat ack returning a probe's timestamp to its sender"""
+        return DNAQNetMessage(
+            message_id=secrets.token_hex(16),
+            sender_id=self.node_id,
+            recipient_id=probe.sender_id,
+            message_type=MessageType.HEARTBEAT,
+            payload={"status": "acknowledged", "echo": probe.payload.get("timestamp")},
+            quantum_signature="",
+            timestamp=time.time(),
+            ttl=60
+        )
+    
+    async def _send_adaptive_heartbeats(self):
+        """Heartbeat the peers that are due, grouped by their current interval"""
+        now = time.time()
+        groups: Dict[float, List[DNAQNetPeer]] = {}
+        for peer in self.peers.values():
+            if peer.peer_id in self._routed:
+                continue  # liveness of routed peers is the routing layer's concern
+            state = self._heartbeat_state.get(peer.peer_id)
+            if state and now < state[0]:
+                continue
+            interval = self._next_heartbeat_interval(peer.peer_id)
+            groups.setdefault(interval, []).append(peer)
         
-        if sender_id in self.peers:
-            self.peers[sender_id].last_seen = time.time()
+        for interval, group in groups.items():
+            heartbeat = self._create_heartbeat(interval, probe=True)
+            for peer in group:
+                if self.LATENCY_CAPABILITY in peer.capabilities:
+                    # A probe still unanswered a whole interval later was lost on the way or back. The new
+                    # one is recorded before sending, as its echo can beat the rest of the fan-out back
+                    if peer.peer_id in self._rtt_probes:
+                        self.latency.observe_error(peer.peer_id)
+                    self._rtt_probes[peer.peer_id] = heartbeat.payload["timestamp"]
+            
+            statuses = await self._fan_out(heartbeat, group)
+            for peer, status in zip(group, statuses):
+                state = self._heartbeat_state.setdefault(peer.peer_id, [0.0, interval, 0])
+                # Tolerate timer jitter so a peer is not skipped for a whole extra tick
+                state[0] = now + interval - self.heartbeat_interval / 2
+                state[1] = interval
+                state[2] = state[2] + 1 if status == SendStatus.SENT else 0
+                if status != SendStatus.SENT:
+                    self._rtt_probes.pop(peer.peer_id, None)  # the failed send is already counted
     
-    # Periodic Tasks
-    async def _heartbeat_loop(self):
-        """Send periodic heartbeats to peers"""
+    def _refresh_trust(self):
+        """Trust follows each observed peer's reliability, re-indexed only when it moves noticeably"""
+        for peer_id in self.latency.rtt.keys() | self.latency.error_rate.keys():
+            peer = self.peers.get(peer_id)
+            trust_score = round(1.0 - self.latency.error_rate.get(peer_id, 0.0), 2)
+            if peer and abs(trust_score - peer.trust_score) >= 0.05:
+                self.peers.set_trust(peer_id, trust_score)
+    
+    def _next_heartbeat_interval(self, peer_id: str) -> float:
+        """Double a stable peer's heartbeat interval, reset it on failure or suspicion"""
+        if peer_id in self.suspected:
+            return self.heartbeat_max_interval  # low-rate probe until the peer recovers
+        
+        state = self._heartbeat_state.get(peer_id)
+        if state is None or state[2] == 0:
+            return self.heartbeat_interval
+        
+        interval = state[1]
+        stable = self.failure_detector.phi(peer_id) < self.failure_detector.threshold / 2
+        if stable and state[2] >= 3:
+            state[2] = 1
+            return min(interval * 2, self.heartbeat_max_interval)
+        return interval
+    
+    def _update_suspicion(self):
+        """Mark peers whose phi exceeds the threshold as suspected"""
+        now = time.time()
+        for peer_id in self.peers.keys():
+            if peer_id in self._routed:
+                continue  # not heartbeated directly
+            if peer_id not in self.suspected and not self.failure_detector.is_available(peer_id, now):
+                self.suspected.add(peer_id)
+                logger.warning(f"⚠️ Peer {peer_id} suspected - phi {self.failure_detector.phi(peer_id, now):.1f}")
+    
+    def _restore_snapshot(self):
+        """Reload peers, their keys, trust and routing links from the last snapshot"""
+        try:
+            age = self.snapshots.age()
+            if age is None:
+                return
+            if age > self.peer_expiry:
+                # Every peer in it would have expired had we kept running
+                logger.info(f"♻️ Discarding peer snapshot written {age:.0f}s ago")
+                self.snapshots.clear()
+                return
+            
+            entries: Dict[str, Tuple[DNAQNetPeer, bool, bool, Dict[str, bytes]]] = {}
+            for kind, body in self.snapshots.load():
+                if kind == SNAPSHOT_REMOVE:
+                    entries.pop(body.decode(), None)
+                elif kind == SNAPSHOT_UPSERT:
+                    entry = decode_peer_snapshot(body)
+                    entries[entry[0].peer_id] = entry
+        except Exception as e:
+            logger.error(f"Failed to load peer snapshot: {e}")
+            return
+        
+        now = time.time()
+        for peer, routed, key_originated, dictionaries in entries.values():
+            if peer.quantum_key and peer.quantum_key.expiry_time <= now:
+                peer.quantum_key = None  # rotated while we were down; the next send establishes a new key
+                self.snapshot_stats["keys_expired"] += 1
+            self.peers[peer.peer_id] = peer
+            
+            if peer.quantum_key:
+                self.quantum_engine.active_keys[peer.quantum_key.key_id] = peer.quantum_key
+                if self.shared_store:
+                    self._share("key", peer.peer_id, asdict(peer.quantum_key))
+                if key_originated:
+                    self._key_originated.add(peer.peer_id)
+                    self.key_scheduler.schedule(peer.peer_id, peer.quantum_key)
+                self.snapshot_stats["keys_restored"] += 1
+            if dictionaries:
+                self._compressor_for(peer.peer_id).remote_dictionaries.update(dictionaries)
+            
+            # Neighbors still route through us, so links come back without advertising anything
+            if routed or not (peer.ip_address and peer.port):
+                self._routed.add(peer.peer_id)
+            else:
+                self.routing.link_up(peer.peer_id, (peer.ip_address, peer.port))
+            if peer.ip_address and peer.port:
+                # Every restored contact is equally stale, so full buckets are not worth pinging yet
+                self.dht.update(DHTContact(peer.peer_id, peer.ip_address, peer.port, now))
+            if self.shared_store:
+                self._share_peer(peer)
+        
+        self.peers.drain_changed()
+        self.snapshot_stats["peers_restored"] += len(entries)
+        logger.info(f"♻️ Restored {len(entries)} peers and {self.snapshot_stats['keys_restored']} keys from snapshot")
+    
+    def _snapshot_record(self, peer_id: str) -> bytes:
+        """Encode a peer's current state, or its removal"""
+        peer = self.peers.get(peer_id)
+        if peer is None:
+            return PeerSnapshotStore.record(SNAPSHOT_REMOVE, peer_id.encode())
+        compressor = self.compressors.get(peer_id)
+        body = encode_peer_snapshot(peer, peer_id in self._routed, peer_id in self._key_originated,
+                                    compressor.remote_dictionaries if compressor else {})
+        return PeerSnapshotStore.record(SNAPSHOT_UPSERT, body)
+    
+    async def _snapshot_records(self, peer_ids: List[str]) -> AsyncIterator[List[bytes]]:
+        """Encode peers snapshot_batch at a time, yielding to the event loop between batches"""
+        for start in range(0, len(peer_ids), self.snapshot_batch):
+            yield [self._snapshot_record(peer_id) for peer_id in peer_ids[start:start + self.snapshot_batch]]
+            await asyncio.sleep(0)
+    
+    async def _snapshot_loop(self):
+        """Journal changed peers every snapshot_interval; rewrite the base once the journal outgrows it"""
         while self.running:
+            await asyncio.sleep(self.snapshot_interval)
+            if not self.running:
+                break
             try:
-                heartbeat_message = DNAQNetMessage(
-                    message_id=secrets.token_hex(16),
-                    sender_id=self.node_id,
-                    recipient_id="broadcast",
-                    message_type=MessageType.HEARTBEAT,
-                    payload={
-                        "consciousness_level": self.consciousness_level,
-                        "quantum_coherence": self.quantum_coherence,
-                        "timestamp": time.time()
-                    },
-                    quantum_signature="",
-                    timestamp=time.time(),
-                    ttl=60
-                )
-                
-                # Send to all peers
-                for peer in self.peers.values():
-                    await self._send_to_peer(peer, heartbeat_message)
-                
-                await asyncio.sleep(30)  # Send heartbeat every 30 seconds
-            
+                await self._flush_snapshot_changes()
+                journal_bytes = await self.loop.run_in_executor(self.offload_executor, self.snapshots.journal_bytes)
+                if journal_bytes > max(self.snapshots.base_bytes(), 64 * 1024):
+                    await self._compact_snapshot()
             except Exception as e:
-                logger.error(f"Heartbeat loop error: {e}")
+                logger.error(f"Peer snapshot error: {e}")
+    
+    async def _flush_snapshot_changes(self):
+        """Append every peer changed since the last flush to the journal"""
+        async for records in self._snapshot_records(sorted(self.peers.drain_changed())):
+            await self.loop.run_in_executor(self.offload_executor, self.snapshots.append, records)
+            self.snapshot_stats["peers_journaled"] += len(records)
+    
+    async def _compact_snapshot(self):
+        """Write a new base of every peer while changes keep going to a fresh journal"""
+        started = time.perf_counter()
+        base = await self.loop.run_in_executor(self.offload_executor, self.snapshots.begin_compaction)
+        try:
+            async for records in self._snapshot_records(list(self.peers.keys())):
+                await self.loop.run_in_executor(self.offload_executor, base.write, b''.join(records))
+            await self.loop.run_in_executor(self.offload_executor, self.snapshots.commit_base, base)
+        finally:
+            base.close()
+        self.snapshot_stats["compactions"] += 1
+        self.snapshot_stats["last_compaction_ms"] = round((time.perf_counter() - started) * 1000)
+    
+    def _journal_changes(self):
+        """Journal every pending change synchronously (at shutdown)"""
+        changed = self.peers.drain_changed()
+        if changed:
+            self.snapshots.append([self._snapshot_record(peer_id) for peer_id in changed])
+            self.snapshot_stats["peers_journaled"] += len(changed)
+    
+    def _expire_peers(self):
+        """Remove peers not seen within the expiry window"""
+        for peer in self.peers.expire(self.peer_expiry):
+            self._link_down(peer.peer_id, keep_peer=False)
+            self._routed.discard(peer.peer_id)
+            self.batchers.pop(peer.peer_id, None)
+            self.successor_keys.pop(peer.peer_id, None)
+            self.failure_detector.remove(peer.peer_id)
+            self.suspected.discard(peer.peer_id)
+            self._heartbeat_state.pop(peer.peer_id, None)
+            self.compressors.pop(peer.peer_id, None)
+            self.metrics.forget_peer(peer.peer_id)
+            self.consciousness.forget_peer(peer.peer_id)
+            self._close_mux(peer.peer_id)
+            self._key_originated.discard(peer.peer_id)
+            self._key_replies.pop(peer.peer_id, None)
+            self._key_probes.pop(peer.peer_id, None)
+            self.latency.forget(peer.peer_id)
+            self._rtt_probes.pop(peer.peer_id, None)
+            self._udp_recv_windows.pop(peer.peer_id, None)
+            self._retired_seal_keys.pop(peer.peer_id, None)
+            for lane, key_id in [(lane, key_id) for peer_id, lane, key_id in self.replay_windows if peer_id == peer.peer_id]:
+                self.replay_windows.pop((peer.peer_id, lane, key_id), None)
+            for lane in SendPriority:
+                self._seal_seq.pop((peer.peer_id, lane), None)
+            self._share("peer", peer.peer_id, None)
+            if peer.quantum_key:
+                self.quantum_engine.retire_key(peer.quantum_key.key_id)
+            logger.info(f"💤 Peer {peer.peer_id} expired - not seen for {self.peer_expiry:.0f}s")
+    
+    def _link_up(self, peer: DNAQNetPeer):
+        """Make a peer a direct routing neighbor and send it our full table"""
+        self._routed.discard(peer.peer_id)
+        endpoint = (peer.ip_address, peer.port) if peer.ip_address and peer.port else None
+        self._queue_route_advertisement(self.routing.link_up(peer.peer_id, endpoint))
+        asyncio.ensure_future(self._send_route_update(peer, self.routing.full_advertisement(peer.peer_id)))
+    
+    def _link_down(self, peer_id: str, keep_peer: bool):
+        """Withdraw a routing link; a kept peer is reached through its next hop from now on"""
+        if peer_id not in self.routing.links:
+            return
+        self._queue_route_advertisement(self.routing.link_down(peer_id))
+        if keep_peer and peer_id in self.peers:
+            self._routed.add(peer_id)
+            self.peers.mark_changed(peer_id)
+            self._share_peer(self.peers[peer_id])
+            self.failure_detector.remove(peer_id)
+            self.suspected.discard(peer_id)
+            self._heartbeat_state.pop(peer_id, None)
+            self._rtt_probes.pop(peer_id, None)
+    
+    def _rebalance_links(self):
+        """Connect to the links the topology selects and release those neither end selects"""
+        for node_id in self.routing.select_links() - self.routing.links - self._connecting:
+            endpoint = self.routing.endpoints.get(node_id)
+            if endpoint:
+                asyncio.ensure_future(self._connect_link(node_id, endpoint))
+        
+        # A node whose neighbors all released it rejoins through any peer it still has an address for
+        if not self.routing.links and not self._connecting:
+            for peer in list(self.peers.values())[:2]:
+                if peer.ip_address and peer.port:
+                    asyncio.ensure_future(self._connect_link(peer.peer_id, (peer.ip_address, peer.port)))
+        
+        for node_id in list(self.routing.links):
+            if not self.routing.wants_link(node_id) and self.routing.has_alternate_route(node_id):
+                self._link_down(node_id, keep_peer=True)
+                peer = self.peers.get(node_id)
+                if peer:
+                    asyncio.ensure_future(self._send_route_update(peer, {}, unlink=True))
+    
+    async def _connect_link(self, node_id: str, endpoint: Tuple[str, int]):
+        """Handshake with a node the topology selected as a link"""
+        self._connecting.add(node_id)
+        try:
+            await self.connect_to_peer(*endpoint)
+        finally:
+            self._connecting.discard(node_id)
+    
+    def _advertised_endpoint(self, node_id: str) -> Tuple[str, int]:
+        """Address to advertise for a node; a wildcard bind is left for the receiver to fill in"""
+        if node_id == self.node_id:
+            return ("" if self.ip_address == "0.0.0.0" else self.ip_address, self.port)
+        return self.routing.endpoints.get(node_id, ("", 0))
+    
+    def _queue_route_advertisement(self, destinations: Set[str]):
+        """Coalesce route changes into one incremental advertisement per link"""
+        if not destinations:
+            return
+        self._route_changes |= destinations
+        if not self._route_flush_pending:
+            self._route_flush_pending = True
+            asyncio.get_running_loop().call_later(
+                self.batch_max_delay, lambda: asyncio.ensure_future(self._flush_route_advertisement()))
+    
+    async def _flush_route_advertisement(self):
+        """Send the pending route changes to every link, poisoned per link"""
+        changes, self._route_changes = self._route_changes, set()
+        self._route_flush_pending = False
+        
+        updates = []
+        for link_id in list(self.routing.links):
+            peer = self.peers.get(link_id)
+            if peer:
+                updates.append(self._send_route_update(peer, self.routing.advertisement(link_id, changes)))
+        await asyncio.gather(*updates)
+        self._share_routing()
+    
+    async def _send_route_update(self, peer: DNAQNetPeer, distances: Dict[str, int], unlink: bool = False):
+        """Send a distance-vector advertisement (with endpoints) to a neighbor"""
+        if not distances and not unlink:
+            return
+        
+        routes = {destination: [distance, *self._advertised_endpoint(destination)]
+                  for destination, distance in distances.items()}
+        payload: Dict[str, Any] = {"routes": routes}
+        if unlink:
+            payload["unlink"] = True
+        
+        message = DNAQNetMessage(
+            message_id=secrets.token_hex(16),
+            sender_id=self.node_id,
+            recipient_id=peer.peer_id,
+            message_type=MessageType.ROUTE_UPDATE,
+            payload=payload,
+            quantum_signature="",
+            timestamp=time.time(),
+            ttl=60
+        )
+        await self._send_to_peer(peer, message)
     
     async def _key_rotation_loop(self):
-        """Rotate quantum keys periodically"""
+        """Rotate quantum keys as their deadlines come due"""
         while self.running:
             try:
-                current_time = time.time()
-                
-                # Check for expired keys
-                for peer_id, peer in self.peers.items():
-                    if peer.quantum_key and peer.quantum_key.expiry_time < current_time:
-                        # Generate new quantum key
-                        new_key = self.quantum_engine.generate_quantum_key(peer_id)
-                        peer.quantum_key = new_key
-                        
-                        logger.info(f"🔄 Rotated quantum key for peer {peer_id}")
+                for action, peer_id, key_id in self.key_scheduler.pop_due(time.time()):
+                    peer = self.peers.get(peer_id)
+                    if not peer or not peer.quantum_key or peer.quantum_key.key_id != key_id:
+                        continue  # peer gone or key already replaced
+                    
+                    if action == KeyRotationScheduler.PREFETCH:
+                        if peer_id not in self.successor_keys:
+                            asyncio.ensure_future(self._prefetch_successor_key(peer_id))
+                    else:
+                        await self._rotate_key(peer)
                 
-                await asyncio.sleep(60)  # Check every minute
+                # Sleep until the next deadline, or until an earlier one is scheduled
+                next_due = self.key_scheduler.next_due()
+                timeout = 60.0 if next_due is None else max(0.0, min(60.0, next_due - time.time()))
+                self.key_scheduler.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.key_scheduler.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
             
             except Exception as e:
                 logger.error(f"Key rotation loop error: {e}")
+                await asyncio.sleep(1)
+    
+    async def _generate_key_async(self, peer_id: str) -> QuantumKey:
+        """Generate a quantum key in the executor so circuit work never blocks the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.offload_executor, self.quantum_engine.generate_quantum_key, peer_id)
+    
+    async def _establish_key(self, peer: DNAQNetPeer, replace: bool = False):
+        """Request a peer's first key once, however many sends are waiting for it; the key may still be
+        missing afterwards when the peer did not answer in time"""
+        pending = self._pending_keys.get(peer.peer_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._create_first_key(peer, replace))
+            self._pending_keys[peer.peer_id] = pending
+            pending.add_done_callback(lambda _: self._pending_keys.pop(peer.peer_id, None))
+        await asyncio.shield(pending)
+    
+    async def _create_first_key(self, peer: DNAQNetPeer, replace: bool = False):
+        """Ask the peer for a first key with our half of a Diffie-Hellman exchange and wait until one is
+        installed; a request replacing our current key is MACed under it"""
+        previous_key = peer.quantum_key if replace else None
+        private, public = await self.loop.run_in_executor(self.offload_executor, key_exchange_keypair)
+        if peer.quantum_key is not previous_key:
+            return  # the peer's own request was answered meanwhile
+        installed = self.loop.create_future()
+        self._key_requests[peer.peer_id] = (private, public, installed)
+        payload = {"dh_public": format(public, 'x')}
+        if previous_key:
+            payload["mac"] = self.quantum_engine.sign(payload["dh_public"].encode('ascii'), previous_key).hex()
+        message = DNAQNetMessage(
+            message_id=secrets.token_hex(16),
+            sender_id=self.node_id,
+            recipient_id=peer.peer_id,
+            message_type=MessageType.QUANTUM_KEY_EXCHANGE,
+            payload=payload,
+            quantum_signature="",
+            timestamp=time.time(),
+            ttl=60
+        )
+        self.key_exchange_stats["requested"] += 1
+        try:
+            if await self._send_to_peer(peer, message) == SendStatus.SENT:
+                await asyncio.wait_for(asyncio.shield(installed), self.peer_send_timeout * 2)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ No first key from {peer.peer_id} within {self.peer_send_timeout * 2:.0f}s")
+        finally:
+            if self._key_requests.get(peer.peer_id, (0, 0, None))[2] is installed:
+                del self._key_requests[peer.peer_id]
+    
+    async def _prefetch_successor_key(self, peer_id: str):
+        """Generate a peer's successor key ahead of its current key's expiry"""
+        try:
+            self.successor_keys[peer_id] = await self._generate_key_async(peer_id)
+        except Exception as e:
+            logger.error(f"Successor key generation failed for {peer_id}: {e}")
+    
+    async def _rotate_key(self, peer: DNAQNetPeer):
+        """Swap in a peer's successor key"""
+        successor = self.successor_keys.pop(peer.peer_id, None)
+        if successor is None:
+            # Prefetch has not finished; generate now, still off the event loop
+            successor = await self._generate_key_async(peer.peer_id)
+        else:
+            # A prefetched key's lifetime starts when it becomes current
+            now = time.time()
+            successor = replace(successor, creation_time=now,
+                                expiry_time=now + self.quantum_engine.key_rotation_interval)
+            self.quantum_engine.active_keys[successor.key_id] = successor
+        
+        self._install_key(peer, successor, announce=True)
+        self.keys_rotated += 1
+        logger.info(f"🔄 Rotated quantum key for peer {peer.peer_id}")
+    
+    def _install_key(self, peer: DNAQNetPeer, quantum_key: QuantumKey, announce: bool):
+        """Make a key current for a peer; keys we originate are scheduled for rotation and announced"""
+        previous_key = peer.quantum_key
+        peer.quantum_key = quantum_key
+        if previous_key and previous_key.key_id != quantum_key.key_id:
+            self.quantum_engine.retire_key(previous_key.key_id)
+            self._retire_seal_key(peer.peer_id, previous_key)
+        self._share("key", peer.peer_id, asdict(quantum_key))
+        installed, self._key_installed = self._key_installed, asyncio.Event()
+        installed.set()
+        self.peers.mark_changed(peer.peer_id)
+        
+        # Whichever way the key arrived, a first-key request of ours is settled
+        request = self._key_requests.pop(peer.peer_id, None)
+        if request and not request[2].done():
+            request[2].set_result(None)
+        
+        if announce:
+            self._key_originated.add(peer.peer_id)
+            self.key_scheduler.schedule(peer.peer_id, quantum_key)
+            asyncio.ensure_future(self._announce_key(peer, quantum_key, previous_key))
+        else:
+            self._key_originated.discard(peer.peer_id)
+    
+    async def _announce_key(self, peer: DNAQNetPeer, quantum_key: QuantumKey, previous_key: Optional[QuantumKey]):
+        """Share a key with its peer: a first key wrapped under the exchange that asked for it, a successor
+        encrypted and MACed under the previous key"""
+        key_json = json.dumps(asdict(quantum_key))
+        reply = self._key_replies.pop(peer.peer_id, None)
+        if reply:
+            public, secret = reply
+            payload = {"key_id": quantum_key.key_id, "dh_public": format(public, 'x'),
+                       "encrypted_key": wrap_key(secret, key_json.encode('utf-8')).hex()}
+        elif previous_key:
+            encrypted_key = self.quantum_engine.encrypt_message(key_json, previous_key)
+            payload = {"key_id": quantum_key.key_id, "encrypted_key": encrypted_key,
+                       "mac": self.quantum_engine.sign(encrypted_key.encode('ascii'), previous_key).hex()}
+        else:
+            logger.error(f"No key exchange to announce the first key for {peer.peer_id} under")
+            return
+        
+        message = DNAQNetMessage(
+            message_id=secrets.token_hex(16),
+            sender_id=self.node_id,
+            recipient_id=peer.peer_id,
+            message_type=MessageType.QUANTUM_KEY_EXCHANGE,
+            payload=payload,
+            quantum_signature="",
+            timestamp=time.time(),
+            ttl=60
+        )
+        await self._send_to_peer(peer, message)
     
     async def _consciousness_sync_loop(self):
         """Synchronize consciousness with network"""
         while self.running:
             try:
-                sync_message = DNAQNetMessage(
-                    message_id=secrets.token_hex(16),
-                    sender_id=self.node_id,
-                    recipient_id="broadcast",
-                    message_type=MessageType.CONSCIOUSNESS_SYNC,
-                    payload={
-                        "consciousness_level": self.consciousness_level,
-                        "quantum_coherence": self.quantum_coherence,
-                        "capabilities": self.capabilities
-                    },
-                    quantum_signature="",
-                    timestamp=time.time(),
-                    ttl=300
-                )
+                self._publish_consciousness()
                 
-                # Send to all peers
-                for peer in self.peers.values():
-                    await self._send_to_peer(peer, sync_message)
+                # Deltas travel over direct links only; the CRDT carries them on across the overlay
+                linked = [peer for peer in self.peers.values()
+                          if peer.peer_id not in self.suspected and peer.peer_id not in self._routed]
+                await asyncio.gather(*(self._send_consciousness_delta(peer) for peer in linked))
                 
-                await asyncio.sleep(120)  # Sync every 2 minutes
+                await asyncio.sleep(self.sync_interval)
             
             except Exception as e:
                 logger.error(f"Consciousness sync loop error: {e}")
+                await asyncio.sleep(1)
+    
+    def _publish_consciousness(self):
+        """Drift toward the replicated network mean and publish our entry once it has moved far enough"""
+        others = [entry[1] for node_id, entry in self.consciousness.entries.items() if node_id != self.node_id]
+        if others:
+            network_mean = sum(others) / len(others)
+            self.consciousness_level = max(0.0, min(1.0, self.consciousness_level + (network_mean - self.consciousness_level) * 0.01))
+        
+        _, published_consciousness, published_coherence = self.consciousness.entries[self.node_id]
+        if (abs(self.consciousness_level - published_consciousness) >= self.CONSCIOUSNESS_PUBLISH_STEP or
+                abs(self.quantum_coherence - published_coherence) >= self.CONSCIOUSNESS_PUBLISH_STEP):
+            self.consciousness.set_local(self.consciousness_level, self.quantum_coherence)
+    
+    async def _send_consciousness_delta(self, peer: DNAQNetPeer):
+        """Send a peer the consciousness entries it has not acknowledged, if there are any"""
+        payload = self.consciousness.payload_for(peer.peer_id)
+        if payload is None:
+            return
+        
+        message = DNAQNetMessage(
+            message_id=secrets.token_hex(16),
+            sender_id=self.node_id,
+            recipient_id=peer.peer_id,
+            message_type=MessageType.CONSCIOUSNESS_SYNC,
+            payload=payload,
+            quantum_signature="",
+            timestamp=time.time(),
+            ttl=300
+        )
+        async with self._send_slots:
+            if await self._send_to_peer(peer, message) != SendStatus.SENT:
+                self.consciousness.send_failed(peer.peer_id)
     
     def stop(self):
         """Stop the DNA-QNet node"""
         self.running = False
         
         if self.server_socket:
+            # Closing alone leaves the port bound while the network thread sits in accept()
+            try:
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             self.server_socket.close()
         
+        if self.proxy_socket:
+            self.proxy_socket.close()
+        
+        if self.udp_transport:
+            self.udp_transport.close()
+        
+        if self.metrics_server:
+            self.metrics_server.close()
+        
+        for transfer in self.incoming_transfers.values():
+            transfer.close()
+        self.incoming_transfers.clear()
+        
+        if self.outbox:
+            self.outbox.sync()
+            self.outbox.close()
+        
+        if self.snapshots and self.is_primary:
+            try:
+                self._journal_changes()
+            except Exception as e:
+                logger.error(f"Final snapshot failed: {e}")
+            self.snapshots.close()
+        
+        for connection in list(self.mux_connections.values()) + list(self.inbound_mux):
+            connection.close()
+        self.mux_connections.clear()
+        
+        if self.entropy_pool:
+            self.entropy_pool.stop()
+        
         if self.executor:
-            self.executor.shutdown(wait=True)
+            # Connection workers wait on this loop, so waiting for them here would deadlock
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.offload_executor.shutdown(wait=False, cancel_futures=True)
+        
+        if self.decode_pool:
+            self.decode_pool.shutdown(wait=False, cancel_futures=True)
         
         logger.info(f"🛑 DNA-QNet node {self.node_id} stopped")
     
+    @property
+    def message_count(self) -> int:
+        """Messages received plus messages sent by this node"""
+        return self.metrics.total
+    
+    def _metrics_gauges(self) -> Dict[str, Any]:
+        """Point-in-time values exported next to the message counters"""
+        return {
+            "peers": len(self.peers),
+            "suspected_peers": len(self.suspected),
+            "signature_failures": self.signature_failures,
+            "send_queue_depth": {peer_id: batcher.queue_depth() for peer_id, batcher in self.batchers.items()}
+        }
+    
+    async def _serve_metrics(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer one HTTP request with the Prometheus text exposition of this node's metrics"""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), self.peer_send_timeout)
+            while (await asyncio.wait_for(reader.readline(), self.peer_send_timeout)).strip():
+                pass  # headers are not needed
+            
+            path = request_line.split()[1] if len(request_line.split()) > 1 else b""
+            if path.split(b"?")[0] == b"/metrics":
+                status = "200 OK"
+                body = self.metrics.to_prometheus(self.node_id, self._metrics_gauges()).encode()
+            else:
+                status = "404 Not Found"
+                body = b"not found\n"
+            
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        
+        except Exception as e:
+            logger.error(f"Metrics request error: {e}")
+        finally:
+            writer.close()
+    
     def get_status(self) -> Dict[str, Any]:
         """Get node status"""
         return {
@@ -610,29 +4385,969 @@ class DNAQNetNode:
             "quantum_coherence": self.quantum_coherence,
             "peer_count": len(self.peers),
             "capabilities": self.capabilities,
-            "quantum_available": QUANTUM_AVAILABLE
+            "quantum_available": QUANTUM_AVAILABLE,
+            "batching": self._get_batching_stats(),
+            "messages": self.metrics.get_stats(),
+            "send_queue_depth": {peer_id: batcher.queue_depth() for peer_id, batcher in self.batchers.items()},
+            "gossip": {
+                "mode": self.broadcast_mode,
+                "fanout": self.gossip_fanout,
+                "rounds": self.gossip_rounds,
+                "forwarded": self.gossip_forwarded
+            },
+            "entropy": self.entropy_pool.get_stats() if self.entropy_pool else None,
+            "compression": {
+                "enabled": self.payload_compression,
+                "peers": {peer_id: compressor.get_stats() for peer_id, compressor in self.compressors.items()}
+            },
+            "signatures": {
+                "scheme": self.signature_scheme,
+                "failures": self.signature_failures
+            },
+            "key_rotation": {
+                "scheduled_deadlines": len(self.key_scheduler),
+                "successor_keys_ready": len(self.successor_keys),
+                "keys_rotated": self.keys_rotated
+            },
+            "key_exchange": dict(self.key_exchange_stats),
+            "latency": {
+                "selection": self.peer_selection,
+                **self.latency.get_stats()
+            },
+            "failure_detector": {
+                "phi_threshold": self.failure_detector.threshold,
+                "suspected_peers": sorted(self.suspected)
+            },
+            "dedup": {
+                **self.dedup.get_stats(),
+                "hits_by_type": dict(self.dedup_hits_by_type)
+            },
+            "decode": {
+                "workers": self.decode_workers,
+                "offload_bytes": self.decode_offload_bytes,
+                **self.decode_stats
+            },
+            "transfers": {
+                "incoming": len(self.incoming_transfers),
+                "chunk_bytes": self.stream_chunk_bytes,
+                "window": self.stream_window,
+                **self.transfer_stats
+            },
+            "consciousness": self.consciousness.get_stats(),
+            "mux": self._mux_stats(),
+            "replay": {
+                "window": self.replay_window,
+                "max_skew_seconds": self.replay_max_skew,
+                "windows": len(self.replay_windows),
+                **self.replay_stats
+            },
+            "outbox": {
+                "enabled": self.outbox is not None,
+                "pending": {peer_id: self.outbox.pending(peer_id) for peer_id in self.outbox.peers()} if self.outbox else {},
+                **self.outbox_stats,
+                **(self.outbox.stats if self.outbox else {})
+            },
+            "snapshots": {
+                "enabled": self.snapshots is not None,
+                "pending_changes": self.peers.pending_changes(),
+                **self.snapshot_stats,
+                **(self.snapshots.stats if self.snapshots else {})
+            },
+            "workers": {
+                "worker_index": self.worker_index,
+                "shared_store": self.shared_store.path if self.shared_store else None,
+                "frames_proxied": self.frames_proxied,
+                "proxy_auth_failures": self.proxy_auth_failures
+            },
+            "udp": {
+                "enabled": self.udp_transport is not None,
+                **self.udp_stats
+            },
+            "dht": {
+                "contacts": len(self.dht),
+                "buckets_in_use": sum(1 for bucket in self.dht.buckets if bucket),
+                "lookups": self.dht_lookups,
+                "rounds_per_lookup": self.dht_lookup_rounds / self.dht_lookups if self.dht_lookups else 0.0
+            },
+            "routing": {
+                "topology": self.topology.value,
+                "links": len(self.routing.links),
+                "routed_peers": len(self._routed),
+                "routes": len(self.routing),
+                "known_nodes": self.routing.members(),
+                "forwarded": self.messages_forwarded,
+                "unroutable": self.messages_unroutable
+            }
+        }
+    
+    def _get_batching_stats(self) -> Dict[str, Any]:
+        """Aggregate outbound frame coalescing statistics across peers"""
+        frames_sent = sum(batcher.frames_sent for batcher in self.batchers.values())
+        messages_sent = sum(batcher.messages_sent for batcher in self.batchers.values())
+        dropped: Counter = Counter()
+        for batcher in self.batchers.values():
+            dropped.update(batcher.dropped)
+        return {
+            "frames_sent": frames_sent,
+            "messages_sent": messages_sent,
+            "messages_per_frame": messages_sent / frames_sent if frames_sent else 0.0,
+            "queued_messages": sum(batcher.queue_depth() for batcher in self.batchers.values()),
+            "queue_policy": self.send_queue_policy,
+            "dropped": dict(dropped)
         }
 
-async def main():
-    """Main entry point for DNA-QNet node"""
-    import argparse
+def simulate_peer_selection(mode: str, peer_count: int = 64, requests: int = 20000, slow_fraction: float = 0.1,
+                            flaky_fraction: float = 0.05, timeout: float = 1.0, seed: Optional[int] = None) -> Dict[str, Any]:
+    """Simulate requests each served by one chosen peer out of peer_count, with slow and flaky peers and, halfway
+    through, some fast peers turning slow; failed attempts cost the timeout and are retried on another choice"""
+    rng = random.Random(seed)
+    tracker = PeerLatencyTracker(failure_penalty=timeout)
+    peer_ids = [f"peer-{index}" for index in range(peer_count)]
+    base_rtt = {peer_id: 0.02 * rng.lognormvariate(0.0, 0.5) for peer_id in peer_ids}
+    error_rate = {peer_id: 0.0 for peer_id in peer_ids}
+    for peer_id in rng.sample(peer_ids, int(peer_count * slow_fraction)):
+        base_rtt[peer_id] *= 10
+    for peer_id in rng.sample(peer_ids, int(peer_count * flaky_fraction)):
+        error_rate[peer_id] = 0.2
+    drifting = rng.sample(peer_ids, int(peer_count * slow_fraction))
+    
+    latencies = []
+    failed_attempts = 0
+    for index in range(requests):
+        if index == requests // 2:
+            for peer_id in drifting:
+                base_rtt[peer_id] *= 10
+        
+        elapsed = 0.0
+        for _ in range(3):
+            peer_id = tracker.select(peer_ids, 1, mode=mode, rng=rng)[0]
+            if rng.random() < error_rate[peer_id]:
+                elapsed += timeout
+                failed_attempts += 1
+                tracker.observe_error(peer_id)
+                continue
+            rtt = base_rtt[peer_id] * rng.lognormvariate(0.0, 0.3)
+            elapsed += rtt
+            tracker.observe_rtt(peer_id, rtt)
+            break
+        latencies.append(elapsed)
+    
+    return {
+        "mode": mode,
+        "peers": peer_count,
+        "requests": requests,
+        "mean_ms": sum(latencies) / requests * 1000,
+        **_latency_percentiles(latencies),
+        "failed_attempts": failed_attempts
+    }
+
+def simulate_gossip(cluster_size: int, fanout: int, rounds: int, trials: int = 20,
+                    seed: Optional[int] = None) -> Dict[str, Any]:
+    """Simulate gossip dissemination of one broadcast over a fully known cluster"""
+    rng = random.Random(seed)
+    node_ids = [str(i) for i in range(cluster_size)]
+    coverages = []
+    message_counts = []
+    max_sends = []
+    hops_used = []
+    
+    for _ in range(trials):
+        origin = node_ids[0]
+        seen = {origin}
+        sends: Dict[str, int] = {}
+        messages = 0
+        hops = 0
+        
+        # Each wave holds (node, ttl) pairs that received the message for the first time
+        wave = [(origin, rounds)]
+        while wave:
+            next_wave = []
+            for node_id, ttl in wave:
+                targets = select_gossip_targets(node_ids, fanout, {node_id, origin}, rng)
+                sends[node_id] = len(targets)
+                messages += len(targets)
+                for target in targets:
+                    if target not in seen:
+                        seen.add(target)
+                        if ttl > 1:
+                            next_wave.append((target, ttl - 1))
+            if next_wave:
+                hops += 1
+            wave = next_wave
+        
+        coverages.append(len(seen) / cluster_size)
+        message_counts.append(messages)
+        max_sends.append(max(sends.values()) if sends else 0)
+        hops_used.append(hops + 1)
+    
+    return {
+        "cluster_size": cluster_size,
+        "fanout": fanout,
+        "rounds": rounds,
+        "coverage_mean": sum(coverages) / trials,
+        "coverage_min": min(coverages),
+        "messages_mean": sum(message_counts) / trials,
+        "messages_per_node": sum(message_counts) / trials / cluster_size,
+        "max_sends_per_node": max(max_sends),
+        "direct_messages": cluster_size - 1,
+        "hops_mean": sum(hops_used) / trials
+    }
+
+def benchmark_entropy(duration: float = 2.0) -> List[Dict[str, Any]]:
+    """Measure entropy throughput of the batched qiskit and os.urandom paths against per-key generation"""
+    def measure(produce: Callable[[], int]) -> float:
+        bits = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < duration:
+            bits += produce()
+        return bits / (time.perf_counter() - started)
+    
+    results = []
+    if QUANTUM_AVAILABLE:
+        quantum_pool = EntropyPool(source="qiskit")
+        results.append({"path": "qiskit batched", "bits_per_second": measure(lambda: len(quantum_pool.produce_batch()) * 8)})
+        
+        engine = QuantumCryptographyEngine()
+        results.append({"path": "qiskit per-key", "bits_per_second": measure(lambda: len(engine.generate_quantum_key("bench").quantum_bits))})
+    else:
+        results.append({"path": "qiskit", "bits_per_second": None})
+    
+    fallback_pool = EntropyPool(source="urandom")
+    results.append({"path": "urandom batched", "bits_per_second": measure(lambda: len(fallback_pool.produce_batch()) * 8)})
+    results.append({"path": "secrets per-bit", "bits_per_second": measure(lambda: len(''.join(str(secrets.randbits(1)) for _ in range(256))))})
+    return results
+
+def benchmark_signatures(count: int = 100000, batch_size: int = 64) -> List[Dict[str, Any]]:
+    """Measure signatures/sec for the legacy double SHA-256 scheme and the cached HMAC scheme"""
+    engine = QuantumCryptographyEngine()
+    quantum_key = engine.generate_quantum_key("bench")
+    message = json.dumps({"type": "benchmark", "data": "x" * 200})
+    data = message.encode()
+    
+    def rate(operation: Callable[[], Any], operations: int = count) -> float:
+        started = time.perf_counter()
+        for _ in range(operations // (batch_size if operation is verify_batch else 1)):
+            operation()
+        return operations / (time.perf_counter() - started)
+    
+    legacy_signature = engine.create_quantum_signature(message, quantum_key)
+    hmac_signature = engine.sign(data, quantum_key)
+    batch = [(data, hmac_signature)] * batch_size
+    verify_batch = lambda: engine.verify_batch(batch, quantum_key)
+    
+    return [
+        {"operation": "sha256d sign", "per_second": rate(lambda: engine.create_quantum_signature(message, quantum_key))},
+        {"operation": "sha256d verify", "per_second": rate(lambda: engine.verify_quantum_signature(message, legacy_signature, quantum_key))},
+        {"operation": "hmac sign", "per_second": rate(lambda: engine.sign(data, quantum_key))},
+        {"operation": "hmac verify", "per_second": rate(lambda: engine.verify(data, hmac_signature, quantum_key))},
+        {"operation": f"hmac verify_batch({batch_size})", "per_second": rate(verify_batch)}
+    ]
+
+def benchmark_replay_guard(records: int = 2000, organism_bytes: int = 16 * 1024) -> List[Dict[str, Any]]:
+    """Receive cost per organism record: a fresh sealed record, a replayed plain record that is parsed,
+    verified and decrypted before the duplicate filter sees it, and a replayed sealed record"""
+    sender = DNAQNetNode("replay-sender", "127.0.0.1", 0, udp_channel=False, payload_compression=False)
+    receiver = DNAQNetNode("replay-receiver", "127.0.0.1", 0, udp_channel=False, payload_compression=False)
+    quantum_key = sender.quantum_engine.generate_quantum_key(receiver.node_id)
+    for node, other in ((sender, receiver), (receiver, sender)):
+        node.peers[other.node_id] = DNAQNetPeer(
+            peer_id=other.node_id, ip_address="127.0.0.1", port=0, public_key="", quantum_key=quantum_key,
+            consciousness_level=0.0, quantum_coherence=0.0, last_seen=time.time(),
+            capabilities=list(other.capabilities), trust_score=0.5
+        )
+    peer = sender.peers[receiver.node_id]
+    organism = {"type": "benchmark", "data": "x" * organism_bytes}
+    messages = [sender._build_organism_message(peer, organism) for _ in range(records)]
+    plain = [encode_message(message) for message in messages]
+    sealed = [sender._seal_record(peer, message, message_data, SendPriority.BULK)
+              for message, message_data in zip(messages, plain)]
+    
+    def receive(frame: List[bytes]):
+        opened, _ = receiver._open_records(frame, defer_unknown_keys=False)
+        for message in receiver._verify_frame_signatures(*receiver._decode_records(opened, ("127.0.0.1", 0), proxied=True)):
+            json.loads(receiver.quantum_engine.decrypt_bytes(bytes.fromhex(message.payload["encrypted_data"]), quantum_key))
+    
+    results = []
+    for case, frame in (("fresh, sealed", sealed), ("replayed, plain", plain), ("replayed, sealed", sealed)):
+        rejected = receiver.replay_stats["replayed"]
+        started = time.perf_counter()
+        receive(frame)
+        elapsed = time.perf_counter() - started
+        results.append({"case": case, "records": records, "us_per_record": elapsed / records * 1e6,
+                        "rejected": receiver.replay_stats["replayed"] - rejected})
+    return results
+
+async def benchmark_snapshot(peer_count: int = 20000, changed: int = 100, batch: int = 1000) -> List[Dict[str, Any]]:
+    """Journal, compaction and restore cost for a synthetic peer table, with the longest event loop stall
+    during each step; compaction runs once batched and once as a single batch"""
+    scratch = tempfile.TemporaryDirectory(prefix="dna-qnet-snapshot-")
+    directory = scratch.name
+    node = DNAQNetNode("snapshot-bench", "127.0.0.1", 0, udp_channel=False, snapshot_dir=directory, snapshot_batch=batch)
+    node.loop = asyncio.get_running_loop()
+    now = time.time()
+    for index in range(peer_count):
+        peer_id = f"peer-{index:06d}"
+        node.peers[peer_id] = DNAQNetPeer(
+            peer_id=peer_id, ip_address="10.0.0.1", port=1024 + index % 60000, public_key="",
+            quantum_key=QuantumKey(key_id=f"key-{index:06d}", quantum_bits=format(index, "0256b"), classical_hash="",
+                                   coherence_level=0.9, creation_time=now, expiry_time=now + 3600),
+            consciousness_level=0.5, quantum_coherence=0.9, last_seen=now,
+            capabilities=list(node.capabilities), trust_score=0.5
+        )
+    node.peers.drain_changed()
+    
+    async def measure(step: str, work: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        stalls = [0.0]
+        measuring = True
+        
+        async def ticker():
+            last = time.perf_counter()
+            while measuring:
+                await asyncio.sleep(0.001)
+                current = time.perf_counter()
+                stalls[0] = max(stalls[0], current - last)
+                last = current
+        
+        task = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0.01)
+        started = time.perf_counter()
+        await work()
+        elapsed = time.perf_counter() - started
+        measuring = False
+        await task
+        return {"step": step, "peers": peer_count, "ms": elapsed * 1000, "max_stall_ms": stalls[0] * 1000,
+                "base_bytes": node.snapshots.base_bytes(), "journal_bytes": node.snapshots.journal_bytes()}
+    
+    async def journal():
+        for index in range(changed):
+            node.peers.set_trust(f"peer-{index:06d}", 0.6)
+        await node._flush_snapshot_changes()
+    
+    async def restore():
+        restored = DNAQNetNode("snapshot-bench", "127.0.0.1", 0, udp_channel=False, snapshot_dir=directory)
+        restored._restore_snapshot()
+        restored.snapshots.close()
+        restored.executor.shutdown(wait=False)
+        restored.offload_executor.shutdown(wait=False)
+    
+    async def compact_single():
+        node.snapshot_batch = peer_count
+        await node._compact_snapshot()
+    
+    results = [await measure(f"compact, batch {batch}", node._compact_snapshot),
+               await measure(f"journal {changed} changes", journal),
+               await measure("compact, one batch", compact_single)]
+    node.snapshots.close()
+    results.append(await measure("restore", restore))
+    node.executor.shutdown(wait=False)
+    node.offload_executor.shutdown(wait=False)
+    scratch.cleanup()
+    return results
+
+BENCHMARK_WORKLOADS = ("handshake", "organism", "rotation", "broadcast")
+
+def _process_resources() -> Dict[str, Optional[int]]:
+    """Open file descriptors, threads and resident memory of this process (None where /proc is unavailable)"""
+    try:
+        open_fds = len(os.listdir("/proc/self/fd"))
+    except OSError:
+        open_fds = None
+    
+    rss_bytes = None
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    rss_bytes = int(line.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+    
+    return {"open_fds": open_fds, "threads": threading.active_count(), "rss_bytes": rss_bytes}
+
+def _latency_percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99 of latency samples given in seconds, reported in milliseconds"""
+    ordered = sorted(samples)
+    
+    def percentile(fraction: float) -> Optional[float]:
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000.0
+    
+    return {"p50_ms": percentile(0.50), "p95_ms": percentile(0.95), "p99_ms": percentile(0.99)}
+
+async def benchmark_cluster(node_count: int = 16, base_port: int = 19000, messages: int = 200,
+                            workloads: Iterable[str] = BENCHMARK_WORKLOADS, settle_timeout: float = 30.0,
+                            node_options: Optional[Dict[str, Any]] = None, seed: int = 0) -> Dict[str, Any]:
+    """Run scripted workloads against N in-process nodes on 127.0.0.1 and report throughput, latency and resources"""
+    rng = random.Random(seed)
+    baseline = _process_resources()
+    options = {"heartbeat_interval": 5.0, **(node_options or {})}
+    nodes = [DNAQNetNode(f"bench-{index}", "127.0.0.1", base_port + index, **options) for index in range(node_count)]
+    
+    # End-to-end latency is measured from the sender's message timestamp to the end of the recipient's handler
+    latencies: Dict[MessageType, List[float]] = {MessageType.ORGANISM_MESSAGE: [], MessageType.EVOLUTION_EVENT: []}
+    last_delivery = [time.perf_counter()]
+    
+    def record_latency(node: DNAQNetNode, message_type: MessageType):
+        handler = node.message_handlers[message_type]
+        
+        async def timed_handler(message: DNAQNetMessage):
+            await handler(message)
+            latencies[message_type].append(time.time() - message.timestamp)
+            last_delivery[0] = time.perf_counter()
+        
+        node.message_handlers[message_type] = timed_handler
     
+    async def settle(message_type: MessageType, expected: int):
+        """Wait until the expected deliveries arrive or deliveries stop arriving"""
+        deadline = time.perf_counter() + settle_timeout
+        while len(latencies[message_type]) < expected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+            if time.perf_counter() - last_delivery[0] > 2.0:
+                break
+    
+    def organism_message(sender: DNAQNetNode, sequence: int) -> Tuple[DNAQNetNode, str, Dict[str, Any]]:
+        recipient = rng.choice([node for node in nodes if node is not sender])
+        return sender, recipient.node_id, {"type": "benchmark", "sequence": sequence, "data": "x" * 256}
+    
+    results = []
+    try:
+        for node in nodes:
+            await node.start()
+            record_latency(node, MessageType.ORGANISM_MESSAGE)
+            record_latency(node, MessageType.EVOLUTION_EVENT)
+        
+        for workload in workloads:
+            started = time.perf_counter()
+            last_delivery[0] = started
+            
+            if workload == "handshake":
+                # Every node joins through the first one at the same time
+                durations = []
+                
+                async def join(node: DNAQNetNode) -> bool:
+                    joined_at = time.perf_counter()
+                    joined = await node.connect_to_peer("127.0.0.1", base_port)
+                    durations.append(time.perf_counter() - joined_at)
+                    return joined
+                
+                joined = await asyncio.gather(*(join(node) for node in nodes[1:]))
+                elapsed = time.perf_counter() - started
+                result = {"operations": sum(joined), "failed": len(joined) - sum(joined),
+                          "per_second": sum(joined) / elapsed, **_latency_percentiles(durations)}
+            
+            elif workload == "organism":
+                delivered_before = len(latencies[MessageType.ORGANISM_MESSAGE])
+                transfers = [organism_message(rng.choice(nodes), sequence) for sequence in range(messages)]
+                statuses = await asyncio.gather(*(sender.send_organism_message(recipient_id, data)
+                                                  for sender, recipient_id, data in transfers))
+                sent = sum(1 for status in statuses if status == SendStatus.SENT)
+                await settle(MessageType.ORGANISM_MESSAGE, delivered_before + sent)
+                samples = latencies[MessageType.ORGANISM_MESSAGE][delivered_before:]
+                elapsed = (last_delivery[0] if samples else time.perf_counter()) - started
+                result = {"operations": len(samples), "failed": len(statuses) - sent, "lost": sent - len(samples),
+                          "per_second": len(samples) / elapsed if elapsed > 0 else 0.0,
+                          **_latency_percentiles(samples)}
+            
+            elif workload == "rotation":
+                # Rotate from the lower node id of each keyed pair so both ends never rotate one pair at once
+                pairs = [(node, peer) for node in nodes for peer in list(node.peers.values())
+                         if peer.quantum_key and node.node_id < peer.peer_id]
+                await asyncio.gather(*(node._rotate_key(peer) for node, peer in pairs))
+                elapsed = time.perf_counter() - started
+                result = {"operations": len(pairs), "failed": 0,
+                          "per_second": len(pairs) / elapsed if elapsed > 0 else 0.0,
+                          **_latency_percentiles([])}
+            
+            elif workload == "broadcast":
+                delivered_before = len(latencies[MessageType.EVOLUTION_EVENT])
+                broadcasts = []
+                for sequence in range(messages):
+                    sender = rng.choice(nodes)
+                    broadcasts.append(sender._disseminate(DNAQNetMessage(
+                        message_id=secrets.token_hex(16),
+                        sender_id=sender.node_id,
+                        recipient_id="broadcast",
+                        message_type=MessageType.EVOLUTION_EVENT,
+                        payload={"type": "benchmark", "sequence": sequence},
+                        quantum_signature="",
+                        timestamp=time.time(),
+                        ttl=options.get("gossip_rounds", 8)
+                    )))
+                first_hop_sends = sum(await asyncio.gather(*broadcasts))
+                await settle(MessageType.EVOLUTION_EVENT, delivered_before + messages * (node_count - 1))
+                samples = latencies[MessageType.EVOLUTION_EVENT][delivered_before:]
+                elapsed = (last_delivery[0] if samples else time.perf_counter()) - started
+                result = {"operations": len(samples), "failed": 0, "first_hop_sends": first_hop_sends,
+                          "coverage": len(samples) / (messages * (node_count - 1)) if node_count > 1 else 1.0,
+                          "per_second": len(samples) / elapsed if elapsed > 0 else 0.0,
+                          **_latency_percentiles(samples)}
+            
+            else:
+                raise ValueError(f"Unknown workload: {workload}")
+            
+            results.append({"workload": workload, "seconds": time.perf_counter() - started, **result})
+        
+        # In-process nodes share one process, so per-node resources are its growth divided across them
+        resources = _process_resources()
+        per_node = {name: (resources[name] - baseline[name]) / node_count
+                    if resources[name] is not None and baseline[name] is not None else None
+                    for name in resources}
+        
+        return {
+            "nodes": node_count,
+            "workloads": results,
+            "process": resources,
+            "per_node": per_node,
+            "signature_failures": sum(node.signature_failures for node in nodes),
+            "peers_per_node": sum(len(node.peers) for node in nodes) / node_count
+        }
+    
+    finally:
+        for node in nodes:
+            node.stop()
+
+async def benchmark_head_of_line(base_port: int = 19600, bulk_bytes: int = 1 << 20, probes: int = 200,
+                                 probe_interval: float = 0.01, node_options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Latency of control messages on an idle link and during back-to-back bulk organism sends, with a
+    connection per frame and with multiplexed streams"""
+    results = []
+    for index, multiplex in enumerate((False, True)):
+        options = {"udp_channel": False, "heartbeat_interval": 3600.0, "payload_compression": False,
+                   **(node_options or {}), "multiplex": multiplex}
+        port = base_port + 2 * index
+        sender = DNAQNetNode("hol-sender", "127.0.0.1", port, **options)
+        receiver = DNAQNetNode("hol-receiver", "127.0.0.1", port + 1, **options)
+        latencies: Dict[str, List[float]] = {"idle": [], "bulk": []}
+        phase = ["idle"]
+        handler = receiver.message_handlers[MessageType.HEARTBEAT]
+        
+        async def timed_heartbeat(message: DNAQNetMessage):
+            await handler(message)
+            if message.payload.get("probe"):
+                latencies[phase[0]].append(time.time() - message.timestamp)
+        
+        receiver.message_handlers[MessageType.HEARTBEAT] = timed_heartbeat
+        await sender.start()
+        await receiver.start()
+        try:
+            await sender.connect_to_peer("127.0.0.1", port + 1)
+            peer = sender.peers[receiver.node_id]
+            await sender._establish_key(peer)
+            
+            async def probe():
+                for _ in range(probes):
+                    await sender._send_to_peer(peer, DNAQNetMessage(
+                        message_id=secrets.token_hex(16),
+                        sender_id=sender.node_id,
+                        recipient_id=receiver.node_id,
+                        message_type=MessageType.HEARTBEAT,
+                        payload={"probe": True},
+                        quantum_signature="",
+                        timestamp=time.time(),
+                        ttl=60
+                    ))
+                    await asyncio.sleep(probe_interval)
+            
+            await probe()
+            phase[0] = "bulk"
+            stop_bulk = asyncio.Event()
+            organism = {"type": "benchmark", "data": "x" * bulk_bytes}
+            
+            async def bulk() -> int:
+                delivered = 0
+                while not stop_bulk.is_set():
+                    if await sender.send_organism_message(receiver.node_id, organism) == SendStatus.SENT:
+                        delivered += 1
+                return delivered
+            
+            bulk_sender = asyncio.ensure_future(bulk())
+            started = time.perf_counter()
+            await probe()
+            stop_bulk.set()
+            transfers = await bulk_sender
+            elapsed = time.perf_counter() - started
+            await asyncio.sleep(0.5)
+            
+            for name, samples in latencies.items():
+                results.append({
+                    "transport": "multiplexed" if multiplex else "per-frame",
+                    "phase": name,
+                    "probes": len(samples),
+                    "bulk_mb_per_second": transfers * bulk_bytes / elapsed / 1e6 if name == "bulk" else None,
+                    **_latency_percentiles(samples)
+                })
+        finally:
+            sender.stop()
+            receiver.stop()
+        await asyncio.sleep(0.2)
+    return results
+
+def install_event_loop_policy(name: str) -> str:
+    """Install the requested event loop policy before the loop is created; returns the one in effect"""
+    if name in ("uvloop", "auto") and UVLOOP_AVAILABLE:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        return "uvloop"
+    if name == "uvloop":
+        logger.warning("⚠️ uvloop not installed - using the default asyncio event loop")
+    return "asyncio"
+
+async def _serve_worker(node_id: str, ip_address: str, port: int, worker_index: int, shared_store: str,
+                        seeds: Optional[List[Tuple[str, int]]], node_options: Dict[str, Any],
+                        metrics_port: Optional[int], ready: Optional[Any]):
+    if worker_index:
+        node_options = {**node_options, "outbox_dir": None, "snapshot_dir": None}  # one writer per log
+    node = DNAQNetNode(node_id, ip_address, port, metrics_port=metrics_port, worker_index=worker_index,
+                       shared_store=shared_store, reuse_port=True, **node_options)
+    await node.start()
+    if seeds and node.is_primary:
+        await node.bootstrap(seeds)
+    if ready is not None:
+        ready.set()
+    logger.info(f"👷 Worker {worker_index} of node {node_id} serving on {ip_address}:{port}")
+    
+    try:
+        while True:
+            await asyncio.sleep(1)
+    finally:
+        node.stop()
+
+def _run_worker(node_id: str, ip_address: str, port: int, worker_index: int, shared_store: str, event_loop: str,
+                seeds: Optional[List[Tuple[str, int]]], node_options: Dict[str, Any], metrics_port: Optional[int] = None,
+                ready: Optional[Any] = None, log_level: Optional[int] = None):
+    """Entry point of one worker process of a multi-process node"""
+    if log_level is not None:
+        logging.getLogger().setLevel(log_level)
+    install_event_loop_policy(event_loop)
+    try:
+        asyncio.run(_serve_worker(node_id, ip_address, port, worker_index, shared_store, seeds, node_options, metrics_port, ready))
+    except KeyboardInterrupt:
+        pass
+
+def launch_workers(node_id: str, ip_address: str, port: int, workers: int, shared_store: str,
+                   event_loop: str = "asyncio", seeds: Optional[List[Tuple[str, int]]] = None,
+                   node_options: Optional[Dict[str, Any]] = None, metrics_port: Optional[int] = None,
+                   log_level: Optional[int] = None, start_timeout: float = 30.0) -> List[multiprocessing.Process]:
+    """Start a node as worker processes sharing one port; the primary is started first so it owns the shared
+    store, which the caller creates the directory for and removes"""
+    # Compression dictionaries are negotiated per connection state and cannot follow a peer across workers
+    options = {**(node_options or {}), "payload_compression": False}
+    context = multiprocessing.get_context("spawn")
+    
+    processes = []
+    for worker_index in range(workers):
+        ready = context.Event()
+        process = context.Process(
+            target=_run_worker,
+            args=(node_id, ip_address, port, worker_index, shared_store, event_loop, seeds, options,
+                  metrics_port + worker_index if metrics_port else None, ready, log_level),
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+        if not ready.wait(start_timeout):
+            for started in processes:
+                started.terminate()
+            raise RuntimeError(f"worker {worker_index} did not start within {start_timeout:.0f}s")
+    return processes
+
+def _bench_worker_client(host: str, port: int, duration: float, mode: str, results: Any):
+    """Benchmark client process: empty connections ("accept") or FIND_NODE round trips ("request") until the deadline"""
+    request_data = encode_message(DNAQNetMessage(
+        message_id=secrets.token_hex(16),
+        sender_id=f"bench-client-{os.getpid()}",
+        recipient_id="unknown",
+        message_type=MessageType.FIND_NODE,
+        payload={"target": secrets.token_hex(20), "ip_address": host, "port": 0},
+        quantum_signature="",
+        timestamp=time.time(),
+        ttl=60
+    ))
+    request_frame = FRAME_HEADER.pack(len(request_data)) + request_data
+    
+    completed, failed, latencies = 0, 0, []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            with socket.create_connection((host, port), timeout=5.0) as connection:
+                if mode == "request":
+                    connection.sendall(request_frame)
+                connection.shutdown(socket.SHUT_WR)
+                received = 0
+                while True:
+                    data = connection.recv(65536)
+                    if not data:
+                        break
+                    received += len(data)
+            if mode == "request" and not received:
+                raise ConnectionError("no response")
+            completed += 1
+            latencies.append(time.perf_counter() - started)
+        except OSError:
+            failed += 1
+    results.put((completed, failed, latencies))
+
+def benchmark_workers(worker_counts: Iterable[int] = (1, 2, 4), base_port: int = 19500, duration: float = 5.0,
+                      clients: int = 8, event_loop: str = "asyncio") -> List[Dict[str, Any]]:
+    """Measure accept rate and FIND_NODE throughput of a multi-process node for each worker count"""
+    context = multiprocessing.get_context("spawn")
+    node_options = {"udp_channel": False, "entropy_pool_bytes": 0}
+    report = []
+    
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory(prefix="dnaqnet-bench-") as state_dir:
+            processes = launch_workers("bench-workers", "127.0.0.1", base_port, workers,
+                                       shared_store=os.path.join(state_dir, "state.db"), event_loop=event_loop,
+                                       node_options=node_options, log_level=logging.WARNING)
+            try:
+                for mode in ("accept", "request"):
+                    results = context.Queue()
+                    client_processes = [context.Process(target=_bench_worker_client, args=("127.0.0.1", base_port, duration, mode, results))
+                                        for _ in range(clients)]
+                    for process in client_processes:
+                        process.start()
+                    collected = [results.get() for _ in client_processes]
+                    for process in client_processes:
+                        process.join()
+                    
+                    latencies = [latency for _, _, samples in collected for latency in samples]
+                    completed = sum(done for done, _, _ in collected)
+                    report.append({
+                        "workers": workers,
+                        "mode": mode,
+                        "operations": completed,
+                        "failed": sum(failures for _, failures, _ in collected),
+                        "per_second": completed / duration,
+                        **_latency_percentiles(latencies)
+                    })
+            finally:
+                for process in processes:
+                    process.terminate()
+                for process in processes:
+                    process.join()
+    return report
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="DNA-QNet Node")
-    parser.add_argument("--node-id", required=True, help="Node ID")
+    parser.add_argument("--node-id", help="Node ID")
     parser.add_argument("--ip", default="0.0.0.0", help="IP address to bind")
     parser.add_argument("--port", type=int, default=7777, help="Port to bind")
-    parser.add_argument("--connect", help="Peer to connect to (ip:port)")
+    parser.add_argument("--connect", nargs="+", help="Seed peers to join through (ip:port ...)")
+    parser.add_argument("--no-mux", action="store_true", help="Use a connection per frame instead of multiplexed streams")
+    parser.add_argument("--replay-window", type=int, default=1024, help="Sequence numbers tracked per peer and priority for replay protection (0 disables sealing)")
+    parser.add_argument("--replay-max-skew", type=float, default=60.0, help="Largest clock difference in seconds at which a sealed record is accepted")
+    parser.add_argument("--no-udp", action="store_true", help="Send heartbeats and consciousness sync over TCP")
+    parser.add_argument("--decode-workers", type=int, default=0, help="Processes that decode large organism messages (0 decodes inline)")
+    parser.add_argument("--decode-offload-bytes", type=int, default=256 * 1024, help="Smallest encrypted organism payload decoded in a worker process")
+    parser.add_argument("--stream-chunk-bytes", type=int, default=64 * 1024, help="Chunk size of streamed organism transfers")
+    parser.add_argument("--stream-window", type=int, default=8, help="Unacknowledged chunks a streamed transfer keeps in flight")
+    parser.add_argument("--outbox-dir", help="Store organism messages for unreachable peers in segment logs under this directory")
+    parser.add_argument("--snapshot-dir", help="Directory for peer table snapshots, restored at start for a warm restart")
+    parser.add_argument("--snapshot-interval", type=float, default=5.0, help="Seconds between incremental peer snapshots")
+    parser.add_argument("--outbox-ttl", type=float, default=3600.0, help="Seconds a stored organism message is kept for delivery")
+    parser.add_argument("--outbox-max-bytes", type=int, default=64 << 20, help="Per-peer outbox size limit; oldest segments are dropped beyond it")
+    parser.add_argument("--sync-interval", type=float, default=120.0, help="Seconds between consciousness delta rounds")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics over HTTP on this port")
+    parser.add_argument("--dht-k", type=int, default=20, help="Kademlia bucket size")
+    parser.add_argument("--dht-alpha", type=int, default=3, help="Parallel queries per lookup round")
+    parser.add_argument("--dht-refresh", type=float, default=600.0, help="Seconds before an idle k-bucket is refreshed")
+    parser.add_argument("--batch-max-bytes", type=int, default=64 * 1024, help="Flush a peer's batch once it reaches this size")
+    parser.add_argument("--batch-delay-ms", type=float, default=5.0, help="Maximum time a message waits for batching (0 disables)")
+    parser.add_argument("--broadcast-concurrency", type=int, default=256, help="Maximum concurrent peer sends during a broadcast")
+    parser.add_argument("--peer-timeout", type=float, default=5.0, help="Per-peer send deadline in seconds")
+    parser.add_argument("--topology", choices=[topology.value for topology in NetworkTopology], default="mesh", help="Overlay topology used to choose direct links")
+    parser.add_argument("--hub-count", type=int, default=3, help="Minimum number of hubs for star and hybrid topologies")
+    parser.add_argument("--broadcast-mode", choices=["direct", "gossip"], default="direct", help="Broadcast dissemination mode")
+    parser.add_argument("--gossip-fanout", type=int, default=4, help="Peers each node forwards a gossip broadcast to")
+    parser.add_argument("--gossip-rounds", type=int, default=8, help="Hop budget (ttl) of a gossip broadcast")
+    parser.add_argument("--peer-selection", choices=PEER_SELECTION_MODES, default="p2c", help="How gossip targets and equal-cost next hops are chosen: power of two choices or inverse-cost weighted over EWMA RTT and error rate, or uniformly at random")
+    parser.add_argument("--rtt-alpha", type=float, default=0.2, help="EWMA smoothing factor for per-peer round-trip times")
+    parser.add_argument("--send-queue-policy", choices=["drop", "block"], default="drop", help="Behaviour when a peer send queue is full")
+    parser.add_argument("--send-queue-size", type=int, default=DEFAULT_SEND_QUEUE_LIMITS[SendPriority.BULK], help="Per-peer bulk send queue limit")
+    parser.add_argument("--peer-expiry", type=float, default=300.0, help="Seconds of silence before a peer is dropped")
+    parser.add_argument("--phi-threshold", type=float, default=8.0, help="Failure detector suspicion threshold")
+    parser.add_argument("--heartbeat-interval", type=float, default=30.0, help="Base heartbeat interval in seconds")
+    parser.add_argument("--heartbeat-max-interval", type=float, default=240.0, help="Heartbeat interval ceiling for stable peers")
+    parser.add_argument("--dedup-window", type=float, default=300.0, help="Duplicate suppression window in seconds")
+    parser.add_argument("--dedup-fp-rate", type=float, default=1e-6, help="Duplicate filter false-positive rate")
+    parser.add_argument("--entropy-pool-bytes", type=int, default=1 << 20, help="Entropy ring buffer size (0 disables the pool)")
+    parser.add_argument("--no-compression", action="store_true", help="Disable negotiated payload compression")
+    parser.add_argument("--compression-min-bytes", type=int, default=256, help="Smallest organism payload worth compressing")
+    parser.add_argument("--signature-scheme", choices=["hmac-sha256", "sha256d"], default="hmac-sha256", help="Organism message signature scheme")
+    parser.add_argument("--bench-replay", action="store_true", help="Report per-record receive cost of fresh and replayed organism records and exit")
+    parser.add_argument("--bench-snapshot", type=int, metavar="PEERS", help="Report peer snapshot journal, compaction and restore cost for a synthetic table and exit")
+    parser.add_argument("--bench-signatures", action="store_true", help="Report signatures/sec for each signature scheme and exit")
+    parser.add_argument("--bench-entropy", action="store_true", help="Report entropy throughput for each generation path and exit")
+    parser.add_argument("--bench-cluster", type=int, metavar="N", help="Run scripted workloads against N localhost nodes on consecutive ports from --port and exit")
+    parser.add_argument("--bench-messages", type=int, default=200, help="Organism transfers and broadcasts per cluster benchmark workload")
+    parser.add_argument("--bench-workloads", default=",".join(BENCHMARK_WORKLOADS), help="Comma-separated cluster benchmark workloads, run in order")
+    parser.add_argument("--bench-hol", action="store_true", help="Report control-message latency during bulk transfer, per-frame vs multiplexed, and exit")
+    parser.add_argument("--bench-bulk-bytes", type=int, default=1 << 20, help="Organism size of the head-of-line benchmark's bulk traffic")
+    parser.add_argument("--bench-workers", help="Report accept rate and request throughput for comma-separated worker counts and exit")
+    parser.add_argument("--bench-duration", type=float, default=5.0, help="Seconds per worker benchmark measurement")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes sharing the port through SO_REUSEPORT")
+    parser.add_argument("--shared-store", help="SQLite file the workers share peer and key state through (default: a temporary file removed at shutdown)")
+    parser.add_argument("--event-loop", choices=["asyncio", "uvloop", "auto"], default="asyncio", help="Event loop implementation (auto uses uvloop when installed)")
+    parser.add_argument("--simulate-gossip", help="Simulate gossip for comma-separated cluster sizes and exit")
+    parser.add_argument("--simulate-selection", type=int, metavar="PEERS", help="Simulate request latency under each peer selection mode and exit")
+    return parser
+
+async def main(args: Optional[argparse.Namespace] = None):
+    """Main entry point for DNA-QNet node"""
+    parser = build_parser()
+    args = args or parser.parse_args()
+    
+    if args.bench_replay:
+        for result in benchmark_replay_guard():
+            print(f"{result['case']:>18}: {result['us_per_record']:10.1f} us/record, {result['rejected']} rejected")
+        return
+    
+    if args.bench_snapshot:
+        print(f"{'step':>22} {'ms':>9} {'max stall ms':>13} {'base KB':>9} {'journal KB':>11}")
+        for result in await benchmark_snapshot(peer_count=args.bench_snapshot):
+            print(f"{result['step']:>22} {result['ms']:>9.1f} {result['max_stall_ms']:>13.1f} "
+                  f"{result['base_bytes'] / 1024:>9.0f} {result['journal_bytes'] / 1024:>11.0f}")
+        return
+    
+    if args.bench_signatures:
+        for result in benchmark_signatures():
+            print(f"{result['operation']:>24}: {result['per_second']:12,.0f} sigs/s")
+        return
+    
+    if args.bench_entropy:
+        for result in benchmark_entropy():
+            rate = result["bits_per_second"]
+            print(f"{result['path']:>18}: " + (f"{rate / 1e6:10.2f} Mbit/s" if rate is not None else "  unavailable (qiskit not installed)"))
+        return
+    
+    if args.bench_hol:
+        report = await benchmark_head_of_line(base_port=args.port, bulk_bytes=args.bench_bulk_bytes)
+        print(f"{'transport':>12} {'phase':>6} {'probes':>7} {'bulk MB/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for result in report:
+            latency = [f"{result[name]:>9.2f}" if result[name] is not None else f"{'-':>9}" for name in ("p50_ms", "p95_ms", "p99_ms")]
+            throughput = f"{result['bulk_mb_per_second']:>10.1f}" if result["bulk_mb_per_second"] is not None else f"{'-':>10}"
+            print(f"{result['transport']:>12} {result['phase']:>6} {result['probes']:>7} {throughput} {' '.join(latency)}")
+        return
     
-    args = parser.parse_args()
+    if args.bench_workers:
+        report = await asyncio.get_running_loop().run_in_executor(None, lambda: benchmark_workers(
+            [int(count) for count in args.bench_workers.split(",")], base_port=args.port,
+            duration=args.bench_duration, event_loop=args.event_loop))
+        print(f"{'workers':>8} {'mode':>8} {'ops':>8} {'failed':>7} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for result in report:
+            latency = [f"{result[name]:>9.2f}" if result[name] is not None else f"{'-':>9}" for name in ("p50_ms", "p95_ms", "p99_ms")]
+            print(f"{result['workers']:>8} {result['mode']:>8} {result['operations']:>8} {result['failed']:>7} "
+                  f"{result['per_second']:>10.1f} {' '.join(latency)}")
+        return
+    
+    if args.simulate_selection:
+        print(f"{'mode':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'failed':>7}")
+        for mode in PEER_SELECTION_MODES:
+            result = simulate_peer_selection(mode, peer_count=args.simulate_selection, seed=0)
+            print(f"{mode:>9} {result['mean_ms']:>9.1f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                  f"{result['p99_ms']:>9.1f} {result['failed_attempts']:>7}")
+        return
+    
+    if args.simulate_gossip:
+        print(f"{'nodes':>8} {'coverage':>9} {'min':>7} {'messages':>10} {'msg/node':>9} {'max sends':>10} {'direct':>8} {'hops':>6}")
+        for cluster_size in [int(size) for size in args.simulate_gossip.split(",")]:
+            result = simulate_gossip(cluster_size, args.gossip_fanout, args.gossip_rounds)
+            print(f"{result['cluster_size']:>8} {result['coverage_mean']:>9.4f} {result['coverage_min']:>7.4f} "
+                  f"{result['messages_mean']:>10.0f} {result['messages_per_node']:>9.2f} "
+                  f"{result['max_sends_per_node']:>10} {result['direct_messages']:>8} {result['hops_mean']:>6.1f}")
+        return
+    
+    node_options = dict(
+        batch_max_bytes=args.batch_max_bytes,
+        batch_max_delay=args.batch_delay_ms / 1000.0,
+        broadcast_concurrency=args.broadcast_concurrency,
+        peer_send_timeout=args.peer_timeout,
+        broadcast_mode=args.broadcast_mode,
+        gossip_fanout=args.gossip_fanout,
+        gossip_rounds=args.gossip_rounds,
+        peer_selection=args.peer_selection,
+        rtt_alpha=args.rtt_alpha,
+        dedup_window=args.dedup_window,
+        dedup_false_positive_rate=args.dedup_fp_rate,
+        send_queue_limits={**DEFAULT_SEND_QUEUE_LIMITS, SendPriority.BULK: args.send_queue_size},
+        send_queue_policy=args.send_queue_policy,
+        peer_expiry=args.peer_expiry,
+        phi_threshold=args.phi_threshold,
+        heartbeat_interval=args.heartbeat_interval,
+        heartbeat_max_interval=args.heartbeat_max_interval,
+        entropy_pool_bytes=args.entropy_pool_bytes,
+        signature_scheme=args.signature_scheme,
+        payload_compression=not args.no_compression,
+        compression_min_bytes=args.compression_min_bytes,
+        topology=NetworkTopology(args.topology),
+        hub_count=args.hub_count,
+        dht_k=args.dht_k,
+        dht_alpha=args.dht_alpha,
+        dht_refresh_interval=args.dht_refresh,
+        udp_channel=not args.no_udp,
+        multiplex=not args.no_mux,
+        replay_window=args.replay_window,
+        replay_max_skew=args.replay_max_skew,
+        decode_workers=args.decode_workers,
+        decode_offload_bytes=args.decode_offload_bytes,
+        stream_chunk_bytes=args.stream_chunk_bytes,
+        stream_window=args.stream_window,
+        sync_interval=args.sync_interval,
+        outbox_dir=args.outbox_dir,
+        outbox_ttl=args.outbox_ttl,
+        outbox_max_bytes=args.outbox_max_bytes,
+        snapshot_dir=args.snapshot_dir,
+        snapshot_interval=args.snapshot_interval
+    )
+    
+    if args.bench_cluster:
+        report = await benchmark_cluster(args.bench_cluster, base_port=args.port, messages=args.bench_messages,
+                                         workloads=args.bench_workloads.split(","), node_options=node_options)
+        print(f"{'workload':>10} {'ops':>7} {'failed':>7} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for result in report["workloads"]:
+            latency = [f"{result[name]:>9.2f}" if result[name] is not None else f"{'-':>9}" for name in ("p50_ms", "p95_ms", "p99_ms")]
+            print(f"{result['workload']:>10} {result['operations']:>7} {result['failed']:>7} {result['per_second']:>10.1f} {' '.join(latency)}")
+        for result in report["workloads"]:
+            if "coverage" in result:
+                print(f"{result['workload']:>10}: coverage {result['coverage']:.1%} of other nodes, {result['first_hop_sends']} first-hop sends")
+        for scope in ("process", "per_node"):
+            resources = report[scope]
+            print(f"{scope:>10}: " + ", ".join(f"{name} {value:,.1f}" if value is not None else f"{name} unavailable"
+                                             for name, value in resources.items()))
+        print(f"{'':>10}  peers/node {report['peers_per_node']:.1f}, signature failures {report['signature_failures']}")
+        return
+    
+    if not args.node_id:
+        parser.error("--node-id is required")
+    
+    seeds = [(seed.rsplit(":", 1)[0], int(seed.rsplit(":", 1)[1])) for seed in args.connect or []]
+    
+    if args.workers > 1:
+        # Without --shared-store the state (peer keys included) lives in a directory removed at shutdown
+        with tempfile.TemporaryDirectory(prefix="dnaqnet-") as state_dir:
+            processes = launch_workers(args.node_id, args.ip, args.port, args.workers,
+                                       shared_store=args.shared_store or os.path.join(state_dir, "state.db"),
+                                       event_loop=args.event_loop, seeds=seeds, node_options=node_options,
+                                       metrics_port=args.metrics_port)
+            logger.info(f"🌐 DNA-QNet node running as {args.workers} workers - Press Ctrl+C to stop")
+            try:
+                while all(process.is_alive() for process in processes):
+                    await asyncio.sleep(1)
+            finally:
+                for process in processes:
+                    process.terminate()
+                    process.join()
+        return
     
     # Create and start node
-    node = DNAQNetNode(args.node_id, args.ip, args.port)
+    node = DNAQNetNode(args.node_id, args.ip, args.port, metrics_port=args.metrics_port, **node_options)
     await node.start()
     
-    # Connect to peer if specified
-    if args.connect:
-        peer_ip, peer_port = args.connect.split(":")
-        await node.connect_to_peer(peer_ip, int(peer_port))
+    # Join through the seed peers, if any
+    if seeds:
+        await node.bootstrap(seeds)
     
     logger.info("🌐 DNA-QNet node running - Press Ctrl+C to stop")
     
@@ -644,4 +5359,6 @@ async def main():
         node.stop()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    arguments = build_parser().parse_args()
+    install_event_loop_policy(arguments.event_loop)
+    asyncio.run(main(arguments))
@@ -0,0 +1,2 @@
+"""DNA-QNet building blocks shared by the dna-qnet-core node: protocol types, framing, crypto,
+persistence and routing"""
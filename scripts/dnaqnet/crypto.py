@@ -0,0 +1,351 @@
+"""DNA-QNet cryptography: first-key exchange, key wrapping, the entropy pool and the quantum crypto engine"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from .protocol import QuantumKey
+
+# Quantum cryptography
+try:
+    from qiskit import QuantumCircuit, transpile, Aer
+    QUANTUM_AVAILABLE = True
+except ImportError:
+    QUANTUM_AVAILABLE = False
+
+logger = logging.getLogger("dna-qnet")
+
+# A peer's first key travels wrapped under an ephemeral finite-field Diffie-Hellman secret in the
+# 2048-bit MODP group of RFC 3526, so key material never crosses the network in the clear
+KEY_EXCHANGE_PRIME = int(
+    "FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DD"
+    "EF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7ED"
+    "EE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF0598DA48361C55D39A69163FA8FD24CF5F"
+    "83655D23DCA3AD961C62F356208552BB9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3B"
+    "E39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF6955817183995497CEA956AE515D2261898FA0510"
+    "15728E5A8AACAA68FFFFFFFFFFFFFFFF", 16)
+KEY_EXCHANGE_GENERATOR = 2
+
+def key_exchange_keypair() -> Tuple[int, int]:
+    """Ephemeral Diffie-Hellman private exponent and public value"""
+    private = secrets.randbits(256)
+    return private, pow(KEY_EXCHANGE_GENERATOR, private, KEY_EXCHANGE_PRIME)
+
+def key_exchange_secret(private: int, peer_public: int, requester_id: str, responder_id: str,
+                        requester_public: int, responder_public: int) -> bytes:
+    """Shared secret of one exchange, bound to both node ids and both public values"""
+    if not 1 < peer_public < KEY_EXCHANGE_PRIME - 1:
+        raise ValueError("invalid key exchange public value")
+    shared = pow(peer_public, private, KEY_EXCHANGE_PRIME)
+    transcript = f"{requester_id}|{responder_id}|{requester_public:x}|{responder_public:x}".encode()
+    return hashlib.sha256(b"dna-qnet first key" + shared.to_bytes(256, 'big') + transcript).digest()
+
+def _keystream_xor(secret: bytes, data: bytes) -> bytes:
+    """XOR data with a SHA-256 counter keystream derived from secret"""
+    keystream = b''.join(hashlib.sha256(secret + b"enc" + counter.to_bytes(4, 'big')).digest()
+                         for counter in range(len(data) // 32 + 1))
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream[:len(data)], 'big')).to_bytes(len(data), 'big')
+
+def wrap_key(secret: bytes, plaintext: bytes) -> bytes:
+    """Encrypt with a SHA-256 counter keystream and append an HMAC-SHA256 tag (encrypt-then-MAC)"""
+    ciphertext = _keystream_xor(secret, plaintext)
+    return ciphertext + hmac.new(secret, b"mac" + ciphertext, hashlib.sha256).digest()
+
+def unwrap_key(secret: bytes, wrapped: bytes) -> bytes:
+    """Inverse of wrap_key; raises ValueError when the tag does not match"""
+    ciphertext, tag = wrapped[:-32], wrapped[-32:]
+    if not hmac.compare_digest(hmac.new(secret, b"mac" + ciphertext, hashlib.sha256).digest(), tag):
+        raise ValueError("wrapped key failed authentication")
+    return _keystream_xor(secret, ciphertext)
+
+class EntropyPool:
+    """Background entropy producer filling a ring buffer of key material in large batches"""
+    
+    def __init__(self, capacity_bytes: int = 1 << 20, batch_bytes: int = 64 * 1024,
+                 source: str = "auto", num_qubits: int = 32, low_watermark: float = 0.25):
+        self.capacity = capacity_bytes
+        self.batch_bytes = min(batch_bytes, capacity_bytes)
+        self.num_qubits = num_qubits
+        self.low_watermark = int(capacity_bytes * low_watermark)
+        if source == "auto":
+            source = "qiskit" if QUANTUM_AVAILABLE else "urandom"
+        self.source = source
+        
+        # Single-producer ring: the producer only advances _head and the consumers only
+        # advance _tail, both as monotonically increasing byte counts, so the producer
+        # never waits on a lock. Concurrent consumers serialize among themselves.
+        self._buffer = bytearray(capacity_bytes)
+        self._head = 0
+        self._tail = 0
+        self._consumer_lock = threading.Lock()
+        self._refill = threading.Event()
+        self._producer: Optional[threading.Thread] = None
+        self._running = False
+        self._circuit = None
+        self._backend = None
+        
+        # Statistics
+        self.bits_produced = 0
+        self.produce_seconds = 0.0
+        self.bits_consumed = 0
+        self.empty_draws = 0
+    
+    def start(self):
+        """Start the background producer thread"""
+        if self._running:
+            return
+        self._running = True
+        self._refill.set()
+        self._producer = threading.Thread(target=self._produce_loop, name="entropy-producer", daemon=True)
+        self._producer.start()
+    
+    def stop(self):
+        """Stop the background producer thread"""
+        self._running = False
+        self._refill.set()
+    
+    def _produce_loop(self):
+        """Refill the ring in batches whenever there is room for one"""
+        while self._running:
+            if self.capacity - (self._head - self._tail) < self.batch_bytes:
+                self._refill.wait(timeout=1.0)
+                self._refill.clear()
+                continue
+            
+            try:
+                started = time.perf_counter()
+                batch = self.produce_batch()
+                self.produce_seconds += time.perf_counter() - started
+            except Exception as e:
+                logger.error(f"Entropy production error ({self.source}): {e}")
+                self.source = "urandom"
+                continue
+            
+            self._write(batch)
+            self.bits_produced += len(batch) * 8
+    
+    def produce_batch(self) -> bytes:
+        """Produce one batch of entropy from the configured source"""
+        if self.source == "qiskit":
+            return self._quantum_batch()
+        return os.urandom(self.batch_bytes)
+    
+    def _quantum_batch(self) -> bytes:
+        """Measure a Hadamard register over many shots; the circuit is transpiled once"""
+        if self._circuit is None:
+            self._backend = Aer.get_backend('qasm_simulator')
+            qc = QuantumCircuit(self.num_qubits)
+            qc.h(range(self.num_qubits))
+            qc.measure_all()
+            self._circuit = transpile(qc, self._backend)
+        
+        shots = max(1, self.batch_bytes * 8 // self.num_qubits)
+        result = self._backend.run(self._circuit, shots=shots, memory=True).result()
+        bits = ''.join(result.get_memory())
+        return int(bits, 2).to_bytes(len(bits) // 8, 'big')
+    
+    def _write(self, data: bytes):
+        """Copy a batch into the ring, then publish it by advancing the head"""
+        start = self._head % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._buffer[start:start + first] = data[:first]
+        if first < len(data):
+            self._buffer[:len(data) - first] = data[first:]
+        self._head += len(data)
+    
+    def draw(self, num_bytes: int) -> Optional[bytes]:
+        """Take entropy from the ring, or None if not enough is buffered"""
+        with self._consumer_lock:
+            available = self._head - self._tail
+            if available < num_bytes:
+                self.empty_draws += 1
+                self._refill.set()
+                return None
+            
+            start = self._tail % self.capacity
+            first = min(num_bytes, self.capacity - start)
+            data = bytes(self._buffer[start:start + first])
+            if first < num_bytes:
+                data += bytes(self._buffer[:num_bytes - first])
+            self._tail += num_bytes
+            self.bits_consumed += num_bytes * 8
+            
+            if available - num_bytes < self.low_watermark:
+                self._refill.set()
+            return data
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get entropy production statistics"""
+        return {
+            "source": self.source,
+            "buffered_bytes": self._head - self._tail,
+            "bits_produced": self.bits_produced,
+            "bits_consumed": self.bits_consumed,
+            "bits_per_second": self.bits_produced / self.produce_seconds if self.produce_seconds else 0.0,
+            "empty_draws": self.empty_draws
+        }
+
+class QuantumCryptographyEngine:
+    """Quantum Key Distribution and post-quantum cryptography"""
+    
+    LEGACY_SIGNATURE = "sha256d"
+    HMAC_SIGNATURE = "hmac-sha256"
+    
+    def __init__(self, entropy_pool: Optional[EntropyPool] = None):
+        self.quantum_backend = Aer.get_backend('statevector_simulator') if QUANTUM_AVAILABLE else None
+        self.active_keys: Dict[str, QuantumKey] = {}
+        self.key_rotation_interval = 300  # 5 minutes
+        self.entropy_pool = entropy_pool
+        self._hmac_states: Dict[str, Any] = {}
+    
+    def generate_quantum_key(self, peer_id: str) -> QuantumKey:
+        """Generate quantum key using QKD simulation"""
+        key_id = f"qkey_{peer_id}_{int(time.time())}_{secrets.token_hex(4)}"
+        
+        # Draw pre-generated key material when the entropy pool has enough buffered
+        key_material = self.entropy_pool.draw(32) if self.entropy_pool else None
+        
+        if key_material is not None:
+            quantum_bits = format(int.from_bytes(key_material, 'big'), '0256b')
+            coherence_level = 0.95 if self.entropy_pool.source == "qiskit" else 0.85
+        elif QUANTUM_AVAILABLE:
+            # Generate quantum random bits
+            num_qubits = 256
+            qc = QuantumCircuit(num_qubits, num_qubits)
+            
+            # Create random quantum state
+            for i in range(num_qubits):
+                if secrets.randbits(1):
+                    qc.x(i)
+                if secrets.randbits(1):
+                    qc.h(i)
+            
+            # Measure all qubits
+            qc.measure_all()
+            
+            # Execute and get results
+            backend = Aer.get_backend('qasm_simulator')
+            job = backend.run(transpile(qc, backend), shots=1)
+            result = job.result()
+            counts = result.get_counts()
+            quantum_bits = list(counts.keys())[0]
+            
+            coherence_level = 0.95
+        else:
+            # Fallback to cryptographically secure random
+            quantum_bits = format(secrets.randbits(256), '0256b')
+            coherence_level = 0.85
+        
+        classical_hash = hashlib.sha256(quantum_bits.encode()).hexdigest()
+        current_time = time.time()
+        
+        quantum_key = QuantumKey(
+            key_id=key_id,
+            quantum_bits=quantum_bits,
+            classical_hash=classical_hash,
+            coherence_level=coherence_level,
+            creation_time=current_time,
+            expiry_time=current_time + self.key_rotation_interval
+        )
+        
+        self.active_keys[key_id] = quantum_key
+        logger.info(f"Generated quantum key {key_id} with coherence {coherence_level:.3f}")
+        
+        return quantum_key
+    
+    def encrypt_message(self, message: str, quantum_key: QuantumKey) -> str:
+        """Encrypt message using quantum key"""
+        return self.encrypt_bytes(message.encode('utf-8'), quantum_key).hex()
+    
+    def decrypt_message(self, encrypted_hex: str, quantum_key: QuantumKey) -> str:
+        """Decrypt message using quantum key"""
+        return self.decrypt_bytes(bytes.fromhex(encrypted_hex), quantum_key).decode('utf-8')
+    
+    def encrypt_bytes(self, data: bytes, quantum_key: QuantumKey) -> bytes:
+        """XOR raw bytes with the repeating quantum key stream"""
+        key_bytes = quantum_key.classical_hash.encode('utf-8')
+        keystream = key_bytes * (len(data) // len(key_bytes) + 1)
+        return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream[:len(data)], 'big')).to_bytes(len(data), 'big')
+    
+    def decrypt_bytes(self, data: bytes, quantum_key: QuantumKey) -> bytes:
+        """Inverse of encrypt_bytes"""
+        return self.encrypt_bytes(data, quantum_key)
+    
+    def create_quantum_signature(self, message: str, quantum_key: QuantumKey) -> str:
+        """Create quantum-enhanced digital signature"""
+        message_hash = hashlib.sha256(message.encode()).hexdigest()
+        signature_input = f"{message_hash}{quantum_key.classical_hash}"
+        quantum_signature = hashlib.sha256(signature_input.encode()).hexdigest()
+        
+        return quantum_signature
+    
+    def verify_quantum_signature(self, message: str, signature: str, quantum_key: QuantumKey) -> bool:
+        """Verify quantum-enhanced digital signature"""
+        expected_signature = self.create_quantum_signature(message, quantum_key)
+        return hmac.compare_digest(signature, expected_signature)
+    
+    def _hmac_state(self, quantum_key: QuantumKey) -> Any:
+        """HMAC-SHA256 object keyed for a quantum key, cached so each signature starts from a copy with
+        the key pads already absorbed"""
+        state = self._hmac_states.get(quantum_key.key_id)
+        if state is None:
+            state = hmac.new(bytes.fromhex(quantum_key.classical_hash), digestmod=hashlib.sha256)
+            self._hmac_states[quantum_key.key_id] = state
+        return state
+    
+    @staticmethod
+    def _hmac_digest(state: Any, data: bytes) -> bytes:
+        """Finish HMAC-SHA256 over data from a copy of a cached keyed state"""
+        mac = state.copy()
+        mac.update(data)
+        return mac.digest()
+    
+    def sign(self, data: bytes, quantum_key: QuantumKey) -> bytes:
+        """HMAC-SHA256 signature over raw bytes"""
+        return self._hmac_digest(self._hmac_state(quantum_key), data)
+    
+    def verify(self, data: bytes, signature: bytes, quantum_key: QuantumKey) -> bool:
+        """Constant-time HMAC-SHA256 verification"""
+        return hmac.compare_digest(self.sign(data, quantum_key), signature)
+    
+    def verify_batch(self, items: List[Tuple[bytes, bytes]], quantum_key: QuantumKey) -> List[bool]:
+        """Verify many (data, signature) pairs under one key, e.g. every message in a frame"""
+        state = self._hmac_state(quantum_key)
+        return [hmac.compare_digest(self._hmac_digest(state, data), signature) for data, signature in items]
+    
+    def retire_key(self, key_id: str):
+        """Forget a key that has been rotated out"""
+        self.active_keys.pop(key_id, None)
+        self._hmac_states.pop(key_id, None)
+
+# Per-process engine used by decode workers, so HMAC pad states are cached across calls
+_decode_engine: Optional[QuantumCryptographyEngine] = None
+
+def decode_organism_payload(encrypted_data: str, quantum_key: QuantumKey, signature: str, signature_scheme: str,
+                            verify_hmac: bool, dictionary: Optional[bytes], compressed: bool) -> Optional[Any]:
+    """Verify, decrypt, decompress and parse an organism payload in a decode worker; None if the signature fails"""
+    global _decode_engine
+    if _decode_engine is None:
+        _decode_engine = QuantumCryptographyEngine()
+    engine = _decode_engine
+    
+    if verify_hmac and not engine.verify(encrypted_data.encode('ascii'), bytes.fromhex(signature), quantum_key):
+        return None
+    
+    decrypted_bytes = engine.decrypt_bytes(bytes.fromhex(encrypted_data), quantum_key)
+    if compressed:
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        decrypted_bytes = decompressor.decompress(decrypted_bytes) + decompressor.flush()
+    decrypted_message = decrypted_bytes.decode('utf-8')
+    
+    if (signature_scheme != QuantumCryptographyEngine.HMAC_SIGNATURE and
+            not engine.verify_quantum_signature(decrypted_message, signature, quantum_key)):
+        return None
+    return json.loads(decrypted_message)
@@ -0,0 +1,186 @@
+"""DNA-QNet wire framing: frame, datagram and sealed record layouts, message encoding and replay filters"""
+
+import hashlib
+import json
+import math
+import struct
+import time
+from collections import deque
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from .protocol import DNAQNetMessage, MessageType
+
+# Wire framing: 4-byte big-endian length prefix. The high bit marks a batch frame whose
+# body is a sequence of length-prefixed message records instead of a single message.
+FRAME_HEADER = struct.Struct('!I')
+BATCH_FRAME_FLAG = 0x80000000
+FRAME_LENGTH_MASK = 0x7FFFFFFF
+# Largest frame body a receiver buffers; bigger organisms travel as chunked transfers
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+# Datagram channel: version, sender length, key id length, sequence number, then the
+# sender id, key id, encoded message and an HMAC-SHA256 tag over everything before it
+DATAGRAM_HEADER = struct.Struct('!BBBQ')
+DATAGRAM_VERSION = 1
+DATAGRAM_TAG_SIZE = 32
+DATAGRAM_MAX_SIZE = 1200  # stay under common path MTUs to avoid IP fragmentation
+
+# Sealed records: a message record on a keyed link starts with version, priority lane, sender length,
+# key id length, sequence number and seal time, then the sender id, key id and encoded message, and ends
+# with an HMAC-SHA256 tag over everything before it. Plain records are JSON and start with '{'.
+SEALED_RECORD_HEADER = struct.Struct('!BBBBQd')
+SEALED_RECORD_VERSION = 1
+
+# Frames a secondary worker proxies to the primary start with an HMAC-SHA256 tag
+PROXY_TAG_SIZE = 32
+
+# Largest chunk a receiver accepts in a chunked organism transfer
+MAX_STREAM_CHUNK_BYTES = 4 * 1024 * 1024
+
+def encode_message(message: DNAQNetMessage) -> bytes:
+    """Serialize a message to its JSON wire form"""
+    message_dict = asdict(message)
+    message_dict["message_type"] = message.message_type.value
+    return json.dumps(message_dict).encode('utf-8')
+
+def decode_message(message_data: bytes) -> DNAQNetMessage:
+    """Deserialize a message from its JSON wire form"""
+    message_dict = json.loads(message_data)
+    message_dict["message_type"] = MessageType(message_dict["message_type"])
+    return DNAQNetMessage(**message_dict)
+
+def split_batch_frame(frame_body: bytes) -> List[bytes]:
+    """Split a batch frame body into its message records"""
+    records = []
+    view = memoryview(frame_body)
+    offset = 0
+    while offset + FRAME_HEADER.size <= len(view):
+        record_length = FRAME_HEADER.unpack_from(view, offset)[0]
+        offset += FRAME_HEADER.size
+        records.append(bytes(view[offset:offset + record_length]))
+        offset += record_length
+    return records
+
+def split_frames(data: bytes) -> List[bytes]:
+    """Encoded messages of the consecutive frames in a buffer"""
+    messages = []
+    offset = 0
+    while offset + FRAME_HEADER.size <= len(data):
+        frame_word = FRAME_HEADER.unpack_from(data, offset)[0]
+        offset += FRAME_HEADER.size
+        frame_body = data[offset:offset + (frame_word & FRAME_LENGTH_MASK)]
+        offset += len(frame_body)
+        if frame_word & BATCH_FRAME_FLAG:
+            messages.extend(split_batch_frame(frame_body))
+        else:
+            messages.append(bytes(frame_body))
+    return messages
+
+class MessageDedupFilter:
+    """Time-bucketed Bloom filter for duplicate message suppression in fixed memory"""
+    
+    def __init__(self, window: float = 300.0, capacity: int = 1000000,
+                 false_positive_rate: float = 1e-6, buckets: int = 4):
+        self.window = window
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.bucket_span = window / buckets
+        
+        # Each bucket holds one slice of the window; a lookup consults every bucket,
+        # so the per-bucket rate is scaled down to keep the overall rate on target
+        bucket_capacity = max(1, math.ceil(capacity / buckets))
+        bucket_rate = false_positive_rate / buckets
+        self.num_bits = max(64, math.ceil(-bucket_capacity * math.log(bucket_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / bucket_capacity * math.log(2)))
+        
+        self.filters = deque(bytearray((self.num_bits + 7) // 8) for _ in range(buckets))
+        self.bucket_start = time.time()
+        
+        # Statistics
+        self.checks = 0
+        self.hits = 0
+    
+    def _positions(self, message_id: str) -> List[int]:
+        """Bit positions for a message ID via double hashing"""
+        digest = hashlib.blake2b(message_id.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+    
+    def _rotate(self, now: float):
+        """Expire the oldest bucket for every bucket span that has elapsed"""
+        elapsed_buckets = int((now - self.bucket_start) // self.bucket_span)
+        if elapsed_buckets <= 0:
+            return
+        
+        for _ in range(min(elapsed_buckets, len(self.filters))):
+            oldest = self.filters.popleft()
+            oldest[:] = bytes(len(oldest))
+            self.filters.append(oldest)
+        self.bucket_start += elapsed_buckets * self.bucket_span
+    
+    def check_and_add(self, message_id: str, now: Optional[float] = None) -> bool:
+        """Record a message ID; returns True if it was already seen within the window"""
+        self._rotate(now if now is not None else time.time())
+        self.checks += 1
+        positions = self._positions(message_id)
+        
+        for bloom in self.filters:
+            if all(bloom[position >> 3] & (1 << (position & 7)) for position in positions):
+                self.hits += 1
+                return True
+        
+        current = self.filters[-1]
+        for position in positions:
+            current[position >> 3] |= 1 << (position & 7)
+        return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get dedup statistics"""
+        return {
+            "checks": self.checks,
+            "hits": self.hits,
+            "window_seconds": self.window,
+            "capacity": self.capacity,
+            "false_positive_rate": self.false_positive_rate,
+            "hash_functions": self.num_hashes,
+            "memory_bytes": sum(len(bloom) for bloom in self.filters)
+        }
+
+class ReplayWindow:
+    """Sliding-window replay filter over one sequence space (RFC 6479): the window is a ring of 64-bit
+    blocks, so a check or update touches a bounded number of blocks however far the window slides"""
+    
+    BLOCK_BITS = 64
+    
+    def __init__(self, size: int = 1024, key_id: str = ""):
+        # One block more than the window, so the block being filled never overlaps the oldest one
+        self.blocks = [0] * (max(1, -(-size // self.BLOCK_BITS)) + 1)
+        self.size = (len(self.blocks) - 1) * self.BLOCK_BITS
+        self.key_id = key_id
+        self.highest = 0
+        # Loss accounting: sequence numbers above this floor and below highest that have not arrived were
+        # counted as lost; it moves up to the sequence number that starts or resyncs the window
+        self.loss_floor = 0
+    
+    def check(self, sequence: int) -> bool:
+        """Whether a sequence number is new and not behind the window; does not record it"""
+        if sequence <= 0:
+            return False
+        if sequence > self.highest:
+            return True
+        if self.highest - sequence >= self.size:
+            return False
+        block = self.blocks[(sequence // self.BLOCK_BITS) % len(self.blocks)]
+        return not (block >> (sequence % self.BLOCK_BITS)) & 1
+    
+    def update(self, sequence: int):
+        """Record an authenticated sequence number, sliding the window forward to it"""
+        block = sequence // self.BLOCK_BITS
+        if sequence > self.highest:
+            current = self.highest // self.BLOCK_BITS
+            for index in range(current + 1, min(block, current + len(self.blocks)) + 1):
+                self.blocks[index % len(self.blocks)] = 0
+            self.highest = sequence
+        self.blocks[block % len(self.blocks)] |= 1 << (sequence % self.BLOCK_BITS)
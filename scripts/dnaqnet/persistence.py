@@ -0,0 +1,547 @@
+"""DNA-QNet persistence: the store-and-forward outbox, peer snapshots and the shared worker state"""
+
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import secrets
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .crypto import unwrap_key, wrap_key
+from .protocol import DNAQNetPeer, QuantumKey
+
+logger = logging.getLogger("dna-qnet")
+
+def open_private(path: str, mode: str) -> Any:
+    """open() for files holding key material or payloads: created, and kept, readable by the owner only"""
+    private_file = open(path, mode, opener=lambda file_path, flags: os.open(file_path, flags, 0o600))
+    os.fchmod(private_file.fileno(), 0o600)
+    return private_file
+
+OUTBOX_RECORD = struct.Struct('!IdI')  # body length, expiry time, crc32 of length, expiry and body
+
+class OutboxSegment:
+    """One preallocated, memory-mapped file of an outbox log"""
+    
+    def __init__(self, path: str, number: int, capacity: int):
+        self.path = path
+        self.number = number
+        with open_private(path, "a+b") as segment_file:
+            if os.fstat(segment_file.fileno()).st_size < capacity:
+                segment_file.truncate(capacity)
+            self.capacity = max(capacity, os.fstat(segment_file.fileno()).st_size)
+            self.mapping = mmap.mmap(segment_file.fileno(), self.capacity)
+        self.size = 0  # write offset
+        self.records = 0
+        self.earliest_expiry = math.inf
+        self.latest_expiry = 0.0
+        self.dirty = False
+        self.sealed = False  # taken for replay; appends go to a newer segment
+        for _ in self.read():
+            pass  # recovers size, records and latest_expiry
+    
+    def read(self) -> Iterator[Tuple[bytes, float]]:
+        """Yield (body, expiry) of intact records; stops at the first empty or torn record"""
+        offset, records, earliest_expiry, latest_expiry = 0, 0, math.inf, 0.0
+        while offset + OUTBOX_RECORD.size <= self.capacity:
+            length, expires_at, checksum = OUTBOX_RECORD.unpack_from(self.mapping, offset)
+            end = offset + OUTBOX_RECORD.size + length
+            if length == 0 or end > self.capacity:
+                break
+            body = self.mapping[offset + OUTBOX_RECORD.size:end]
+            if zlib.crc32(body, zlib.crc32(self.mapping[offset:offset + 12])) != checksum:
+                break
+            records += 1
+            earliest_expiry = min(earliest_expiry, expires_at)
+            latest_expiry = max(latest_expiry, expires_at)
+            offset = end
+            yield body, expires_at
+        self.size, self.records = offset, records
+        self.earliest_expiry, self.latest_expiry = earliest_expiry, latest_expiry
+    
+    def append(self, body: bytes, expires_at: float) -> bool:
+        """Copy a record into the mapping; False if it does not fit"""
+        end = self.size + OUTBOX_RECORD.size + len(body)
+        if end > self.capacity:
+            return False
+        prefix = struct.pack('!Id', len(body), expires_at)
+        checksum = zlib.crc32(body, zlib.crc32(prefix))
+        # Body first, so a crash before the header is written leaves an empty record
+        self.mapping[self.size + OUTBOX_RECORD.size:end] = body
+        OUTBOX_RECORD.pack_into(self.mapping, self.size, len(body), expires_at, checksum)
+        self.size = end
+        self.records += 1
+        self.earliest_expiry = min(self.earliest_expiry, expires_at)
+        self.latest_expiry = max(self.latest_expiry, expires_at)
+        self.dirty = True
+        return True
+    
+    def close(self):
+        self.mapping.close()
+
+class OutboxLog:
+    """Durable per-peer store-and-forward queue kept as append-only, memory-mapped segment logs.
+    
+    Each peer has a directory of numbered segments of (length, expiry, crc32) records; a zero length or a
+    bad checksum ends a segment, so a record torn by a crash is discarded when the log is reopened.
+    Record bodies are stored encrypted and MACed under a random key kept in the log directory, and every
+    file is readable by its owner only.
+    Appends only copy into the mapping and sync() msyncs every dirty segment at once, so concurrent
+    writers share one flush. Replay takes whole segments; records it could not deliver are written back
+    in place of the oldest taken segment, ahead of anything appended meanwhile.
+    """
+    
+    def __init__(self, directory: str, segment_bytes: int = 1 << 20, max_bytes: int = 64 << 20):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.segments: Dict[str, List[OutboxSegment]] = {}
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.record_key = self._load_record_key()
+        
+        # Reopen logs left by an earlier run; directory names are hex-encoded peer ids
+        for entry in sorted(os.listdir(directory)):
+            try:
+                peer_id = bytes.fromhex(entry).decode()
+            except ValueError:
+                continue
+            segments = []
+            for name in sorted(os.listdir(os.path.join(directory, entry))):
+                if name.endswith(".tmp"):
+                    os.remove(os.path.join(directory, entry, name))  # interrupted rewrite; the original is intact
+                elif name.endswith(".seg"):
+                    segments.append(OutboxSegment(os.path.join(directory, entry, name), int(name[:-4]), segment_bytes))
+            if segments:
+                self.segments[peer_id] = segments
+    
+    def _load_record_key(self) -> bytes:
+        """The key record bodies are encrypted under, created on first use"""
+        path = os.path.join(self.directory, "outbox.key")
+        try:
+            with open_private(path, "xb") as key_file:
+                key_file.write(secrets.token_bytes(32))
+        except FileExistsError:
+            pass
+        with open_private(path, "rb") as key_file:
+            return key_file.read()
+    
+    def _encrypt(self, body: bytes) -> bytes:
+        nonce = secrets.token_bytes(16)
+        return nonce + wrap_key(hashlib.sha256(self.record_key + nonce).digest(), body)
+    
+    def _decrypt(self, encrypted: bytes) -> Optional[bytes]:
+        try:
+            return unwrap_key(hashlib.sha256(self.record_key + encrypted[:16]).digest(), encrypted[16:])
+        except ValueError:
+            self.stats["unreadable"] += 1
+            return None
+    
+    def _peer_directory(self, peer_id: str) -> str:
+        return os.path.join(self.directory, peer_id.encode().hex())
+    
+    def _new_segment(self, peer_id: str, number: int, capacity: int) -> OutboxSegment:
+        os.makedirs(self._peer_directory(peer_id), mode=0o700, exist_ok=True)
+        return OutboxSegment(os.path.join(self._peer_directory(peer_id), f"{number:012d}.seg"), number, capacity)
+    
+    def _rewrite(self, segment: OutboxSegment, records: List[Tuple[bytes, float]]) -> OutboxSegment:
+        """Replace a segment's contents with records through a temporary file and a rename, so a crash
+        leaves either the old or the new segment and never neither"""
+        temporary_path = segment.path + ".tmp"
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        capacity = max(self.segment_bytes, sum(OUTBOX_RECORD.size + len(body) for body, _ in records))
+        replacement = OutboxSegment(temporary_path, segment.number, capacity)
+        for body, expires_at in records:
+            replacement.append(body, expires_at)
+        replacement.mapping.flush()
+        replacement.dirty = False
+        os.replace(temporary_path, segment.path)
+        replacement.path = segment.path
+        segment.close()
+        return replacement
+    
+    def _drop(self, segment: OutboxSegment):
+        segment.close()
+        try:
+            os.remove(segment.path)
+        except OSError as e:
+            logger.error(f"Failed to remove outbox segment {segment.path}: {e}")
+    
+    def append(self, peer_id: str, body: bytes, expires_at: float):
+        """Queue a record for a peer; the oldest unsealed segments are dropped past max_bytes"""
+        body = self._encrypt(body)
+        with self._lock:
+            segments = self.segments.setdefault(peer_id, [])
+            if not segments or segments[-1].sealed or not segments[-1].append(body, expires_at):
+                number = segments[-1].number + 1 if segments else 1
+                segment = self._new_segment(peer_id, number, max(self.segment_bytes, OUTBOX_RECORD.size + len(body)))
+                segment.append(body, expires_at)
+                segments.append(segment)
+            self.stats["appended"] += 1
+            
+            # Retention: drop whole segments, oldest first, never the one just written or one being replayed
+            while sum(segment.capacity for segment in segments) > self.max_bytes and len(segments) > 1 and not segments[0].sealed:
+                dropped = segments.pop(0)
+                self.stats["dropped_retention"] += dropped.records
+                self._drop(dropped)
+    
+    def pending(self, peer_id: str) -> int:
+        """Records stored for a peer, including ones currently being replayed"""
+        return sum(segment.records for segment in self.segments.get(peer_id, []))
+    
+    def peers(self) -> List[str]:
+        return [peer_id for peer_id, segments in self.segments.items() if any(segment.records for segment in segments)]
+    
+    def sync(self):
+        """Flush every dirty segment to disk"""
+        with self._lock:
+            dirty = [segment for segments in self.segments.values() for segment in segments if segment.dirty]
+            for segment in dirty:
+                segment.dirty = False
+        for segment in dirty:
+            try:
+                segment.mapping.flush()
+            except ValueError:
+                pass  # removed by compaction or replay since it was listed
+        self.stats["syncs"] += 1
+    
+    def take(self, peer_id: str, now: Optional[float] = None) -> Tuple[List[Tuple[bytes, float]], List[OutboxSegment]]:
+        """Seal a peer's segments for replay and return their unexpired records, oldest first"""
+        now = time.time() if now is None else now
+        with self._lock:
+            taken = [segment for segment in self.segments.get(peer_id, []) if not segment.sealed]
+            records = []
+            for segment in taken:
+                segment.sealed = True
+                for body, expires_at in segment.read():
+                    if expires_at <= now:
+                        self.stats["expired"] += 1
+                    else:
+                        body = self._decrypt(body)
+                        if body is not None:
+                            records.append((body, expires_at))
+        return records, taken
+    
+    def release(self, peer_id: str, taken: List[OutboxSegment], remaining: List[Tuple[bytes, float]]):
+        """Finish a replay: drop the taken segments, keeping undelivered records ahead of newer ones"""
+        remaining = [(self._encrypt(body), expires_at) for body, expires_at in remaining]
+        with self._lock:
+            segments = self.segments.get(peer_id, [])
+            if remaining and taken:
+                segments[segments.index(taken[0])] = self._rewrite(taken[0], remaining)
+                taken = taken[1:]
+            for segment in taken:
+                segments.remove(segment)
+                self._drop(segment)
+            if not segments:
+                self.segments.pop(peer_id, None)
+    
+    def compact(self, now: Optional[float] = None) -> int:
+        """Remove expired records from segments no longer written or replayed; returns records removed"""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            for peer_id, segments in list(self.segments.items()):
+                for segment in list(segments):
+                    if segment.sealed or not segment.records or segment.earliest_expiry > now:
+                        continue
+                    if segment.latest_expiry <= now:
+                        removed += segment.records
+                        segments.remove(segment)
+                        self._drop(segment)
+                    elif segment is not segments[-1]:
+                        # Partly expired and no longer appended to
+                        live = [(body, expires_at) for body, expires_at in segment.read() if expires_at > now]
+                        removed += segment.records - len(live)
+                        segments[segments.index(segment)] = self._rewrite(segment, live)
+                if not segments:
+                    self.segments.pop(peer_id, None)
+        self.stats["expired"] += removed
+        return removed
+    
+    def close(self):
+        with self._lock:
+            for segments in self.segments.values():
+                for segment in segments:
+                    segment.close()
+            self.segments.clear()
+
+# Peer snapshots: files start with SNAPSHOT_MAGIC, then (length, crc32 of the body, kind) records. A peer
+# body is SNAPSHOT_PEER, optionally SNAPSHOT_KEY and the key's bits packed eight to a byte, then
+# 2-byte-length-prefixed strings and 4-byte-length-prefixed compression dictionaries
+SNAPSHOT_MAGIC = b"DQNS\x01"
+SNAPSHOT_RECORD = struct.Struct('!IIB')
+SNAPSHOT_PEER = struct.Struct('!HdddBHB')  # port, consciousness, coherence, trust, flags, capabilities, dictionaries
+SNAPSHOT_KEY = struct.Struct('!Hddd')  # packed bit count, coherence, creation time, expiry time
+SNAPSHOT_TEXT = struct.Struct('!H')
+SNAPSHOT_BLOB = struct.Struct('!I')
+SNAPSHOT_UPSERT = 1
+SNAPSHOT_REMOVE = 2
+SNAPSHOT_ROUTED = 0x01  # reached through a next hop
+SNAPSHOT_KEYED = 0x02
+SNAPSHOT_KEY_ORIGINATED = 0x04  # we generated the key, so we rotate it
+SNAPSHOT_PACKED_BITS = 0x08  # quantum bits are a 0/1 string stored as a bit field
+
+def _snapshot_texts(*values: str) -> bytes:
+    return b''.join(SNAPSHOT_TEXT.pack(len(encoded)) + encoded for encoded in (value.encode() for value in values))
+
+def encode_peer_snapshot(peer: DNAQNetPeer, routed: bool, key_originated: bool, dictionaries: Dict[str, bytes]) -> bytes:
+    """Pack a peer, its current key and the compression dictionaries it shipped us into a snapshot body"""
+    quantum_key = peer.quantum_key
+    flags = SNAPSHOT_ROUTED if routed else 0
+    key_parts = []
+    if quantum_key:
+        flags |= SNAPSHOT_KEYED | (SNAPSHOT_KEY_ORIGINATED if key_originated else 0)
+        bits = quantum_key.quantum_bits
+        if bits and set(bits) <= {"0", "1"}:
+            flags |= SNAPSHOT_PACKED_BITS
+            key_parts = [SNAPSHOT_KEY.pack(len(bits), quantum_key.coherence_level, quantum_key.creation_time,
+                                           quantum_key.expiry_time), int(bits, 2).to_bytes((len(bits) + 7) // 8, 'big'),
+                         _snapshot_texts(quantum_key.key_id, quantum_key.classical_hash)]
+        else:
+            key_parts = [SNAPSHOT_KEY.pack(0, quantum_key.coherence_level, quantum_key.creation_time, quantum_key.expiry_time),
+                         _snapshot_texts(quantum_key.key_id, quantum_key.classical_hash, bits)]
+    
+    return b''.join([
+        SNAPSHOT_PEER.pack(peer.port, peer.consciousness_level, peer.quantum_coherence, peer.trust_score, flags,
+                           len(peer.capabilities), len(dictionaries)),
+        _snapshot_texts(peer.peer_id, peer.ip_address, peer.public_key, *peer.capabilities),
+        *key_parts,
+        *(_snapshot_texts(dictionary_id) + SNAPSHOT_BLOB.pack(len(dictionary)) + dictionary
+          for dictionary_id, dictionary in dictionaries.items())
+    ])
+
+def decode_peer_snapshot(body: bytes) -> Tuple[DNAQNetPeer, bool, bool, Dict[str, bytes]]:
+    """Unpack a snapshot body into (peer, routed, key originated, compression dictionaries)"""
+    offset = 0
+    
+    def unpack(layout: struct.Struct) -> Tuple:
+        nonlocal offset
+        values = layout.unpack_from(body, offset)
+        offset += layout.size
+        return values
+    
+    def take(length: int) -> bytes:
+        nonlocal offset
+        if offset + length > len(body):
+            raise ValueError("truncated snapshot record")
+        offset += length
+        return body[offset - length:offset]
+    
+    def text() -> str:
+        return take(unpack(SNAPSHOT_TEXT)[0]).decode()
+    
+    port, consciousness_level, quantum_coherence, trust_score, flags, capability_count, dictionary_count = unpack(SNAPSHOT_PEER)
+    peer_id, ip_address, public_key = text(), text(), text()
+    capabilities = [text() for _ in range(capability_count)]
+    
+    quantum_key = None
+    if flags & SNAPSHOT_KEYED:
+        bit_count, coherence_level, creation_time, expiry_time = unpack(SNAPSHOT_KEY)
+        if flags & SNAPSHOT_PACKED_BITS:
+            bits = format(int.from_bytes(take((bit_count + 7) // 8), 'big'), f'0{bit_count}b')
+            key_id, classical_hash = text(), text()
+        else:
+            key_id, classical_hash, bits = text(), text(), text()
+        quantum_key = QuantumKey(key_id=key_id, quantum_bits=bits, classical_hash=classical_hash,
+                                 coherence_level=coherence_level, creation_time=creation_time, expiry_time=expiry_time)
+    
+    dictionaries = {}
+    for _ in range(dictionary_count):
+        dictionary_id = text()
+        dictionaries[dictionary_id] = take(unpack(SNAPSHOT_BLOB)[0])
+    
+    peer = DNAQNetPeer(peer_id=peer_id, ip_address=ip_address, port=port, public_key=public_key,
+                       quantum_key=quantum_key, consciousness_level=consciousness_level,
+                       quantum_coherence=quantum_coherence, last_seen=time.time(), capabilities=capabilities,
+                       trust_score=trust_score)
+    return peer, bool(flags & SNAPSHOT_ROUTED), bool(flags & SNAPSHOT_KEY_ORIGINATED), dictionaries
+
+class PeerSnapshotStore:
+    """On-disk snapshot of a node's peer table: a base file with every peer and a journal of the peers
+    changed since, so a routine snapshot writes only what changed.
+    
+    Compaction moves the journal aside, starts a fresh one for new changes and writes a replacement base
+    in slices; the moved journal is deleted only once the new base is in place. Loading applies the
+    base, the moved journal and the journal in that order, so a crash at any point loses nothing that
+    was synced, and a record torn by a crash ends its file.
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.base_path = os.path.join(directory, "peers.base")
+        self.journal_path = os.path.join(directory, "peers.journal")
+        self.previous_path = os.path.join(directory, "peers.journal.prev")
+        self.journal: Optional[Any] = None
+        self.stats: Counter = Counter()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if os.path.exists(self.base_path + ".tmp"):
+            os.remove(self.base_path + ".tmp")  # interrupted compaction; the old base and journals are intact
+    
+    def age(self) -> Optional[float]:
+        """Seconds since the snapshot was last written, or None if there is none"""
+        written = [os.path.getmtime(path) for path in (self.base_path, self.previous_path, self.journal_path)
+                   if os.path.exists(path)]
+        return time.time() - max(written) if written else None
+    
+    def load(self) -> Iterator[Tuple[int, bytes]]:
+        """Yield the (kind, body) records of the base and journals, oldest first; a torn journal tail is
+        cut off so later appends follow the last intact record"""
+        for path in (self.base_path, self.previous_path, self.journal_path):
+            try:
+                with open(path, "rb") as snapshot_file:
+                    data = snapshot_file.read()
+            except FileNotFoundError:
+                continue
+            if not data.startswith(SNAPSHOT_MAGIC):
+                logger.warning(f"⚠️ Ignoring snapshot file {path} with an unknown format")
+                continue
+            
+            offset = len(SNAPSHOT_MAGIC)
+            while offset + SNAPSHOT_RECORD.size <= len(data):
+                length, checksum, kind = SNAPSHOT_RECORD.unpack_from(data, offset)
+                body = data[offset + SNAPSHOT_RECORD.size:offset + SNAPSHOT_RECORD.size + length]
+                if len(body) < length or zlib.crc32(body) != checksum:
+                    break
+                offset += SNAPSHOT_RECORD.size + length
+                self.stats["records_loaded"] += 1
+                yield kind, body
+            if offset < len(data):
+                self.stats["torn_records"] += 1
+                if path != self.base_path:
+                    os.truncate(path, offset)
+    
+    @staticmethod
+    def record(kind: int, body: bytes) -> bytes:
+        return SNAPSHOT_RECORD.pack(len(body), zlib.crc32(body), kind) + body
+    
+    def _open_journal(self):
+        if self.journal is None:
+            # Peers are recorded with their session keys
+            self.journal = open_private(self.journal_path, "ab")
+            if self.journal.tell() == 0:
+                self.journal.write(SNAPSHOT_MAGIC)
+    
+    def append(self, records: List[bytes]):
+        """Append encoded records to the journal and make them durable"""
+        self._open_journal()
+        self.journal.write(b''.join(records))
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.stats["journal_records"] += len(records)
+        self.stats["journal_syncs"] += 1
+    
+    def journal_bytes(self) -> int:
+        return os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+    
+    def base_bytes(self) -> int:
+        return os.path.getsize(self.base_path) if os.path.exists(self.base_path) else 0
+    
+    def begin_compaction(self) -> Any:
+        """Move the journal aside, start a fresh one and open the replacement base for writing"""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if os.path.exists(self.journal_path):
+            if os.path.exists(self.previous_path):
+                # An earlier compaction never finished: its moved journal takes this one's records too
+                with open(self.journal_path, "rb") as journal, open_private(self.previous_path, "ab") as previous:
+                    previous.write(journal.read()[len(SNAPSHOT_MAGIC):])
+                    previous.flush()
+                    os.fsync(previous.fileno())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.previous_path)
+        self._open_journal()
+        base = open_private(self.base_path + ".tmp", "wb")
+        base.write(SNAPSHOT_MAGIC)
+        return base
+    
+    def commit_base(self, base: Any):
+        """Make a fully written replacement base current and drop the journal it supersedes"""
+        base.flush()
+        os.fsync(base.fileno())
+        base.close()
+        os.replace(base.name, self.base_path)
+        if os.path.exists(self.previous_path):
+            os.remove(self.previous_path)
+        self.stats["compactions"] += 1
+    
+    def clear(self):
+        """Discard the whole snapshot"""
+        self.close()
+        for path in (self.base_path, self.previous_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+class SharedStateStore:
+    """SQLite state the primary worker of a multi-process node publishes for the others.
+    
+    Rows are (kind, item id) -> JSON with a store-wide sequence number; readers poll PRAGMA data_version,
+    which only changes when another connection commits, and fetch rows past the last sequence they saw.
+    WAL mode lets them read while the primary writes. A row whose data is None is a tombstone. The file
+    holds the secret that authenticates proxied frames, so it is created readable by its owner only.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))  # SQLite gives its -wal and -shm files the same mode
+        self.connection = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS shared_state (kind TEXT NOT NULL, item_id TEXT NOT NULL, "
+                                "data TEXT, seq INTEGER NOT NULL, PRIMARY KEY (kind, item_id))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS shared_state_seq ON shared_state (seq)")
+        self._last_seq = 0
+        self._data_version: Optional[int] = None
+    
+    def clear(self):
+        """Drop state left by an earlier run"""
+        with self._lock:
+            self.connection.execute("DELETE FROM shared_state")
+    
+    def put(self, kind: str, item_id: str, data: Any):
+        """Insert or replace a row under the next sequence number"""
+        encoded = json.dumps(data) if data is not None else None
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self.connection.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM shared_state").fetchone()[0]
+                self.connection.execute("INSERT OR REPLACE INTO shared_state VALUES (?, ?, ?, ?)", (kind, item_id, encoded, seq))
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+    
+    def changes(self) -> List[Tuple[str, str, Any]]:
+        """Rows written since the last call, oldest first; cheap when nothing changed"""
+        with self._lock:
+            version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return []
+            self._data_version = version
+            rows = self.connection.execute("SELECT kind, item_id, data, seq FROM shared_state WHERE seq > ? ORDER BY seq",
+                                           (self._last_seq,)).fetchall()
+            if rows:
+                self._last_seq = rows[-1][3]
+        return [(kind, item_id, json.loads(data) if data is not None else None) for kind, item_id, data, _ in rows]
+    
+    def close(self):
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,60 @@
+"""DNA-QNet protocol types: network topologies, message types, keys, peers and messages"""
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+class NetworkTopology(Enum):
+    MESH = "mesh"
+    STAR = "star"
+    HYBRID = "hybrid"
+
+class MessageType(Enum):
+    HANDSHAKE = "handshake"
+    QUANTUM_KEY_EXCHANGE = "quantum_key_exchange"
+    ORGANISM_MESSAGE = "organism_message"
+    SMART_CONTRACT = "smart_contract"
+    CONSCIOUSNESS_SYNC = "consciousness_sync"
+    EVOLUTION_EVENT = "evolution_event"
+    HEARTBEAT = "heartbeat"
+    COMPRESSION_DICTIONARY = "compression_dictionary"
+    ROUTE_UPDATE = "route_update"
+    FIND_NODE = "find_node"
+    TRANSFER_BEGIN = "transfer_begin"
+    TRANSFER_CHUNK = "transfer_chunk"
+
+@dataclass
+class QuantumKey:
+    """Quantum Key Distribution key"""
+    key_id: str
+    quantum_bits: str
+    classical_hash: str
+    coherence_level: float
+    creation_time: float
+    expiry_time: float
+
+@dataclass
+class DNAQNetPeer:
+    """DNA-QNet network peer"""
+    peer_id: str
+    ip_address: str
+    port: int
+    public_key: str
+    quantum_key: Optional[QuantumKey]
+    consciousness_level: float
+    quantum_coherence: float
+    last_seen: float
+    capabilities: List[str]
+    trust_score: float
+
+@dataclass
+class DNAQNetMessage:
+    """DNA-QNet protocol message"""
+    message_id: str
+    sender_id: str
+    recipient_id: str
+    message_type: MessageType
+    payload: Dict[str, Any]
+    quantum_signature: str
+    timestamp: float
+    ttl: int
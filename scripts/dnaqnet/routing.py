@@ -0,0 +1,315 @@
+"""DNA-QNet routing: gossip target selection, the distance-vector routing table and Kademlia buckets"""
+
+import bisect
+import hashlib
+import heapq
+import math
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .protocol import NetworkTopology
+
+def select_gossip_targets(candidates: List[str], fanout: int, exclude: Set[str],
+                          rng: Optional[random.Random] = None) -> List[str]:
+    """Pick a random fanout subset of candidate peers for gossip forwarding"""
+    rng = rng or random
+    # Oversample by the exclusion count so filtering still leaves a uniform fanout subset
+    sample_size = min(len(candidates), fanout + len(exclude))
+    picks = rng.sample(candidates, sample_size)
+    return [candidate for candidate in picks if candidate not in exclude][:fanout]
+
+ROUTE_INFINITY = 16  # distance-vector "unreachable", as in RIP
+
+class RoutingTable:
+    """Distance-vector next-hop table over links chosen for the network topology"""
+    
+    def __init__(self, node_id: str, topology: NetworkTopology = NetworkTopology.MESH, hub_count: int = 3):
+        self.node_id = node_id
+        self.topology = topology
+        self.hub_count = max(1, hub_count)
+        
+        # Direct neighbors we exchange route advertisements with
+        self.links: Set[str] = set()
+        # destination -> (next hop, distance)
+        self.routes: Dict[str, Tuple[str, int]] = {}
+        # destination -> (ip, port) learned from advertisements
+        self.endpoints: Dict[str, Tuple[str, int]] = {}
+        
+        # Last distance each neighbor advertised per destination, plus the reverse index
+        # so a link going down only revisits the destinations it carried
+        self._advertised: Dict[str, Dict[str, int]] = {}
+        self._learned_from: Dict[str, Set[str]] = {}
+        
+        # Known membership ordered by ring position, for topology link selection
+        self._ring: List[Tuple[int, str]] = [(self.ring_position(node_id), node_id)]
+    
+    @staticmethod
+    def ring_position(node_id: str) -> int:
+        """Stable position of a node on the hash ring"""
+        return int.from_bytes(hashlib.sha256(node_id.encode()).digest()[:8], 'big')
+    
+    def __len__(self) -> int:
+        return len(self.routes)
+    
+    def members(self) -> int:
+        """Number of known nodes, including this one"""
+        return len(self._ring)
+    
+    def next_hop(self, destination: str) -> Optional[str]:
+        """Neighbor to hand a message for destination to, or None if unreachable"""
+        route = self.routes.get(destination)
+        return route[0] if route else None
+    
+    def next_hops(self, destination: str) -> List[str]:
+        """Every neighbor on a shortest route to destination; each is strictly closer, so any of them is loop-free"""
+        route = self.routes.get(destination)
+        if route is None or destination in self.links:
+            return [route[0]] if route else []
+        return [neighbor for neighbor, distance in self._advertised.get(destination, {}).items()
+                if distance + 1 == route[1]]
+    
+    def _recompute(self, destination: str) -> bool:
+        """Pick the best route to one destination; True if it changed"""
+        if destination in self.links:
+            best: Optional[Tuple[str, int]] = (destination, 1)
+        else:
+            best = None
+            for neighbor, distance in self._advertised.get(destination, {}).items():
+                if distance + 1 < ROUTE_INFINITY and (best is None or distance + 1 < best[1]):
+                    best = (neighbor, distance + 1)
+        
+        previous = self.routes.get(destination)
+        if best == previous:
+            return False
+        
+        entry = (self.ring_position(destination), destination)
+        if best is None:
+            del self.routes[destination]
+            self.endpoints.pop(destination, None)
+            index = bisect.bisect_left(self._ring, entry)
+            if index < len(self._ring) and self._ring[index] == entry:
+                del self._ring[index]
+        else:
+            if previous is None:
+                bisect.insort(self._ring, entry)
+            self.routes[destination] = best
+        return True
+    
+    def link_up(self, neighbor: str, endpoint: Optional[Tuple[str, int]] = None) -> Set[str]:
+        """Add a direct neighbor; returns the destinations whose routes changed"""
+        self.links.add(neighbor)
+        if endpoint:
+            self.endpoints[neighbor] = endpoint
+        return {neighbor} if self._recompute(neighbor) else set()
+    
+    def link_down(self, neighbor: str) -> Set[str]:
+        """Remove a direct neighbor and every route learned through it"""
+        self.links.discard(neighbor)
+        changed = set()
+        for destination in self._learned_from.pop(neighbor, set()):
+            advertised = self._advertised.get(destination)
+            if advertised is not None:
+                advertised.pop(neighbor, None)
+                if not advertised:
+                    del self._advertised[destination]
+            if self._recompute(destination):
+                changed.add(destination)
+        if self._recompute(neighbor):
+            changed.add(neighbor)
+        return changed
+    
+    def update(self, neighbor: str, distances: Dict[str, int],
+               endpoints: Optional[Dict[str, Tuple[str, int]]] = None) -> Set[str]:
+        """Apply a neighbor's (possibly partial) advertisement; returns the destinations whose routes changed"""
+        if neighbor not in self.links:
+            return set()
+        
+        learned = self._learned_from.setdefault(neighbor, set())
+        changed = set()
+        for destination, distance in distances.items():
+            if destination == self.node_id:
+                continue
+            
+            if distance >= ROUTE_INFINITY:
+                advertised = self._advertised.get(destination)
+                if advertised is not None:
+                    advertised.pop(neighbor, None)
+                    if not advertised:
+                        del self._advertised[destination]
+                learned.discard(destination)
+            else:
+                self._advertised.setdefault(destination, {})[neighbor] = distance
+                learned.add(destination)
+                if endpoints and destination in endpoints and destination not in self.links:
+                    self.endpoints[destination] = endpoints[destination]
+            
+            if self._recompute(destination):
+                changed.add(destination)
+        return changed
+    
+    def has_alternate_route(self, destination: str) -> bool:
+        """Whether some other neighbor can still reach destination"""
+        return any(neighbor != destination and distance + 1 < ROUTE_INFINITY
+                   for neighbor, distance in self._advertised.get(destination, {}).items())
+    
+    def advertisement(self, neighbor: str, destinations: Iterable[str]) -> Dict[str, int]:
+        """Distances to report to a neighbor, poisoning routes that go back through it"""
+        distances = {}
+        for destination in destinations:
+            if destination == neighbor:
+                continue
+            if destination == self.node_id:
+                distances[destination] = 0
+                continue
+            route = self.routes.get(destination)
+            distances[destination] = ROUTE_INFINITY if route is None or route[0] == neighbor else route[1]
+        return distances
+    
+    def full_advertisement(self, neighbor: str) -> Dict[str, int]:
+        """Complete table for a neighbor that just linked up"""
+        return self.advertisement(neighbor, [self.node_id, *self.routes])
+    
+    def select_links(self, node_id: Optional[str] = None) -> Set[str]:
+        """Links a node should hold over the known membership: O(log N) ring fingers for MESH,
+        hubs for STAR, ring neighbors plus one hub for HYBRID"""
+        node_id = node_id or self.node_id
+        size = len(self._ring)
+        if size <= 1:
+            return set()
+        
+        if self.topology == NetworkTopology.MESH:
+            # Ring predecessor plus successors at power-of-two offsets keeps the overlay
+            # connected with logarithmic degree and diameter
+            index = bisect.bisect_left(self._ring, (self.ring_position(node_id), node_id))
+            selected = {self._ring[(index - 1) % size][1]}
+            step = 1
+            while step < size:
+                selected.add(self._ring[(index + step) % size][1])
+                step *= 2
+            selected.discard(node_id)
+            return selected
+        
+        # Hubs are the nodes at the start of the ring, so every node agrees on them. Their
+        # number grows with sqrt(N) so hub degree stays sublinear as well
+        hubs = [member for _, member in self._ring[:max(self.hub_count, math.isqrt(size))]]
+        primary = self.ring_position(node_id) % len(hubs)
+        
+        if node_id in hubs:
+            selected = set(hubs)
+        elif self.topology == NetworkTopology.STAR:
+            # Leaves attach to a primary hub and the next one as a backup
+            selected = {hubs[primary], hubs[(primary + 1) % len(hubs)]}
+        else:
+            # HYBRID: local ring neighbors plus one hub as the long-range shortcut
+            index = bisect.bisect_left(self._ring, (self.ring_position(node_id), node_id))
+            selected = {self._ring[(index - 1) % size][1], self._ring[(index + 1) % size][1], hubs[primary]}
+        
+        selected.discard(node_id)
+        return selected
+    
+    def wants_link(self, neighbor: str) -> bool:
+        """A link is kept while either end selects it, so both ends agree once membership converges"""
+        return neighbor in self.select_links() or self.node_id in self.select_links(neighbor)
+
+DHT_ID_BITS = 160
+
+def dht_id(peer_id: str) -> int:
+    """Kademlia identifier of a peer: the SHA-1 of its peer_id"""
+    return int.from_bytes(hashlib.sha1(peer_id.encode()).digest(), 'big')
+
+@dataclass
+class DHTContact:
+    """Kademlia contact: where a peer_id can be reached"""
+    peer_id: str
+    ip_address: str
+    port: int
+    last_seen: float
+
+class KademliaTable:
+    """XOR-distance k-buckets; a node keeps at most k contacts per distance bit, O(k log N) in all"""
+    
+    def __init__(self, node_id: str, k: int = 20):
+        self.node_id = node_id
+        self.local_id = dht_id(node_id)
+        self.k = k
+        
+        # Bucket i holds contacts at XOR distance [2^i, 2^(i+1)), least recently seen first
+        self.buckets: List[deque] = [deque() for _ in range(DHT_ID_BITS)]
+        self.replacements: List[deque] = [deque(maxlen=k) for _ in range(DHT_ID_BITS)]
+        self.bucket_refreshed: List[float] = [time.time()] * DHT_ID_BITS
+    
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self.buckets)
+    
+    def __contains__(self, peer_id: str) -> bool:
+        return self.get(peer_id) is not None
+    
+    def bucket_index(self, identifier: int) -> int:
+        """Bucket covering an identifier"""
+        return (identifier ^ self.local_id).bit_length() - 1
+    
+    def get(self, peer_id: str) -> Optional[DHTContact]:
+        """Contact for a peer_id, if it is in our buckets"""
+        for contact in self.buckets[self.bucket_index(dht_id(peer_id))]:
+            if contact.peer_id == peer_id:
+                return contact
+        return None
+    
+    def update(self, contact: DHTContact) -> Optional[DHTContact]:
+        """Record a contact we heard from; returns the least recently seen contact of a full bucket,
+        which the caller should ping and evict if it is gone"""
+        if contact.peer_id == self.node_id:
+            return None
+        
+        index = self.bucket_index(dht_id(contact.peer_id))
+        bucket = self.buckets[index]
+        self.bucket_refreshed[index] = time.time()
+        for existing in bucket:
+            if existing.peer_id == contact.peer_id:
+                bucket.remove(existing)
+                bucket.append(contact)
+                return None
+        
+        if len(bucket) < self.k:
+            bucket.append(contact)
+            return None
+        
+        # Full bucket: long-lived contacts win, the newcomer waits in the replacement cache
+        replacements = self.replacements[index]
+        for existing in list(replacements):
+            if existing.peer_id == contact.peer_id:
+                replacements.remove(existing)
+        replacements.append(contact)
+        return bucket[0]
+    
+    def remove(self, peer_id: str):
+        """Evict an unresponsive contact, promoting the freshest replacement"""
+        index = self.bucket_index(dht_id(peer_id))
+        bucket = self.buckets[index]
+        for existing in bucket:
+            if existing.peer_id == peer_id:
+                bucket.remove(existing)
+                if self.replacements[index]:
+                    bucket.append(self.replacements[index].pop())
+                return
+    
+    def closest(self, target: int, count: Optional[int] = None) -> List[DHTContact]:
+        """Contacts nearest to a target identifier by XOR distance"""
+        contacts = [contact for bucket in self.buckets for contact in list(bucket)]
+        return heapq.nsmallest(count or self.k, contacts, key=lambda contact: dht_id(contact.peer_id) ^ target)
+    
+    def stale_buckets(self, max_age: float, now: Optional[float] = None) -> List[int]:
+        """Buckets from our nearest occupied one outward that have seen no lookup or contact for max_age"""
+        now = now if now is not None else time.time()
+        occupied = [index for index, bucket in enumerate(self.buckets) if bucket]
+        if not occupied:
+            return []
+        return [index for index in range(occupied[0], DHT_ID_BITS)
+                if now - self.bucket_refreshed[index] >= max_age]
+    
+    def random_id_in_bucket(self, index: int) -> int:
+        """Random identifier that falls in a bucket, used as a refresh lookup target"""
+        return self.local_id ^ ((1 << index) | random.getrandbits(index))
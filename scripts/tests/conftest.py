@@ -0,0 +1,20 @@
+import importlib.util
+import logging
+import os
+import sys
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+
+@pytest.fixture(scope="session")
+def core():
+    """The dna-qnet-core script loaded as a module (its file name is not importable)"""
+    spec = importlib.util.spec_from_file_location("dna_qnet_core", os.path.join(SCRIPTS_DIR, "dna-qnet-core.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["dna_qnet_core"] = module
+    spec.loader.exec_module(module)
+    logging.getLogger("dna-qnet").setLevel(logging.WARNING)
+    return module
@@ -0,0 +1,48 @@
+import itertools
+
+
+def test_merge_converges_whatever_the_order(core):
+    sources = []
+    for node_id, consciousness in (("a", 0.1), ("b", 0.2), ("c", 0.3)):
+        replica = core.ConsciousnessCRDT(node_id)
+        replica.set_local(consciousness, consciousness)
+        replica.set_local(consciousness + 0.5, consciousness)
+        sources.append(replica)
+    payloads = [(replica.node_id, replica.payload_for("z")) for replica in sources]
+
+    states = []
+    for order in itertools.permutations(payloads):
+        replica = core.ConsciousnessCRDT("z")
+        for source, payload in order:
+            replica.merge(payload["entries"], source)
+        states.append(replica.entries)
+    assert all(state == states[0] for state in states)
+    assert states[0]["b"] == (2, 0.7, 0.2)
+
+
+def test_merge_is_idempotent_and_ignores_older_versions(core):
+    replica = core.ConsciousnessCRDT("z")
+    assert replica.merge({"a": [2, 0.9, 0.9]}, "a") == 1
+    assert replica.merge({"a": [2, 0.9, 0.9]}, "a") == 0
+    assert replica.merge({"a": [1, 0.1, 0.1]}, "a") == 0
+    assert replica.entries["a"] == (2, 0.9, 0.9)
+
+
+def test_own_entry_is_reasserted_above_an_older_incarnation(core):
+    replica = core.ConsciousnessCRDT("a")
+    replica.set_local(0.5, 0.5)
+    replica.merge({"a": [7, 0.1, 0.1]}, "b")
+    assert replica.entries["a"] == (8, 0.5, 0.5)
+
+
+def test_deltas_stop_once_acknowledged(core):
+    a = core.ConsciousnessCRDT("a")
+    b = core.ConsciousnessCRDT("b")
+    a.set_local(0.4, 0.4)
+    b.set_local(0.3, 0.3)
+    b.receive("a", a.payload_for("b"))
+    a.receive("b", b.payload_for("a"))
+    # b acknowledged a's entry, and b's own entry is never echoed back to it
+    assert a.delta_for("b") == {}
+    a.set_local(0.6, 0.6)
+    assert list(a.delta_for("b")) == ["a"]
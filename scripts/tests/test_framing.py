@@ -0,0 +1,106 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from dnaqnet.framing import (BATCH_FRAME_FLAG, FRAME_HEADER, FRAME_LENGTH_MASK, MAX_FRAME_BYTES, ReplayWindow,
+                             decode_message, encode_message, split_batch_frame, split_frames)
+from dnaqnet.protocol import DNAQNetMessage, MessageType
+
+
+def make_message(message_id: str = "m1") -> DNAQNetMessage:
+    return DNAQNetMessage(message_id=message_id, sender_id="a", recipient_id="b", message_type=MessageType.HEARTBEAT,
+                          payload={"n": 1}, quantum_signature="", timestamp=time.time(), ttl=60)
+
+
+def batch_frame(records):
+    body = b''.join(FRAME_HEADER.pack(len(record)) + record for record in records)
+    return FRAME_HEADER.pack(BATCH_FRAME_FLAG | len(body)) + body
+
+
+def test_replay_window_accepts_each_sequence_once():
+    window = ReplayWindow(size=128)
+    assert not window.check(0)
+    for sequence in (1, 3, 2):
+        assert window.check(sequence)
+        window.update(sequence)
+        assert not window.check(sequence)
+    assert window.highest == 3
+
+
+def test_replay_window_rejects_sequences_behind_the_window():
+    window = ReplayWindow(size=128)
+    window.update(1000)
+    assert not window.check(1000 - window.size)
+    assert window.check(1000 - window.size + 1)
+
+
+def test_replay_window_forgets_blocks_it_slides_past():
+    window = ReplayWindow(size=128)
+    for sequence in range(1, 301):
+        window.update(sequence)
+    window.update(300 + 3 * window.size)
+    # Every block was reused and cleared on the way, so nothing inside the window reads as seen
+    assert all(window.check(sequence) for sequence in range(window.highest - window.size + 1, window.highest))
+    assert not window.check(300)
+
+
+def test_message_round_trip():
+    message = make_message()
+    assert decode_message(encode_message(message)) == message
+
+
+def test_split_frames_mixes_single_and_batch_frames():
+    records = [encode_message(make_message(f"m{i}")) for i in range(3)]
+    data = FRAME_HEADER.pack(len(records[0])) + records[0] + batch_frame(records[1:])
+    assert split_frames(data) == records
+
+
+def test_split_batch_frame_drops_a_truncated_header():
+    record = encode_message(make_message())
+    body = FRAME_HEADER.pack(len(record)) + record + b"\x00\x00"
+    assert split_batch_frame(body) == [record]
+
+
+def test_frame_length_mask_leaves_room_for_the_limit():
+    assert MAX_FRAME_BYTES < FRAME_LENGTH_MASK
+    assert not MAX_FRAME_BYTES & BATCH_FRAME_FLAG
+
+
+def test_receive_frame_refuses_frames_over_the_limit(core):
+    node = core.DNAQNetNode("framing", "127.0.0.1", 0, udp_channel=False)
+    sender, receiver = socket.socketpair()
+    try:
+        sender.sendall(FRAME_HEADER.pack(MAX_FRAME_BYTES + 1))
+        assert node._receive_frame(receiver) == []
+
+        record = encode_message(make_message())
+        sender.sendall(FRAME_HEADER.pack(len(record)) + record)
+        assert node._receive_frame(receiver) == [record]
+    finally:
+        sender.close()
+        receiver.close()
+        node.stop()
+
+
+def test_receive_frame_async_refuses_frames_over_the_limit(core):
+    node = core.DNAQNetNode("framing", "127.0.0.1", 0, udp_channel=False)
+    sender, receiver = socket.socketpair()
+    receiver.setblocking(False)
+
+    async def receive():
+        sender.sendall(FRAME_HEADER.pack(BATCH_FRAME_FLAG | (MAX_FRAME_BYTES + 1)))
+        with pytest.raises(ValueError):
+            await node._receive_frame_async(receiver)
+
+        records = [encode_message(make_message(f"m{i}")) for i in range(2)]
+        sender.sendall(batch_frame(records))
+        assert await node._receive_frame_async(receiver) == records
+
+    try:
+        asyncio.run(receive())
+    finally:
+        sender.close()
+        receiver.close()
+        node.stop()
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import secrets
+import time
+
+import pytest
+
+from dnaqnet.crypto import (KEY_EXCHANGE_PRIME, QuantumCryptographyEngine, key_exchange_keypair, key_exchange_secret,
+                            unwrap_key, wrap_key)
+from dnaqnet.protocol import DNAQNetMessage, DNAQNetPeer, MessageType
+
+
+def test_both_ends_derive_the_same_secret():
+    requester_private, requester_public = key_exchange_keypair()
+    responder_private, responder_public = key_exchange_keypair()
+    requester = key_exchange_secret(requester_private, responder_public, "a", "b", requester_public, responder_public)
+    responder = key_exchange_secret(responder_private, requester_public, "a", "b", requester_public, responder_public)
+    assert requester == responder
+    # Bound to the node ids, so a relayed exchange derives a different secret
+    assert key_exchange_secret(requester_private, responder_public, "a", "c", requester_public,
+                               responder_public) != requester
+
+
+@pytest.mark.parametrize("public", [0, 1, KEY_EXCHANGE_PRIME - 1, KEY_EXCHANGE_PRIME])
+def test_degenerate_public_values_are_refused(public):
+    private, own_public = key_exchange_keypair()
+    with pytest.raises(ValueError):
+        key_exchange_secret(private, public, "a", "b", own_public, public)
+
+
+def test_wrapped_key_round_trip_and_tamper_refusal():
+    secret = secrets.token_bytes(32)
+    wrapped = wrap_key(secret, b'{"key_id": "k"}')
+    assert unwrap_key(secret, wrapped) == b'{"key_id": "k"}'
+
+    tampered = bytes([wrapped[0] ^ 1]) + wrapped[1:]
+    with pytest.raises(ValueError):
+        unwrap_key(secret, tampered)
+    with pytest.raises(ValueError):
+        unwrap_key(secrets.token_bytes(32), wrapped)
+
+
+class KeyedNode:
+    """Node "b" holding a key for peer "a", with the outgoing sides of the exchange recorded instead of sent"""
+
+    def __init__(self, core):
+        self.node = core.DNAQNetNode("b", "127.0.0.1", 0, udp_channel=False, entropy_pool_bytes=0)
+        self.node.loop = asyncio.get_running_loop()
+        self.probes = []
+        self.announced = []
+
+        async def establish_key(peer, replace=False):
+            self.probes.append((peer.peer_id, replace))
+
+        async def announce_key(peer, quantum_key, previous_key):
+            self.announced.append((peer.peer_id, quantum_key.key_id))
+
+        self.node._establish_key = establish_key
+        self.node._announce_key = announce_key
+        self.key = QuantumCryptographyEngine().generate_quantum_key("a")
+        self.peer = DNAQNetPeer(peer_id="a", ip_address="127.0.0.1", port=1, public_key="", quantum_key=self.key,
+                                consciousness_level=0.5, quantum_coherence=0.5, last_seen=time.time(), capabilities=[],
+                                trust_score=0.5)
+        self.node.peers["a"] = self.peer
+
+    async def receive(self, payload):
+        message = DNAQNetMessage(message_id=secrets.token_hex(8), sender_id="a", recipient_id="b",
+                                 message_type=MessageType.QUANTUM_KEY_EXCHANGE, payload=payload, quantum_signature="",
+                                 timestamp=time.time(), ttl=60)
+        await self.node._handle_quantum_key_exchange(message)
+        await asyncio.sleep(0)
+
+
+def request(mac_key=None, engine=None):
+    dh_public = format(key_exchange_keypair()[1], 'x')
+    payload = {"dh_public": dh_public}
+    if mac_key is not None:
+        payload["mac"] = engine.sign(dh_public.encode('ascii'), mac_key).hex()
+    return payload
+
+
+def run_keyed(core, scenario):
+    async def run():
+        keyed = KeyedNode(core)
+        try:
+            await scenario(keyed)
+        finally:
+            keyed.node.stop()
+    asyncio.run(run())
+
+
+def test_unauthenticated_request_is_refused_and_probed_once(core):
+    async def scenario(keyed):
+        await keyed.receive(request())
+        await keyed.receive(request())
+        assert keyed.peer.quantum_key is keyed.key
+        assert keyed.node.key_exchange_stats["refused"] == 2
+        # The address on file is asked at most once per KEY_PROBE_INTERVAL
+        assert keyed.probes == [("a", True)]
+        assert keyed.announced == []
+    run_keyed(core, scenario)
+
+
+def test_request_maced_with_another_key_is_refused_without_a_probe(core):
+    async def scenario(keyed):
+        engine = keyed.node.quantum_engine
+        await keyed.receive(request(engine.generate_quantum_key("a"), engine))
+        assert keyed.peer.quantum_key is keyed.key
+        assert keyed.node.key_exchange_stats["refused"] == 1
+        assert keyed.probes == []
+    run_keyed(core, scenario)
+
+
+def test_request_maced_with_the_current_key_replaces_it(core):
+    async def scenario(keyed):
+        await keyed.receive(request(keyed.key, keyed.node.quantum_engine))
+        assert keyed.peer.quantum_key.key_id != keyed.key.key_id
+        assert keyed.node.key_exchange_stats["answered"] == 1
+        assert keyed.announced == [("a", keyed.peer.quantum_key.key_id)]
+    run_keyed(core, scenario)
+
+
+def test_unsolicited_first_key_is_rejected(core):
+    async def scenario(keyed):
+        secret = secrets.token_bytes(32)
+        forged = json.dumps({"key_id": "forged", "quantum_bits": "01", "classical_hash": "00", "coherence_level": 1.0,
+                             "creation_time": time.time(), "expiry_time": time.time() + 60})
+        await keyed.receive({"dh_public": format(key_exchange_keypair()[1], 'x'),
+                             "encrypted_key": wrap_key(secret, forged.encode()).hex()})
+        assert keyed.peer.quantum_key is keyed.key
+        assert keyed.node.key_exchange_stats["rejected"] == 1
+    run_keyed(core, scenario)
+
+
+def test_rotation_with_a_bad_mac_is_rejected(core):
+    async def scenario(keyed):
+        engine = keyed.node.quantum_engine
+        successor = engine.encrypt_message(json.dumps({"key_id": "next"}), keyed.key)
+        await keyed.receive({"encrypted_key": successor, "mac": "00" * 32})
+        assert keyed.peer.quantum_key is keyed.key
+        assert keyed.node.key_exchange_stats["rejected"] == 1
+    run_keyed(core, scenario)
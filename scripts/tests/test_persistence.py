@@ -0,0 +1,146 @@
+import os
+import stat
+import time
+
+from dnaqnet.crypto import QuantumCryptographyEngine
+from dnaqnet.persistence import (OUTBOX_RECORD, SNAPSHOT_REMOVE, SNAPSHOT_UPSERT, OutboxLog, PeerSnapshotStore,
+                                 decode_peer_snapshot, encode_peer_snapshot)
+from dnaqnet.protocol import DNAQNetPeer
+
+
+def mode(path: str) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def make_peer(peer_id: str, keyed: bool = True) -> DNAQNetPeer:
+    return DNAQNetPeer(peer_id=peer_id, ip_address="10.0.0.1", port=7777, public_key="pk",
+                       quantum_key=QuantumCryptographyEngine().generate_quantum_key(peer_id) if keyed else None,
+                       consciousness_level=0.7, quantum_coherence=0.8, last_seen=time.time(),
+                       capabilities=["organism_messaging", "consciousness_sync"], trust_score=0.6)
+
+
+def test_outbox_replays_records_in_order_after_reopening(tmp_path):
+    expires_at = time.time() + 60
+    log = OutboxLog(str(tmp_path), segment_bytes=256)
+    for index in range(20):
+        log.append("peer", f'{{"n": {index}}}'.encode(), expires_at)
+    log.sync()
+    log.close()
+
+    log = OutboxLog(str(tmp_path), segment_bytes=256)
+    assert log.pending("peer") == 20
+    records, taken = log.take("peer")
+    assert [body for body, _ in records] == [f'{{"n": {index}}}'.encode() for index in range(20)]
+    log.release("peer", taken, [])
+    assert log.pending("peer") == 0
+    assert log.peers() == []
+    log.close()
+
+
+def test_outbox_keeps_undelivered_records_ahead_of_newer_ones(tmp_path):
+    expires_at = time.time() + 60
+    log = OutboxLog(str(tmp_path))
+    log.append("peer", b"first", expires_at)
+    log.append("peer", b"second", expires_at)
+    records, taken = log.take("peer")
+    log.append("peer", b"third", expires_at)
+    log.release("peer", taken, records[1:])
+    records, taken = log.take("peer")
+    assert [body for body, _ in records] == [b"second", b"third"]
+    log.close()
+
+
+def test_outbox_skips_expired_records(tmp_path):
+    now = time.time()
+    log = OutboxLog(str(tmp_path))
+    log.append("peer", b"stale", now - 1)
+    log.append("peer", b"fresh", now + 60)
+    records, _ = log.take("peer", now=now)
+    assert [body for body, _ in records] == [b"fresh"]
+    assert log.stats["expired"] == 1
+    log.close()
+
+
+def test_outbox_drops_a_torn_record_on_reopen(tmp_path):
+    log = OutboxLog(str(tmp_path))
+    log.append("peer", b"kept", time.time() + 60)
+    log.append("peer", b"torn", time.time() + 60)
+    segment = log.segments["peer"][-1]
+    second = OUTBOX_RECORD.size + OUTBOX_RECORD.unpack_from(segment.mapping, 0)[0]
+    segment.mapping[second + OUTBOX_RECORD.size] ^= 0xFF
+    log.sync()
+    log.close()
+
+    log = OutboxLog(str(tmp_path))
+    records, _ = log.take("peer")
+    assert [body for body, _ in records] == [b"kept"]
+    log.close()
+
+
+def test_outbox_files_are_private_and_encrypted(tmp_path):
+    log = OutboxLog(str(tmp_path))
+    log.append("peer", b'{"organism": "SECRET"}', time.time() + 60)
+    log.sync()
+    segment_path = log.segments["peer"][0].path
+    with open(segment_path, "rb") as segment_file:
+        assert b"SECRET" not in segment_file.read()
+    assert mode(segment_path) == 0o600
+    assert mode(os.path.join(str(tmp_path), "outbox.key")) == 0o600
+    assert mode(os.path.dirname(segment_path)) == 0o700
+    log.close()
+
+
+def test_peer_snapshot_body_round_trip():
+    peer = make_peer("a")
+    decoded, routed, key_originated, dictionaries = decode_peer_snapshot(
+        encode_peer_snapshot(peer, routed=True, key_originated=True, dictionaries={"d1": b"\x00dictionary"}))
+    assert (routed, key_originated, dictionaries) == (True, True, {"d1": b"\x00dictionary"})
+    assert decoded.quantum_key == peer.quantum_key
+    for field in ("peer_id", "ip_address", "port", "public_key", "consciousness_level", "quantum_coherence",
+                  "capabilities", "trust_score"):
+        assert getattr(decoded, field) == getattr(peer, field)
+
+    unkeyed, _, _, _ = decode_peer_snapshot(encode_peer_snapshot(make_peer("b", keyed=False), False, False, {}))
+    assert unkeyed.quantum_key is None
+
+
+def test_peer_snapshot_store_round_trip_through_compaction(tmp_path):
+    store = PeerSnapshotStore(str(tmp_path))
+    peers = [make_peer(f"p{index}") for index in range(3)]
+    store.append([store.record(SNAPSHOT_UPSERT, encode_peer_snapshot(peer, False, True, {})) for peer in peers])
+
+    base = store.begin_compaction()
+    for peer in peers:
+        base.write(store.record(SNAPSHOT_UPSERT, encode_peer_snapshot(peer, False, True, {})))
+    # A change made while the base is being written lands in the new journal
+    store.append([store.record(SNAPSHOT_REMOVE, b"p1")])
+    store.commit_base(base)
+    store.close()
+
+    store = PeerSnapshotStore(str(tmp_path))
+    restored = {}
+    for kind, body in store.load():
+        if kind == SNAPSHOT_UPSERT:
+            peer = decode_peer_snapshot(body)[0]
+            restored[peer.peer_id] = peer
+        elif kind == SNAPSHOT_REMOVE:
+            restored.pop(body.decode(), None)
+    assert sorted(restored) == ["p0", "p2"]
+    assert restored["p2"].quantum_key == peers[2].quantum_key
+    assert all(mode(os.path.join(str(tmp_path), name)) == 0o600 for name in os.listdir(str(tmp_path)))
+    store.close()
+
+
+def test_peer_snapshot_store_cuts_a_torn_journal_tail(tmp_path):
+    store = PeerSnapshotStore(str(tmp_path))
+    store.append([store.record(SNAPSHOT_REMOVE, b"kept")])
+    store.close()
+    with open(store.journal_path, "ab") as journal:
+        journal.write(store.record(SNAPSHOT_REMOVE, b"torn")[:-2])
+
+    store = PeerSnapshotStore(str(tmp_path))
+    assert list(store.load()) == [(SNAPSHOT_REMOVE, b"kept")]
+    assert store.stats["torn_records"] == 1
+    store.append([store.record(SNAPSHOT_REMOVE, b"after")])
+    store.close()
+    assert [body for _, body in PeerSnapshotStore(str(tmp_path)).load()] == [b"kept", b"after"]
@@ -0,0 +1,39 @@
+import random
+
+from dnaqnet.protocol import NetworkTopology
+from dnaqnet.routing import ROUTE_INFINITY, DHTContact, KademliaTable, RoutingTable, dht_id, select_gossip_targets
+
+
+def test_gossip_targets_skip_excluded_peers():
+    candidates = [f"p{index}" for index in range(20)]
+    targets = select_gossip_targets(candidates, 4, {"p0", "p1"}, random.Random(1))
+    assert len(targets) == 4
+    assert not {"p0", "p1"} & set(targets)
+
+
+def test_routes_are_learned_and_poisoned_back_to_their_next_hop():
+    table = RoutingTable("a", NetworkTopology.MESH)
+    table.link_up("b")
+    assert table.update("b", {"c": 1, "a": 0}) == {"c"}
+    assert table.next_hop("c") == "b"
+    assert table.routes["c"] == ("b", 2)
+    assert table.advertisement("b", ["c"]) == {"c": ROUTE_INFINITY}
+
+    assert table.link_down("b") == {"b", "c"}
+    assert table.next_hop("c") is None
+
+
+def test_kademlia_keeps_long_lived_contacts_in_a_full_bucket():
+    table = KademliaTable("self", k=2)
+    contacts = [DHTContact(f"p{index}", "127.0.0.1", 7000 + index, 0.0) for index in range(200)]
+    by_bucket = {}
+    for contact in contacts:
+        by_bucket.setdefault(table.bucket_index(dht_id(contact.peer_id)), []).append(contact)
+    first, second, third = next(group for group in by_bucket.values() if len(group) >= 3)[:3]
+
+    assert table.update(first) is None
+    assert table.update(second) is None
+    assert table.update(third) is first
+    assert third.peer_id not in table
+    table.remove(first.peer_id)
+    assert third.peer_id in table